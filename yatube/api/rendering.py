@@ -0,0 +1,73 @@
+"""JSON-ответы API.
+
+Объекты кодируются orjson, если он установлен
+(в несколько раз быстрее стандартного json),
+иначе — json. Поля заранее приводятся к
+строкам и числам, поэтому оба кодировщика
+дают одинаковый результат.
+
+Список отдаётся потоком: каждый объект
+кодируется отдельно, а байты уходят
+клиенту кусками по CHUNK_SIZE, так что большая
+страница не собирается в одну строку в
+памяти.
+"""
+import json
+
+from django.http import HttpResponse, StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CONTENT_TYPE = 'application/json'
+CHUNK_SIZE = 64 * 1024
+
+
+def dumps(value):
+    """Байты JSON для value из словарей, списков,
+    строк и чисел.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def json_response(value, status=200):
+    return HttpResponse(
+        dumps(value), content_type=CONTENT_TYPE, status=status
+    )
+
+
+def error_response(message, status):
+    return json_response({'error': message}, status=status)
+
+
+def _page_chunks(objects, serialize, links):
+    buffer = bytearray(b'{"results":[')
+    for number, obj in enumerate(objects):
+        if number:
+            buffer += b','
+        buffer += dumps(serialize(obj))
+        if len(buffer) >= CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b']'
+    for name, value in links.items():
+        buffer += b',' + dumps(name) + b':' + dumps(value)
+    buffer += b'}'
+    yield bytes(buffer)
+
+
+def page_response(objects, serialize, links):
+    """Потоковый ответ {"results": [...], **links}.
+
+    objects уже загружены: во время отдачи
+    запросов к базе нет.
+    """
+    return StreamingHttpResponse(
+        _page_chunks(objects, serialize, links), content_type=CONTENT_TYPE
+    )
@@ -0,0 +1,205 @@
+import json
+from http import HTTPStatus
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from api import rendering
+from api.v1 import resources
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(QUERY_BUDGET_ENFORCED=True)
+class ApiV1Test(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=cls.author, group=cls.group
+            )
+            for number in range(5)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader, text=f'Ответ {number}'
+            )
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get(self, name, client=None, query=None, **kwargs):
+        response = (client or self.client).get(
+            reverse(f'api:v1:{name}', kwargs=kwargs), query or {}
+        )
+        return response, json.loads(response.getvalue())
+
+    def test_endpoints(self):
+        """Все адреса API отвечают JSON"""
+        post = self.posts[0]
+        endpoints = {
+            'post_list': {},
+            'post_detail': {'post_id': post.pk},
+            'comment_list': {'post_id': post.pk},
+            'group_detail': {'slug': 'group'},
+            'group_post_list': {'slug': 'group'},
+            'profile_detail': {'username': 'author'},
+            'profile_post_list': {'username': 'author'},
+            'feed': {},
+        }
+        for name, kwargs in endpoints.items():
+            with self.subTest(name=name):
+                response, _ = self.get(name, self.reader_client, **kwargs)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(
+                    response['Content-Type'], rendering.CONTENT_TYPE
+                )
+
+    def test_post_detail(self):
+        """Пост отдаётся со всеми полями"""
+        post = self.posts[0]
+        _, data = self.get('post_detail', post_id=post.pk)
+        self.assertEqual(list(data), list(resources.POST))
+        self.assertEqual(data['id'], post.pk)
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'group')
+        self.assertEqual(data['pub_date'], post.pub_date.isoformat())
+        self.assertIsNone(data['image'])
+
+    def test_profile_and_group(self):
+        """Профиль и группа отдаются с числом постов"""
+        _, profile = self.get('profile_detail', username='author')
+        self.assertEqual(profile, {
+            'username': 'author', 'name': 'Лев Толстой', 'posts_count': 5,
+        })
+        _, group = self.get('group_detail', slug='group')
+        self.assertEqual(group['posts_count'], 5)
+
+    def test_cursor_pagination(self):
+        """Список листается курсором до конца и обратно"""
+        newest_first = [post.pk for post in reversed(self.posts)]
+        response, page = self.get('post_list', query={'limit': 2})
+        self.assertTrue(response.streaming)
+        seen = [post['id'] for post in page['results']]
+        self.assertIsNone(page['previous'])
+        while page['next']:
+            self.assertIn('limit=2', page['next'])
+            page = json.loads(self.client.get(page['next']).getvalue())
+            seen += [post['id'] for post in page['results']]
+        self.assertEqual(seen, newest_first)
+        page = json.loads(self.client.get(page['previous']).getvalue())
+        self.assertEqual(
+            [post['id'] for post in page['results']], newest_first[2:4]
+        )
+
+    def test_comment_cursor(self):
+        """Комментарии листаются курсором по дате создания"""
+        _, page = self.get(
+            'comment_list', query={'limit': 2}, post_id=self.posts[0].pk
+        )
+        ids = [comment['id'] for comment in page['results']]
+        page = json.loads(self.client.get(page['next']).getvalue())
+        ids += [comment['id'] for comment in page['results']]
+        self.assertEqual(
+            ids, [comment.pk for comment in reversed(self.comments)]
+        )
+        self.assertIsNone(page['next'])
+
+    def test_sparse_fields(self):
+        """fields= оставляет только перечисленные поля"""
+        _, page = self.get('post_list', query={'fields': 'text,id'})
+        for post in page['results']:
+            self.assertEqual(list(post), ['text', 'id'])
+        _, data = self.get(
+            'post_detail', query={'fields': 'id'}, post_id=self.posts[0].pk
+        )
+        self.assertEqual(data, {'id': self.posts[0].pk})
+
+    def test_sparse_fields_skip_joins(self):
+        """Без полей связей выборка не соединяет таблицы"""
+        for fields, joined in [('id,text', False), ('id,author', True)]:
+            with self.subTest(fields=fields):
+                with self.assertNumQueries(1) as queries:
+                    self.get('post_list', query={'fields': fields})
+                self.assertEqual('JOIN' in queries[0]['sql'], joined)
+
+    def test_constant_queries(self):
+        """Число запросов не зависит от размера страницы"""
+        for limit in (1, 5):
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(1):
+                    self.get('post_list', query={'limit': limit})
+
+    def test_bad_requests(self):
+        """Неверные параметры и адреса — ошибки в JSON"""
+        cases = [
+            ('post_list', {'fields': 'id,secret'}, {}, HTTPStatus.BAD_REQUEST),
+            ('post_list', {'limit': '1000'}, {}, HTTPStatus.BAD_REQUEST),
+            ('post_list', {'limit': 'x'}, {}, HTTPStatus.BAD_REQUEST),
+            ('post_detail', {}, {'post_id': 0}, HTTPStatus.NOT_FOUND),
+            ('comment_list', {}, {'post_id': 0}, HTTPStatus.NOT_FOUND),
+            ('group_detail', {}, {'slug': 'none'}, HTTPStatus.NOT_FOUND),
+            ('feed', {}, {}, HTTPStatus.UNAUTHORIZED),
+        ]
+        for name, query, kwargs, status in cases:
+            with self.subTest(name=name, query=query):
+                response, data = self.get(name, query=query, **kwargs)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', data)
+
+    def test_feed(self):
+        """Лента подписок отдаёт посты авторов, на которых подписан"""
+        _, page = self.get('feed', self.reader_client)
+        self.assertEqual(page['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        _, page = self.get('feed', self.reader_client)
+        self.assertEqual(
+            [post['id'] for post in page['results']],
+            [post.pk for post in reversed(self.posts)],
+        )
+
+    def test_feed_with_several_followers(self):
+        """Лента листается по записям читателя, а не других подписчиков"""
+        second = User.objects.create_user(username='second')
+        for user in (self.reader, second):
+            Follow.objects.create(user=user, author=self.author)
+        _, page = self.get('feed', self.reader_client, query={'limit': 2})
+        seen = [post['id'] for post in page['results']]
+        while page['next']:
+            response = self.reader_client.get(page['next'])
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            page = json.loads(response.getvalue())
+            seen += [post['id'] for post in page['results']]
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
+
+    def test_not_modified(self):
+        """Неизменённый пост отдаёт 304 по ETag"""
+        url = reverse(
+            'api:v1:post_detail', kwargs={'post_id': self.posts[0].pk}
+        )
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_encoders_agree(self):
+        """Без orjson ответ кодируется json так же"""
+        value = {'text': 'Привет', 'id': 1, 'image': None, 'list': [1.5]}
+        encoded = rendering.dumps(value)
+        with mock.patch.object(rendering, 'orjson', None):
+            self.assertEqual(rendering.dumps(value), encoded)
+        self.assertEqual(json.loads(encoded), value)
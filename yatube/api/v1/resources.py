@@ -0,0 +1,115 @@
+"""Поля объектов в API v1.
+
+Для каждого ресурса задано, какие поля есть
+и как их получить из объекта. Полям со
+связанными объектами нужны связи из related:
+выборка подтягивает их через select_related, и
+страница сериализуется без дополнительных
+запросов. Параметр fields= выбирает часть
+полей, и тогда ненужные связи не
+подтягиваются.
+"""
+from collections import namedtuple
+from operator import attrgetter
+
+from django.core.exceptions import BadRequest
+
+from posts.counters import author_scope, group_scope, total_count
+
+Field = namedtuple('Field', 'get related', defaults=((),))
+
+
+def _date(value):
+    return value.isoformat() if value else None
+
+
+def _image(post):
+    if not post.image:
+        return None
+    return {
+        'url': post.image.url,
+        'width': post.image_width,
+        'height': post.image_height,
+    }
+
+
+def _posts_count(queryset, scope):
+    # Счётчик из кэша posts.counters; для больших
+    # выборок — оценка.
+    return int(total_count(queryset, scope))
+
+
+POST = {
+    'id': Field(attrgetter('pk')),
+    'title': Field(attrgetter('title')),
+    'text': Field(attrgetter('text')),
+    'pub_date': Field(lambda post: _date(post.pub_date)),
+    'updated_at': Field(lambda post: _date(post.updated_at)),
+    'author': Field(lambda post: post.author.username, ('author',)),
+    'group': Field(
+        lambda post: post.group.slug if post.group_id else None, ('group',)
+    ),
+    'address': Field(attrgetter('address')),
+    'cost': Field(attrgetter('cost')),
+    'end_date': Field(lambda post: _date(post.end_date)),
+    'image': Field(_image),
+}
+
+COMMENT = {
+    'id': Field(attrgetter('pk')),
+    'post': Field(attrgetter('post_id')),
+    'author': Field(lambda comment: comment.author.username, ('author',)),
+    'text': Field(attrgetter('text')),
+    'created': Field(lambda comment: _date(comment.created)),
+}
+
+GROUP = {
+    'slug': Field(attrgetter('slug')),
+    'title': Field(attrgetter('title')),
+    'description': Field(attrgetter('description')),
+    'posts_count': Field(
+        lambda group: _posts_count(group.posts.all(), group_scope(group.pk))
+    ),
+}
+
+PROFILE = {
+    'username': Field(attrgetter('username')),
+    'name': Field(lambda user: user.get_full_name()),
+    'posts_count': Field(
+        lambda user: _posts_count(user.posts.all(), author_scope(user.pk))
+    ),
+}
+
+
+def field_names(resource, value):
+    """Поля из параметра fields= через запятую;
+    без него — все поля.
+    """
+    if not value:
+        return list(resource)
+    names = list(dict.fromkeys(
+        name.strip() for name in value.split(',') if name.strip()
+    ))
+    unknown = [name for name in names if name not in resource]
+    if unknown or not names:
+        raise BadRequest(
+            f'Неизвестные поля: {", ".join(unknown)}; '
+            f'доступны: {", ".join(resource)}'
+        )
+    return names
+
+
+def select(queryset, resource, names):
+    """Выборка со связями, нужными полям names."""
+    related = sorted({
+        relation for name in names for relation in resource[name].related
+    })
+    return queryset.select_related(*related) if related else queryset
+
+
+def serializer(resource, names):
+    """Функция, превращающая объект в словарь
+    с полями names.
+    """
+    getters = [(name, resource[name].get) for name in names]
+    return lambda obj: {name: get(obj) for name, get in getters}
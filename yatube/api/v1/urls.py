@@ -0,0 +1,32 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'v1'
+
+urlpatterns = [
+    path('posts/', views.post_list, name='post_list'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comment_list,
+        name='comment_list'
+    ),
+    path('groups/<slug:slug>/', views.group_detail, name='group_detail'),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.group_post_list,
+        name='group_post_list'
+    ),
+    path(
+        'profiles/<str:username>/',
+        views.profile_detail,
+        name='profile_detail'
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.profile_post_list,
+        name='profile_post_list'
+    ),
+    path('feed/', views.feed, name='feed'),
+]
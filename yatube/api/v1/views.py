@@ -0,0 +1,189 @@
+from functools import wraps
+from http import HTTPStatus
+
+from django.core.exceptions import BadRequest
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition, require_GET
+
+from api.rendering import error_response, json_response, page_response
+from core.decorators import query_budget
+from posts import markers, timeline
+from posts.models import Comment, Group, Post, User
+from posts.utils import CURSOR_PARAM, CursorPaginator
+
+from . import resources
+
+FIELDS_PARAM = 'fields'
+LIMIT_PARAM = 'limit'
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def api_view(view):
+    """Только GET; ошибки отдаются в JSON, а не
+    страницами сайта.
+    """
+    @wraps(view)
+    @require_GET
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return error_response('Не найдено', HTTPStatus.NOT_FOUND)
+        except BadRequest as error:
+            return error_response(str(error), HTTPStatus.BAD_REQUEST)
+    return wrapper
+
+
+def _limit(request):
+    value = request.GET.get(LIMIT_PARAM)
+    if value is None:
+        return PAGE_SIZE
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise BadRequest(
+            f'{LIMIT_PARAM} должен быть числом '
+            f'от 1 до {MAX_PAGE_SIZE}'
+        )
+    return limit
+
+
+def _link(request, cursor):
+    """Адрес соседней страницы: те же
+    параметры с другим курсором.
+    """
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query[CURSOR_PARAM] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _names(request, resource):
+    return resources.field_names(resource, request.GET.get(FIELDS_PARAM))
+
+
+def _object(request, queryset, resource, **lookup):
+    names = _names(request, resource)
+    obj = get_object_or_404(
+        resources.select(queryset, resource, names), **lookup
+    )
+    return json_response(resources.serializer(resource, names)(obj))
+
+
+def _page(request, queryset, resource, **paginator_options):
+    """Страница списка по курсору: один запрос
+    к базе.
+    """
+    names = _names(request, resource)
+    paginator = CursorPaginator(
+        resources.select(queryset, resource, names),
+        _limit(request),
+        **paginator_options,
+    )
+    page = paginator.get_page(request.GET.get(CURSOR_PARAM))
+    return page_response(
+        page.object_list,
+        resources.serializer(resource, names),
+        {
+            'next': _link(request, page.next_cursor),
+            'previous': _link(request, page.previous_cursor),
+        },
+    )
+
+
+@query_budget(1)
+@api_view
+def post_list(request):
+    return _page(request, Post.objects.all(), resources.POST)
+
+
+@query_budget(5)
+@api_view
+@condition(
+    etag_func=markers.post_etag,
+    last_modified_func=markers.post_last_modified,
+)
+def post_detail(request, post_id):
+    return _object(request, Post.objects.all(), resources.POST, pk=post_id)
+
+
+@query_budget(6)
+@api_view
+@condition(
+    etag_func=markers.post_etag,
+    last_modified_func=markers.post_last_modified,
+)
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return _page(
+        request,
+        Comment.objects.filter(post_id=post_id).order_by('-created', '-pk'),
+        resources.COMMENT,
+        key=('created', 'pk'),
+        date_attr='created',
+    )
+
+
+@query_budget(6)
+@api_view
+@condition(
+    etag_func=markers.group_etag,
+    last_modified_func=markers.group_last_modified,
+)
+def group_detail(request, slug):
+    return _object(request, Group.objects.all(), resources.GROUP, slug=slug)
+
+
+@query_budget(6)
+@api_view
+@condition(
+    etag_func=markers.group_etag,
+    last_modified_func=markers.group_last_modified,
+)
+def group_post_list(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return _page(request, group.posts.all(), resources.POST)
+
+
+@query_budget(6)
+@api_view
+@condition(
+    etag_func=markers.profile_etag,
+    last_modified_func=markers.profile_last_modified,
+)
+def profile_detail(request, username):
+    return _object(
+        request, User.objects.all(), resources.PROFILE, username=username
+    )
+
+
+@query_budget(6)
+@api_view
+@condition(
+    etag_func=markers.profile_etag,
+    last_modified_func=markers.profile_last_modified,
+)
+def profile_post_list(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return _page(request, author.posts.all(), resources.POST)
+
+
+@query_budget(3)
+@api_view
+def feed(request):
+    if not request.user.is_authenticated:
+        return error_response(
+            'Нужно войти в аккаунт', HTTPStatus.UNAUTHORIZED
+        )
+    return _page(
+        request,
+        timeline.feed(request.user.pk),
+        resources.POST,
+        key=timeline.FEED_KEY,
+    )
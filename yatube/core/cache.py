@@ -0,0 +1,345 @@
+"""Кэш в файле SQLite, общий для всех процессов
+сервера на одной машине.
+
+LocMemCache у каждого процесса свой: кэш
+холодный после старта воркера, а данные
+дублируются в каждом процессе. SQLiteCache
+хранит записи в одном файле в режиме WAL:
+чтения не блокируют друг друга и запись, а
+внешний сервер не нужен.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+Целые числа хранятся как INTEGER, поэтому incr —
+один атомарный UPDATE. Остальные значения и
+целые шире 64 бит хранятся через pickle.
+Устаревшие записи удаляются при чтении и
+при чистке; при превышении MAX_ENTRIES удаляются
+давно не читанные записи (LRU). Время чтения
+обновляется не чаще раза в LRU_RESOLUTION секунд,
+чтобы чтения почти никогда не писали в
+файл.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+TABLE = 'cache'
+# Ограничение SQLite на число параметров в
+# запросе — с запасом.
+CHUNK_SIZE = 500
+# Пределы INTEGER SQLite: целые за ними хранятся
+# через pickle.
+INTEGER_MIN = -2 ** 63
+INTEGER_MAX = 2 ** 63 - 1
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._lru_resolution = float(options.get('LRU_RESOLUTION', 1))
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+
+    # Соединение
+
+    @property
+    def _db(self):
+        """Соединение текущего потока; после fork
+        открывается заново.
+        """
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            local.connection = self._connect()
+            local.pid = os.getpid()
+            local.writes = 0
+        return local.connection
+
+    def _connect(self):
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self._path,
+            timeout=self._busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+            'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL'
+            ') WITHOUT ROWID'
+        )
+        connection.execute(
+            f'CREATE INDEX IF NOT EXISTS {TABLE}_accessed '
+            f'ON {TABLE} (accessed)'
+        )
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def _write(self, sql, params=()):
+        """Запрос на запись в своей транзакции;
+        возвращает курсор.
+        """
+        with self._transaction() as db:
+            return db.execute(sql, params)
+
+    # Значения
+
+    def _dump(self, value):
+        if type(value) is int and INTEGER_MIN <= value <= INTEGER_MAX:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _mark_read(self, keys, now):
+        if not keys:
+            return
+        with self._transaction() as db:
+            db.executemany(
+                f'UPDATE {TABLE} SET accessed = ? '
+                f'WHERE key = ? AND accessed < ?',
+                [(now, key, now - self._lru_resolution) for key in keys]
+            )
+
+    # API кэша
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute(
+            f'SELECT value, expires, accessed FROM {TABLE} WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires, accessed = row
+        now = time.time()
+        if not self._alive(expires, now):
+            self._write(
+                f'DELETE FROM {TABLE} WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            return default
+        if accessed < now - self._lru_resolution:
+            self._mark_read([key], now)
+        return self._load(value)
+
+    def get_many(self, keys, version=None):
+        keys = {
+            self.make_and_validate_key(key, version=version): key
+            for key in keys
+        }
+        result = {}
+        stale = []
+        now = time.time()
+        names = list(keys)
+        for start in range(0, len(names), CHUNK_SIZE):
+            chunk = names[start:start + CHUNK_SIZE]
+            rows = self._db.execute(
+                f'SELECT key, value, expires, accessed FROM {TABLE} '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+            for name, value, expires, accessed in rows:
+                if not self._alive(expires, now):
+                    continue
+                if accessed < now - self._lru_resolution:
+                    stale.append(name)
+                result[keys[name]] = self._load(value)
+        self._mark_read(stale, now)
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (
+                self.make_and_validate_key(key, version=version),
+                self._dump(value),
+                expires,
+                now,
+            )
+            for key, value in data.items()
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                f'INSERT OR REPLACE INTO {TABLE} '
+                f'(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                rows
+            )
+        self._after_write(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute(
+                f'DELETE FROM {TABLE} WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            added = db.execute(
+                f'INSERT OR IGNORE INTO {TABLE} '
+                f'(key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, self._dump(value), self.get_backend_timeout(timeout),
+                 now)
+            ).rowcount == 1
+        if added:
+            self._after_write(1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._transaction() as db:
+            row = None
+            if INTEGER_MIN <= delta <= INTEGER_MAX:
+                # Только если сумма остаётся в INTEGER:
+                # иначе SQLite вернул бы REAL.
+                row = db.execute(
+                    f'UPDATE {TABLE} SET value = value + ?, accessed = ? '
+                    f"WHERE key = ? AND typeof(value) = 'integer' "
+                    f'AND value BETWEEN ? AND ? '
+                    f'AND (expires IS NULL OR expires > ?) RETURNING value',
+                    (delta, now, key, max(INTEGER_MIN, INTEGER_MIN - delta),
+                     min(INTEGER_MAX, INTEGER_MAX - delta), now)
+                ).fetchone()
+            if row is None:
+                return self._incr_slow(db, key, delta, now)
+        return row[0]
+
+    def _incr_slow(self, db, key, delta, now):
+        """incr для значений вне INTEGER, в уже
+        открытой транзакции.
+        """
+        row = db.execute(
+            f'SELECT value FROM {TABLE} '
+            f'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, now)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Key '{key}' not found")
+        value = self._load(row[0])
+        if type(value) is not int:
+            raise TypeError(f"Value for '{key}' is not an integer.")
+        value += delta
+        db.execute(
+            f'UPDATE {TABLE} SET value = ?, accessed = ? WHERE key = ?',
+            (self._dump(value), now, key)
+        )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        return self._write(
+            f'UPDATE {TABLE} SET expires = ?, accessed = ? '
+            f'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now)
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._db.execute(
+            f'SELECT expires FROM {TABLE} WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write(
+            f'DELETE FROM {TABLE} WHERE key = ?', (key,)
+        ).rowcount == 1
+
+    def delete_many(self, keys, version=None):
+        names = [
+            self.make_and_validate_key(key, version=version) for key in keys
+        ]
+        for start in range(0, len(names), CHUNK_SIZE):
+            chunk = names[start:start + CHUNK_SIZE]
+            self._write(
+                f'DELETE FROM {TABLE} '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})',
+                chunk
+            )
+
+    def clear(self):
+        self._write(f'DELETE FROM {TABLE}')
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы
+        # процесса.
+        pass
+
+    # Чистка
+
+    def _after_write(self, count):
+        """Раз в CULL_EVERY записей процесса
+        проверяет размер кэша.
+        """
+        local = self._local
+        local.writes += count
+        if local.writes >= self._cull_every:
+            local.writes = 0
+            self.cull()
+
+    def cull(self):
+        """Удаляет устаревшие записи и давно не
+        читанные сверх MAX_ENTRIES.
+        """
+        self._write(
+            f'DELETE FROM {TABLE} WHERE expires <= ?', (time.time(),)
+        )
+        total = self._db.execute(
+            f'SELECT COUNT(*) FROM {TABLE}'
+        ).fetchone()[0]
+        if total <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            self.clear()
+            return
+        excess = total - self._max_entries
+        self._write(
+            f'DELETE FROM {TABLE} WHERE key IN ('
+            f'SELECT key FROM {TABLE} ORDER BY accessed LIMIT ?)',
+            (max(excess, total // self._cull_frequency),)
+        )
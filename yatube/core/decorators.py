@@ -0,0 +1,54 @@
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# Таблицы, запросы к которым не входят в бюджет: хранилище sorl.thumbnail
+# обращается к базе только при промахе кэша, при первом показе картинки.
+IGNORED_TABLES = ('thumbnail_kvstore',)
+# Служебные команды транзакций не считаются запросами.
+IGNORED_STATEMENTS = (
+    'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',
+)
+
+
+class QueryBudgetExceeded(Exception):
+    """View выполнило больше запросов к базе, чем объявлено."""
+
+
+def _counted(queries):
+    return [
+        query for query in queries
+        if not query['sql'].startswith(IGNORED_STATEMENTS)
+        and not any(table in query['sql'] for table in IGNORED_TABLES)
+    ]
+
+
+def query_budget(max_queries):
+    """Ограничивает число запросов к базе, которое делает view.
+
+    Проверка работает, когда включён QUERY_BUDGET_ENFORCED (по умолчанию
+    совпадает с DEBUG), и поднимает QueryBudgetExceeded со списком запросов.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not getattr(settings, 'QUERY_BUDGET_ENFORCED', settings.DEBUG):
+                return view(request, *args, **kwargs)
+            with CaptureQueriesContext(connection) as context:
+                response = view(request, *args, **kwargs)
+            queries = _counted(context.captured_queries)
+            if len(queries) > max_queries:
+                listing = '\n'.join(
+                    f'{number}. {query["sql"]}'
+                    for number, query in enumerate(queries, start=1)
+                )
+                raise QueryBudgetExceeded(
+                    f'{request.path}: {len(queries)} запросов при бюджете '
+                    f'{max_queries}\n{listing}'
+                )
+            return response
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
@@ -0,0 +1,103 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+VALUE = {'ids': list(range(50)), 'title': 'Запись' * 10}
+
+
+BACKENDS = ('locmem', 'filebased', 'sqlite')
+
+
+def open_backend(name, directory):
+    params = {'OPTIONS': {'MAX_ENTRIES': 1_000_000}}
+    if name == 'locmem':
+        return LocMemCache('benchmark', params)
+    if name == 'filebased':
+        return FileBasedCache(f'{directory}/files', params)
+    return SQLiteCache(f'{directory}/cache.sqlite3', params)
+
+
+def timed(operation, count):
+    """Среднее время операции в микросекундах."""
+    start = time.perf_counter()
+    for i in range(count):
+        operation(i)
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def read_shared(name, directory, keys, result):
+    """Доля ключей, которые другой процесс находит в кэше."""
+    found = open_backend(name, directory).get_many(
+        [f'shared:{i}' for i in range(keys)]
+    )
+    result.put(len(found) / keys)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает SQLiteCache с LocMemCache и FileBasedCache: время '
+        'операций и доля попаданий в кэш из другого процесса.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', type=int, default=2000,
+            help='Сколько раз повторить каждую операцию.',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=4,
+            help='Сколько процессов читают общий кэш.',
+        )
+
+    def handle(self, *args, count, processes, **options):
+        directory = tempfile.mkdtemp()
+        try:
+            self.stdout.write(
+                f'{"backend":<10} {"set":>8} {"get":>8} {"get_many":>9} '
+                f'{"incr":>8} {"shared":>7}   (мкс на операцию)'
+            )
+            for name in BACKENDS:
+                self.stdout.write(
+                    self.measure(name, directory, count, processes)
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def measure(self, name, directory, count, processes):
+        cache = open_backend(name, directory)
+        cache.clear()
+        keys = [f'key:{i}' for i in range(count)]
+        set_time = timed(lambda i: cache.set(keys[i], VALUE), count)
+        get_time = timed(lambda i: cache.get(keys[i]), count)
+        many_time = timed(
+            lambda i: cache.get_many(keys[i:i + 10]), count // 10 or 1
+        )
+        cache.set('counter', 0)
+        incr_time = timed(lambda i: cache.incr('counter'), count)
+
+        cache.set_many({f'shared:{i}': VALUE for i in range(100)})
+        context = multiprocessing.get_context('spawn')
+        result = context.Queue()
+        workers = [
+            context.Process(
+                target=read_shared, args=(name, directory, 100, result)
+            )
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        hit_rates = [result.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        shared = sum(hit_rates) / len(hit_rates)
+        return (
+            f'{name:<10} {set_time:>8.1f} {get_time:>8.1f} '
+            f'{many_time:>9.1f} {incr_time:>8.1f} {shared:>7.0%}'
+        )
@@ -0,0 +1,164 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+CACHED_LOADER = 'django.template.loaders.cached.Loader'
+PLAIN_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+@contextmanager
+def conn_max_age(seconds):
+    """Меняет CONN_MAX_AGE текущего соединения на время замера."""
+    old = connection.settings_dict['CONN_MAX_AGE']
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = seconds
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = old
+
+
+def templates_with_loaders(cached):
+    templates = []
+    for engine in settings.TEMPLATES:
+        options = dict(engine.get('OPTIONS', {}))
+        options['loaders'] = (
+            [(CACHED_LOADER, PLAIN_LOADERS)] if cached else PLAIN_LOADERS
+        )
+        templates.append({**engine, 'APP_DIRS': False, 'OPTIONS': options})
+    return templates
+
+
+def uses_cached_loader():
+    loaders = settings.TEMPLATES[0].get('OPTIONS', {}).get('loaders')
+    if loaders is None:
+        # Django 4.1+ включает cached loader сам, если loaders не заданы.
+        return True
+    return any(
+        isinstance(loader, (list, tuple)) and loader[0] == CACHED_LOADER
+        for loader in loaders
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет накладные расходы запроса для каждого middleware и '
+        'настроек DEBUG, загрузчика шаблонов, CONN_MAX_AGE и сессий.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='/about/tech/',
+            help='Страница, которую запрашивать.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Сколько запросов делать в каждом замере.',
+        )
+        parser.add_argument(
+            '--user', help='Выполнять запросы от имени пользователя.',
+        )
+
+    def handle(self, *args, url, requests, user, **options):
+        self.url = url
+        self.requests = requests
+        self.user = None
+        if user:
+            try:
+                self.user = get_user_model().objects.get(username=user)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'Пользователь {user} не найден')
+
+        baseline = self.measure(override_settings())
+        self.stdout.write(
+            f'{self.url}: {baseline:.3f} мс на запрос с текущими настройками'
+        )
+        self.stdout.write('Вклад middleware (мс):')
+        # Middleware зависят от предыдущих (auth от сессий), поэтому вклад
+        # каждого — разница между цепочками из первых k и k - 1 штук.
+        previous = self.measure(override_settings(MIDDLEWARE=[]))
+        for k, middleware in enumerate(settings.MIDDLEWARE, start=1):
+            current = self.measure(
+                override_settings(MIDDLEWARE=settings.MIDDLEWARE[:k])
+            )
+            self.stdout.write(f'{current - previous:+8.3f}  {middleware}')
+            previous = current
+        self.stdout.write(
+            'Цена текущего значения настройки против другого '
+            '(мс, минус — экономия):'
+        )
+        for name, current, other in self.setting_variants():
+            delta = self.measure(current) - self.measure(other)
+            self.stdout.write(f'{delta:+8.3f}  {name}')
+
+    def setting_variants(self):
+        """(название, текущие настройки, настройки с другим значением)."""
+        # debug_toolbar учтён среди middleware; без DEBUG он не работает,
+        # поэтому DEBUG сравнивается без него.
+        without_toolbar = [
+            item for item in settings.MIDDLEWARE
+            if not item.startswith('debug_toolbar.')
+        ]
+        yield (
+            f'DEBUG={settings.DEBUG}',
+            override_settings(MIDDLEWARE=without_toolbar),
+            override_settings(
+                MIDDLEWARE=without_toolbar, DEBUG=not settings.DEBUG
+            ),
+        )
+        cached = uses_cached_loader()
+        yield (
+            f'cached loader={cached}',
+            override_settings(),
+            override_settings(TEMPLATES=templates_with_loaders(not cached)),
+        )
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        yield (
+            f'CONN_MAX_AGE={max_age}',
+            override_settings(),
+            conn_max_age(0 if max_age else 60),
+        )
+        engine = settings.SESSION_ENGINE
+        other = (
+            'django.contrib.sessions.backends.db'
+            if engine.endswith('cached_db')
+            else 'django.contrib.sessions.backends.cached_db'
+        )
+        yield (
+            f'SESSION_ENGINE={engine}',
+            override_settings(),
+            override_settings(SESSION_ENGINE=other),
+        )
+
+    @staticmethod
+    def host():
+        hosts = [host for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0].lstrip('.') if hosts else 'testserver'
+
+    def measure(self, variant):
+        """Среднее время запроса в миллисекундах после прогрева."""
+        with variant:
+            client = Client(
+                REMOTE_ADDR='127.0.0.1', SERVER_NAME=self.host()
+            )
+            if self.user:
+                client.force_login(self.user)
+            for _ in range(min(self.requests, 10)):
+                client.get(self.url)
+            start = time.perf_counter()
+            for _ in range(self.requests):
+                response = client.get(self.url)
+            elapsed = time.perf_counter() - start
+        if response.status_code >= 400:
+            raise CommandError(f'{self.url}: ответ {response.status_code}')
+        return elapsed / self.requests * 1000
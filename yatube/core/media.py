@@ -0,0 +1,220 @@
+"""Отдача файлов из MEDIA_ROOT.
+
+Python здесь только проверяет запрос: путь,
+условные заголовки (If-None-Match, If-Modified-Since) и
+Range. Байты передаёт:
+
+- веб-сервер перед приложением, если задан
+  MEDIA_SENDFILE: 'x-accel-redirect' (nginx) — заголовок с
+  внутренним адресом файла MEDIA_ACCEL_REDIRECT_PREFIX +
+  путь; 'x-sendfile' (Apache с mod_xsendfile, lighttpd) —
+  заголовок с путём к файлу на диске. Range и
+  кэширующие заголовки сервер обрабатывает
+  сам;
+- иначе сам WSGI-сервер: ответ — FileResponse с
+  открытым файлом (или его частью для Range), у
+  которого есть fileno(), и wsgi.file_wrapper сервера
+  (gunicorn, uWSGI) передаёт его через sendfile без
+  копирования в Python. Без file_wrapper файл
+  читается кусками.
+"""
+import mimetypes
+import os
+import re
+import stat
+from http import HTTPStatus
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+SENDFILE_BACKENDS = ('x-accel-redirect', 'x-sendfile')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """Часть [start, start + length) открытого файла как
+    отдельный файл.
+
+    FileResponse читает её до конца, а file_wrapper
+    сервера берёт fileno() и текущую позицию и
+    отдаёт ровно Content-Length байт.
+    """
+
+    def __init__(self, file_, start, length):
+        self.file = file_
+        self.start = start
+        self.end = start + length
+        file_.seek(start)
+
+    def read(self, size=-1):
+        remaining = self.end - self.file.tell()
+        if remaining <= 0:
+            return b''
+        if size < 0 or size > remaining:
+            size = remaining
+        return self.file.read(size)
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.file.tell() - self.start
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {
+            os.SEEK_SET: self.start,
+            os.SEEK_CUR: self.file.tell(),
+            os.SEEK_END: self.end,
+        }[whence]
+        return self.file.seek(base + offset) - self.start
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def etag(file_stat):
+    """ETag по размеру и времени изменения, без
+    чтения файла.
+    """
+    return f'"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}"'
+
+
+def parse_range(header, size):
+    """(начало, длина) из заголовка Range для
+    файла размера size.
+
+    None — заголовок не разобран или
+    диапазонов несколько: отдаётся весь
+    файл. ValueError — диапазон за пределами
+    файла (416).
+    """
+    match = RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Суффикс: последние last байт.
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def range_applies(request, tag, last_modified):
+    """If-Range: диапазон отдаётся, только если
+    файл не изменился.
+    """
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == tag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def with_headers(response, headers):
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def sendfile_backend():
+    return getattr(settings, 'MEDIA_SENDFILE', None)
+
+
+def handoff(response, path, fullpath):
+    """Передаёт отдачу файла веб-серверу."""
+    backend = sendfile_backend()
+    if backend == 'x-accel-redirect':
+        prefix = getattr(
+            settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/internal-media/'
+        )
+        response['X-Accel-Redirect'] = prefix + quote(path)
+    elif backend == 'x-sendfile':
+        response['X-Sendfile'] = fullpath
+    else:
+        raise ValueError(
+            f'MEDIA_SENDFILE должен быть одним из '
+            f'{SENDFILE_BACKENDS}, а не {backend!r}'
+        )
+    return response
+
+
+def serve(request, path, document_root):
+    """Ответ с файлом path из document_root."""
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    # Скрытые файлы — недописанные загрузки
+    # хранилища (core.storage).
+    if any(part.startswith('.') for part in path.split('/')):
+        raise Http404
+    try:
+        file_stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise Http404
+    tag = etag(file_stat)
+    last_modified = int(file_stat.st_mtime)
+    headers = {
+        'ETag': tag,
+        'Last-Modified': http_date(last_modified),
+        'Accept-Ranges': 'bytes',
+    }
+    response = get_conditional_response(
+        request, etag=tag, last_modified=last_modified
+    )
+    if response is not None:
+        return with_headers(response, headers)
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    if sendfile_backend():
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return handoff(response, path, fullpath)
+    size = file_stat.st_size
+    span = None
+    if 'Range' in request.headers and range_applies(
+        request, tag, last_modified
+    ):
+        try:
+            span = parse_range(request.headers['Range'], size)
+        except ValueError:
+            return HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, 'Content-Range': f'bytes */{size}'},
+            )
+    file_ = open(fullpath, 'rb')
+    if span is None:
+        response = FileResponse(file_, content_type=content_type)
+    else:
+        start, length = span
+        response = FileResponse(
+            FileRange(file_, start, length),
+            content_type=content_type,
+            status=HTTPStatus.PARTIAL_CONTENT,
+        )
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    if encoding:
+        response['Content-Encoding'] = encoding
+    return with_headers(response, headers)
@@ -0,0 +1,126 @@
+"""Хранилище файлов с именами по содержимому.
+
+Файл сохраняется под именем из sha256 своего содержимого:
+
+    posts/photo.jpg -> posts/3f/3fa1...9c.jpg
+
+Одинаковые загрузки дают одно имя и хранятся одним файлом, а файл под
+таким именем никогда не меняется — его можно кэшировать навсегда
+(immutable). Удалять файл можно, только когда на него не осталось
+ссылок: это решает код, который хранит имена (posts.images.release),
+через delete_unreferenced.
+
+Производные файлы (версии в других форматах) сохраняются через
+save_derived под именем, выведенным из имени исходного файла.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 1024
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$')
+
+
+def content_hash(content):
+    """sha256 содержимого файла; файл остаётся в начале."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible(path='core.storage.ContentAddressedStorage')
+class ContentAddressedStorage(FileSystemStorage):
+
+    @staticmethod
+    def hashed_name(name, digest):
+        """Имя файла name с хешем digest: каталог и расширение сохраняются."""
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], f'{digest}{extension}')
+
+    @staticmethod
+    def is_hashed(name):
+        return bool(HASHED_NAME.search(name))
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя определяет содержимое, а не свободные имена.
+        return name
+
+    def _save(self, name, content):
+        name = self.hashed_name(name, content_hash(content))
+        if not self._reuse(name):
+            self._write(name, content)
+        return name
+
+    def _reuse(self, name):
+        """Обновляет время изменения готового файла; False, если его нет.
+
+        Свежее время изменения защищает файл от delete_unreferenced, пока
+        запись со ссылкой на него ещё не зафиксирована.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete_unreferenced(self, name, is_referenced, grace,
+                            written=None):
+        """Удаляет файл, если ссылок нет и его не загружали grace секунд.
+
+        Файл сначала переносится под временное имя, и проверка
+        повторяется. Загрузка того же содержимого после переноса не
+        найдёт файл и запишет его заново. Загрузка до переноса обновила
+        время изменения, и файл возвращается на место. Возвращает True,
+        если файл удалён.
+
+        written — st_mtime_ns файла сразу после того, как его записал
+        вызывающий код. Тогда grace не ждётся: файл удаляется, если его
+        с тех пор никто не загружал.
+        """
+        if is_referenced():
+            return False
+        path = self.path(name)
+        removed = os.path.join(
+            os.path.dirname(path), f'.{uuid.uuid4().hex}.deleted'
+        )
+        try:
+            os.replace(path, removed)
+        except FileNotFoundError:
+            return False
+        mtime_ns = os.stat(removed).st_mtime_ns
+        if written is None:
+            fresh = time.time() - mtime_ns / 1e9 < grace
+        else:
+            fresh = mtime_ns != written
+        if is_referenced() or fresh:
+            # Загрузка могла записать файл заново — содержимое то же.
+            os.replace(removed, path)
+            return False
+        os.remove(removed)
+        return True
+
+    def _write(self, name, content):
+        """Записывает файл целиком под временным именем и переименовывает.
+
+        Параллельная загрузка того же содержимого запишет такой же файл,
+        поэтому замена безопасна, а недописанный файл никто не увидит.
+        """
+        directory = os.path.dirname(name)
+        temporary = os.path.join(directory, f'.{uuid.uuid4().hex}.tmp')
+        temporary = super()._save(temporary, content)
+        os.replace(self.path(temporary), self.path(name))
+
+    def save_derived(self, name, content):
+        """Сохраняет производный файл под именем name, если его ещё нет."""
+        if not self.exists(name):
+            self._write(name, content)
+        return name
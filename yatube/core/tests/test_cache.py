@@ -0,0 +1,112 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_basic_operations(self):
+        """get/set/add/delete/get_many/set_many работают как у Django"""
+        self.cache.set('a', {'value': 1})
+        self.assertEqual(self.cache.get('a'), {'value': 1})
+        self.assertFalse(self.cache.add('a', 'другое'))
+        self.assertTrue(self.cache.add('b', 'б'))
+        self.cache.set_many({'c': [1, 2], 'd': None})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c', 'd', 'missing']),
+            {'a': {'value': 1}, 'b': 'б', 'c': [1, 2], 'd': None},
+        )
+        self.assertTrue(self.cache.delete('a'))
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.delete_many(['b', 'c'])
+        self.assertFalse(self.cache.has_key('b'))
+        self.assertEqual(self.cache.get_or_set('e', 5), 5)
+
+    def test_incr(self):
+        """incr меняет число атомарно и не трогает нечисловые значения"""
+        self.cache.set('n', 1)
+        self.assertEqual(self.cache.incr('n', 5), 6)
+        self.assertEqual(self.cache.decr('n'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('s', 'строка')
+        with self.assertRaises(TypeError):
+            self.cache.incr('s')
+        self.cache.set('flag', True)
+        self.assertIs(self.cache.get('flag'), True)
+
+    def test_integers_beyond_64_bits(self):
+        """Целые вне INTEGER SQLite сохраняются и увеличиваются"""
+        big = 2 ** 64
+        self.cache.set('big', big)
+        self.cache.set_many({'small': -big})
+        self.assertEqual(self.cache.get('big'), big)
+        self.assertEqual(self.cache.get_many(['small']), {'small': -big})
+        self.assertEqual(self.cache.incr('big'), big + 1)
+        self.cache.set('max', 2 ** 63 - 1)
+        self.assertEqual(self.cache.incr('max'), 2 ** 63)
+        self.assertEqual(self.cache.decr('max'), 2 ** 63 - 1)
+        self.assertEqual(self.cache.incr('max', -big), 2 ** 63 - 1 - big)
+
+    def test_timeout(self):
+        """Записи устаревают по таймауту, touch продлевает их"""
+        self.cache.set('short', 1, 10)
+        self.cache.set('none', 1, 0)
+        self.assertIsNone(self.cache.get('none'))
+        now = time.time()
+        with mock.patch('core.cache.time.time', return_value=now + 20):
+            self.assertIsNone(self.cache.get('short'))
+            self.assertTrue(self.cache.add('none', 1))
+        self.cache.set('long', 1, 10)
+        self.assertTrue(self.cache.touch('long', None))
+        with mock.patch('core.cache.time.time', return_value=now + 20):
+            self.assertEqual(self.cache.get('long'), 1)
+
+    def test_lru_eviction(self):
+        """Сверх MAX_ENTRIES удаляются давно не читанные записи"""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {
+                'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 4, 'CULL_EVERY': 1,
+                'LRU_RESOLUTION': 0,
+            },
+        })
+        for i in range(4):
+            cache.set(f'k{i}', i)
+        cache.get('k0')
+        cache.set('k4', 4)
+        self.assertEqual(cache.get('k0'), 0)
+        self.assertIsNone(cache.get('k1'))
+        self.assertEqual(cache.get('k4'), 4)
+
+    def test_shared_between_processes(self):
+        """Процессы видят общие записи и не теряют incr"""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
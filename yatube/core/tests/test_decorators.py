@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.decorators import QueryBudgetExceeded, query_budget
+
+User = get_user_model()
+
+
+@query_budget(1)
+def one_query_view(request, queries):
+    for _ in range(queries):
+        list(User.objects.all())
+    return HttpResponse()
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    @override_settings(QUERY_BUDGET_ENFORCED=True)
+    def test_within_budget(self):
+        """View в пределах бюджета отвечает как обычно"""
+        response = one_query_view(self.request, 1)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(QUERY_BUDGET_ENFORCED=True)
+    def test_over_budget_lists_queries(self):
+        """Превышение бюджета поднимает исключение со списком запросов"""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'auth_user'):
+            one_query_view(self.request, 2)
+
+    @override_settings(QUERY_BUDGET_ENFORCED=False)
+    def test_not_enforced(self):
+        """Без QUERY_BUDGET_ENFORCED бюджет не проверяется"""
+        response = one_query_view(self.request, 2)
+        self.assertEqual(response.status_code, 200)
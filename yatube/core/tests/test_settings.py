@@ -0,0 +1,38 @@
+import importlib
+import os
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+
+class ProductionSettingsTest(SimpleTestCase):
+    def test_production_profile(self):
+        """Боевые настройки без отладки, с cached loader и CONN_MAX_AGE"""
+        with mock.patch.dict(os.environ, {'YATUBE_SECRET_KEY': 'secret'}):
+            production = importlib.import_module('yatube.settings_production')
+            importlib.reload(production)
+        self.assertFalse(production.DEBUG)
+        self.assertEqual(production.SECRET_KEY, 'secret')
+        self.assertNotIn('debug_toolbar', production.INSTALLED_APPS)
+        self.assertFalse(
+            any('debug_toolbar' in item for item in production.MIDDLEWARE)
+        )
+        loaders = production.TEMPLATES[0]['OPTIONS']['loaders']
+        self.assertEqual(loaders[0][0], 'django.template.loaders.cached.Loader')
+        database = production.DATABASES['default']
+        self.assertGreater(database['CONN_MAX_AGE'], 0)
+        self.assertTrue(database['CONN_HEALTH_CHECKS'])
+
+
+class BenchmarkOverheadTest(TestCase):
+    def test_reports_each_middleware_and_setting(self):
+        """Команда выводит вклад каждого middleware и настройки"""
+        out = StringIO()
+        call_command('benchmark_overhead', requests=2, stdout=out)
+        output = out.getvalue()
+        for name in ('SessionMiddleware', 'DEBUG=', 'cached loader=',
+                     'CONN_MAX_AGE=', 'SESSION_ENGINE='):
+            with self.subTest(name=name):
+                self.assertIn(name, output)
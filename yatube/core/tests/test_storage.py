@@ -0,0 +1,264 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core.storage import ContentAddressedStorage
+from core.views import IMMUTABLE_MAX_AGE
+
+
+def deny_all(request, path):
+    return False
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_name_from_content(self):
+        """Имя файла — sha256 содержимого в каталоге из upload_to"""
+        name = self.storage.save('posts/photo.JPG', ContentFile(b'photo'))
+        self.assertRegex(name, r'^posts/([0-9a-f]{2})/\1[0-9a-f]{62}\.jpg$')
+        self.assertTrue(self.storage.is_hashed(name))
+        self.assertFalse(self.storage.is_hashed('posts/photo.jpg'))
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом"""
+        first = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        second = self.storage.save('posts/b.jpg', ContentFile(b'photo'))
+        other = self.storage.save('posts/c.jpg', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
+
+    def test_save_derived_keeps_name(self):
+        """Производный файл сохраняется под заданным именем один раз"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        webp = name.replace('.jpg', '.webp')
+        self.assertEqual(
+            self.storage.save_derived(webp, ContentFile(b'webp')), webp
+        )
+        self.storage.save_derived(webp, ContentFile(b'changed'))
+        with self.storage.open(webp) as file_:
+            self.assertEqual(file_.read(), b'webp')
+
+    def test_delete_unreferenced(self):
+        """Файл удаляется без ссылок и остаётся, если ссылка появилась"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        path = self.storage.path(name)
+        os.utime(path, (0, 0))
+        # Ссылка появилась между первой и второй проверкой.
+        answers = iter([False, True])
+        self.assertFalse(self.storage.delete_unreferenced(
+            name, lambda: next(answers), grace=60
+        ))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(
+            os.listdir(os.path.dirname(path)), [os.path.basename(path)]
+        )
+        self.assertTrue(
+            self.storage.delete_unreferenced(name, lambda: False, grace=60)
+        )
+        self.assertFalse(self.storage.exists(name))
+
+    def test_delete_own_file_without_grace(self):
+        """Свой свежий файл удаляется сразу, если его не загружали снова"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        path = self.storage.path(name)
+        os.utime(path, ns=(0, 10 ** 9))
+        written = os.stat(path).st_mtime_ns
+        # Та же загрузка ещё раз обновляет время изменения.
+        self.storage.save('posts/b.jpg', ContentFile(b'photo'))
+        self.assertFalse(self.storage.delete_unreferenced(
+            name, lambda: False, grace=60, written=written
+        ))
+        written = os.stat(path).st_mtime_ns
+        self.assertTrue(self.storage.delete_unreferenced(
+            name, lambda: False, grace=60, written=written
+        ))
+        self.assertFalse(self.storage.exists(name))
+
+
+class MediaViewTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.storage = ContentAddressedStorage(location=self.directory)
+        self.settings = override_settings(MEDIA_ROOT=self.directory)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_hashed_files_cached_forever(self):
+        """Файлы с именами по содержимому отдаются как immutable"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn(f'max-age={IMMUTABLE_MAX_AGE}', response['Cache-Control'])
+
+    def test_other_files_not_immutable(self):
+        """Файлы со старыми именами не кэшируются навсегда"""
+        os.makedirs(os.path.join(self.directory, 'posts'))
+        with open(os.path.join(self.directory, 'posts/a.jpg'), 'wb') as file_:
+            file_.write(b'photo')
+        response = self.client.get('/media/posts/a.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Cache-Control', response)
+
+    def test_access_policy(self):
+        """Политика доступа решает по запросу и пути, отказ — 404"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        calls = []
+
+        def policy(request, path):
+            calls.append(path)
+            return request.GET.get('token') == 'secret'
+
+        with override_settings(MEDIA_ACCESS_POLICY=policy):
+            denied = self.client.get(f'/media/{name}')
+            allowed = self.client.get(f'/media/{name}', {'token': 'secret'})
+        self.assertEqual(denied.status_code, 404)
+        self.assertEqual(allowed.status_code, 200)
+        self.assertEqual(calls, [name, name])
+        self.assertIn('private', allowed['Cache-Control'])
+        self.assertNotIn('public', allowed['Cache-Control'])
+
+    def test_access_policy_by_path(self):
+        """MEDIA_ACCESS_POLICY может быть путём к функции"""
+        name = self.storage.save('posts/a.jpg', ContentFile(b'photo'))
+        with override_settings(
+            MEDIA_ACCESS_POLICY='core.tests.test_storage.deny_all'
+        ):
+            response = self.client.get(f'/media/{name}')
+        self.assertEqual(response.status_code, 404)
+
+
+class MediaDeliveryTest(SimpleTestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, 'posts'))
+        with open(os.path.join(self.directory, 'posts/a.bin'), 'wb') as file_:
+            file_.write(self.content)
+        self.settings = override_settings(MEDIA_ROOT=self.directory)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get(self, **headers):
+        return self.client.get('/media/posts/a.bin', headers=headers)
+
+    def test_full_file(self):
+        """Без Range отдаётся весь файл с ETag и Accept-Ranges"""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+
+    def test_ranges(self):
+        """Range отдаёт только запрошенные байты со статусом 206"""
+        size = len(self.content)
+        cases = {
+            'bytes=0-9': (0, 10),
+            'bytes=100-': (100, size - 100),
+            'bytes=-16': (size - 16, 16),
+            f'bytes=1000-{size * 2}': (1000, size - 1000),
+        }
+        for header, (start, length) in cases.items():
+            with self.subTest(header=header):
+                response = self.get(range=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content),
+                    self.content[start:start + length],
+                )
+                self.assertEqual(response['Content-Length'], str(length))
+                self.assertEqual(
+                    response['Content-Range'],
+                    f'bytes {start}-{start + length - 1}/{size}',
+                )
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла — 416 с размером файла"""
+        response = self.get(range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(
+            response['Content-Range'], f'bytes */{len(self.content)}'
+        )
+
+    def test_unparsed_range_ignored(self):
+        """Несколько диапазонов не поддерживаются: отдаётся весь файл"""
+        response = self.get(range='bytes=0-1,5-6')
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_range(self):
+        """If-Range с устаревшим ETag отменяет Range"""
+        etag = self.get()['ETag']
+        self.assertEqual(
+            self.get(range='bytes=0-9', if_range=etag).status_code, 206
+        )
+        self.assertEqual(
+            self.get(range='bytes=0-9', if_range='"old"').status_code, 200
+        )
+
+    def test_conditional_get(self):
+        """Неизменённый файл — 304 без тела"""
+        first = self.get()
+        cases = {
+            'if_none_match': first['ETag'],
+            'if_modified_since': first['Last-Modified'],
+        }
+        for header, value in cases.items():
+            with self.subTest(header=header):
+                response = self.get(**{header: value})
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], first['ETag'])
+
+    def test_hidden_and_missing_files(self):
+        """Скрытые файлы, каталоги и пути вне MEDIA_ROOT не отдаются"""
+        with open(os.path.join(self.directory, 'posts/.tmp'), 'wb') as file_:
+            file_.write(b'partial')
+        for path in ['posts/.tmp', 'posts', 'posts/b.bin', '../settings.py']:
+            with self.subTest(path=path):
+                response = self.client.get(f'/media/{path}')
+                self.assertEqual(response.status_code, 404)
+
+    def test_x_accel_redirect(self):
+        """С nginx Python отдаёт только заголовок с внутренним адресом"""
+        with self.settings_for('x-accel-redirect'):
+            response = self.get(range='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/internal-media/posts/a.bin'
+        )
+
+    def test_x_sendfile(self):
+        """С X-Sendfile заголовок содержит путь к файлу на диске"""
+        with self.settings_for('x-sendfile'):
+            response = self.get()
+        self.assertEqual(response.content, b'')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(self.directory, 'posts/a.bin'),
+        )
+
+    def settings_for(self, backend):
+        return override_settings(
+            MEDIA_SENDFILE=backend,
+            MEDIA_ACCEL_REDIRECT_PREFIX='/internal-media/',
+        )
@@ -1,4 +1,7 @@
-from django.urls import path
+import re
+
+from django.conf import settings
+from django.urls import path, re_path
 from core import views
 
 app_name = 'core'
@@ -6,4 +9,9 @@ app_name = 'core'
 urlpatterns = [
     path('404/', views.page_not_found, name='404'),
     path('403/', views.csrf_failure, name='403'),
+    re_path(
+        rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.*)$',
+        views.media,
+        name='media',
+    ),
 ]
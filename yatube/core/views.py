@@ -1,5 +1,16 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.utils.module_loading import import_string
 from http import HTTPStatus
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from core import media as media_files
+from core.storage import ContentAddressedStorage
+
+# Год — наибольший срок, который учитывают браузеры и прокси.
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
 
 
 def page_not_found(request, exception):
@@ -17,3 +28,40 @@ def csrf_failure(request, reason=''):
         'core/403csrf.html',
         status=HTTPStatus.FORBIDDEN
     )
+
+
+def media_policy():
+    """Функция MEDIA_ACCESS_POLICY или None, если доступ не ограничен."""
+    policy = getattr(settings, 'MEDIA_ACCESS_POLICY', None)
+    if isinstance(policy, str):
+        policy = import_string(policy)
+    return policy
+
+
+def media(request, path):
+    """Файл из MEDIA_ROOT (отдачу байтов см. в core.media).
+
+    Без MEDIA_ACCESS_POLICY любой файл отдаётся любому посетителю, как
+    раньше static() в режиме DEBUG. Функция политики получает запрос и
+    путь; если она вернула False, ответ — 404, чтобы не раскрывать,
+    есть ли файл. С политикой ответы кэшируются только браузером.
+
+    Файлы с именами по содержимому и миниатюры (их имена выводятся из
+    имени картинки) никогда не меняются и кэшируются навсегда.
+    """
+    policy = media_policy()
+    if policy is not None and not policy(request, path):
+        raise Http404
+    response = media_files.serve(
+        request, path, document_root=settings.MEDIA_ROOT
+    )
+    if (ContentAddressedStorage.is_hashed(path)
+            or path.startswith(thumbnail_settings.THUMBNAIL_PREFIX)):
+        visibility = 'public' if policy is None else 'private'
+        patch_cache_control(
+            response,
+            max_age=IMMUTABLE_MAX_AGE,
+            immutable=True,
+            **{visibility: True},
+        )
+    return response
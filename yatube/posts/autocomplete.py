@@ -0,0 +1,132 @@
+"""Префиксные подсказки для названий групп и адресов.
+
+Значения нормализуются (регистр, ё, пунктуация, пробелы) и хранятся в
+AutocompleteEntry с весом — числом объектов, у которых это значение.
+Сигналы меняют вес при создании, изменении и удалении групп и постов.
+"""
+import re
+from collections import Counter
+
+from django.db.models import Case, F, When
+
+from .models import AutocompleteEntry
+
+MAX_KEY_LENGTH = 200
+RESULTS_LIMIT = 10
+
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """Строка в нижнем регистре, без пунктуации, слова через пробел."""
+    text = (text or '').lower().replace('ё', 'е')
+    return NON_WORD.sub(' ', text).strip()
+
+
+def keys(value):
+    """Ключи значения: нормализованный текст от начала каждого слова."""
+    words = normalize(value).split()
+    return {
+        ' '.join(words[i:])[:MAX_KEY_LENGTH] for i in range(len(words))
+    }
+
+
+def _value(value):
+    return value.strip()[:MAX_KEY_LENGTH]
+
+
+def rows(kind, values):
+    """Строки (kind, key, value, weight) для пересборки по списку значений."""
+    counts = Counter(_value(value) for value in values if normalize(value))
+    return [
+        (kind, key, value, weight)
+        for value, weight in counts.items()
+        for key in keys(value)
+    ]
+
+
+def fill(model, kind, values, batch_size=1000):
+    """Заполняет таблицу model ключами значений с нуля.
+
+    model передаётся явно, чтобы функцией пользовалась и миграция
+    со своей исторической моделью.
+    """
+    model.objects.filter(kind=kind).delete()
+    entries = [
+        model(kind=kind, key=key, value=value, weight=weight)
+        for kind, key, value, weight in rows(kind, values)
+    ]
+    model.objects.bulk_create(entries, batch_size=batch_size)
+    return len(entries)
+
+
+def add(kind, value):
+    if not normalize(value):
+        return
+    value = _value(value)
+    AutocompleteEntry.objects.bulk_create(
+        [
+            AutocompleteEntry(kind=kind, key=key, value=value)
+            for key in keys(value)
+        ],
+        ignore_conflicts=True,
+    )
+    AutocompleteEntry.objects.filter(kind=kind, value=value).update(
+        weight=F('weight') + 1
+    )
+
+
+def add_many(kind, values):
+    """Учитывает значения у нескольких новых объектов разом."""
+    counts = Counter(_value(value) for value in values if normalize(value))
+    if not counts:
+        return
+    AutocompleteEntry.objects.bulk_create(
+        [
+            AutocompleteEntry(kind=kind, key=key, value=value)
+            for value in counts
+            for key in keys(value)
+        ],
+        ignore_conflicts=True,
+    )
+    AutocompleteEntry.objects.filter(kind=kind, value__in=counts).update(
+        weight=F('weight') + Case(
+            *[
+                When(value=value, then=count)
+                for value, count in counts.items()
+            ],
+            default=0,
+        )
+    )
+
+
+def remove(kind, value):
+    if not normalize(value):
+        return
+    value = _value(value)
+    entries = AutocompleteEntry.objects.filter(kind=kind, value=value)
+    entries.update(weight=F('weight') - 1)
+    entries.filter(weight__lte=0).delete()
+
+
+def replace(kind, old, new):
+    """Учитывает смену значения у одного объекта."""
+    if (old or '').strip() == (new or '').strip():
+        return
+    remove(kind, old)
+    add(kind, new)
+
+
+def suggest(kind, query, limit=RESULTS_LIMIT):
+    """Самые частые значения, у которых слово начинается с query."""
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    # У значения по ключу на слово, и вес у всех ключей один, поэтому
+    # DISTINCT по (value, weight) оставляет значение один раз.
+    entries = AutocompleteEntry.objects.filter(
+        kind=kind, key__gte=prefix, key__lt=prefix + '\U0010ffff'
+    ).values_list('value', 'weight').distinct().order_by(
+        '-weight', 'value'
+    )[:limit]
+    return [value for value, _ in entries]
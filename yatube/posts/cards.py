@@ -0,0 +1,83 @@
+"""Кэш отрисованных карточек постов для лент.
+
+Карточка (includes/product_card.html) кэшируется целиком под ключом из
+id поста и версии. Версия — отпечаток того, что попадает в карточку:
+updated_at, картинки и её превью, имени автора, названия и адреса группы.
+Поэтому правка поста или переименование группы и автора просто
+меняют ключ. Страница ленты собирается одним get_many по всем
+карточкам; миниатюры для отсутствующих находятся разом
+(thumbnails.prefetch), а сами они отрисовываются и сохраняются одним
+set_many.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+TEMPLATE = 'includes/product_card.html'
+# Сколько первых карточек страницы видно без прокрутки: их картинки
+# загружаются сразу, остальные — лениво (loading="lazy").
+EAGER_CARDS = 1
+
+
+def version(post):
+    """Отпечаток полей поста, автора и группы, видимых в карточке."""
+    parts = [
+        post.updated_at.isoformat() if post.updated_at else '',
+        post.image.name or '',
+        post.image_preview,
+        post.author.username,
+        post.author.get_full_name(),
+    ]
+    if post.group_id is not None:
+        parts += [post.group.slug, post.group.title]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def card_key(post, lazy=False):
+    key = f'posts:card:{post.pk}:{version(post)}'
+    return f'{key}:lazy' if lazy else key
+
+
+def render_card(post, lazy=False):
+    return render_to_string(TEMPLATE, {'post': post, 'lazy': lazy})
+
+
+def render_cards(posts):
+    """HTML карточек постов в том же порядке.
+
+    Карточки с фрагментом поиска зависят от запроса и не кэшируются,
+    как и карточки с заглушкой вместо ещё не готовой миниатюры.
+    """
+    posts = list(posts)
+    lazy = {
+        post.pk: position >= EAGER_CARDS
+        for position, post in enumerate(posts)
+    }
+    keys = {
+        post.pk: card_key(post, lazy[post.pk])
+        for post in posts
+        if not getattr(post, 'search_snippet', None)
+    }
+    cached = cache.get_many(keys.values())
+    thumbnails.prefetch(
+        [post for post in posts if cached.get(keys.get(post.pk)) is None],
+        'card',
+    )
+    missing = {}
+    cards = []
+    for post in posts:
+        key = keys.get(post.pk)
+        card = cached.get(key) if key else None
+        if card is None:
+            card = render_card(post, lazy[post.pk])
+            if key and thumbnails.is_ready(post, 'card'):
+                missing[key] = card
+        cards.append(card)
+    if missing:
+        timeout = getattr(settings, 'POSTS_CARD_CACHE_TIMEOUT', 60 * 60 * 24)
+        cache.set_many(missing, timeout)
+    return cards
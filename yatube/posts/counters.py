@@ -0,0 +1,194 @@
+"""Подсчёт количества постов для постраничного вывода.
+
+Точные счётчики для ленты, групп и авторов хранятся в кэше и
+изменяются сигналами при создании и удалении постов. Счётчики для
+отфильтрованных выборок ограничены сверху («более N») и сбрасываются
+вместе с кэшем результатов фильтров (filter_cache). Если точный подсчёт
+не укладывается в бюджет времени, возвращается оценка.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, transaction
+
+from . import filter_cache
+
+INDEX_SCOPE = 'index'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """Области, в которые попадает пост."""
+    scopes = [INDEX_SCOPE, author_scope(post.author_id)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _count_key(scope):
+    return f'posts:count:{scope}'
+
+
+def _estimate_key(scope):
+    return f'posts:count:{scope}:estimate'
+
+
+def _filtered_key(scope, signature):
+    version = filter_cache.version()
+    return f'posts:count:{scope}:v{version}:{signature}'
+
+
+class TotalCount:
+    """Количество записей: точное, ограниченное снизу или оценка."""
+
+    def __init__(self, value, exact=True, estimated=False):
+        self.value = value
+        self.exact = exact
+        self.estimated = estimated
+
+    def __int__(self):
+        return self.value
+
+    def __eq__(self, other):
+        if isinstance(other, TotalCount):
+            return (self.value, self.exact, self.estimated) == (
+                other.value, other.exact, other.estimated
+            )
+        return self.exact and self.value == other
+
+    def __str__(self):
+        if self.exact:
+            return str(self.value)
+        if self.estimated:
+            return f'≈{self.value}'
+        return f'более {self.value}'
+
+    def __repr__(self):
+        return f'<TotalCount {self}>'
+
+
+@contextmanager
+def time_budget(using, seconds):
+    """Прерывает запросы внутри блока, если они идут дольше seconds.
+
+    Превышение бюджета поднимает DatabaseError.
+    """
+    connection = connections[using]
+    if seconds is None:
+        yield
+    elif connection.vendor == 'sqlite':
+        deadline = time.monotonic() + seconds
+        connection.ensure_connection()
+        connection.connection.set_progress_handler(
+            lambda: time.monotonic() > deadline, 1000
+        )
+        try:
+            yield
+        finally:
+            connection.connection.set_progress_handler(None, 0)
+    elif connection.vendor == 'postgresql':
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET LOCAL statement_timeout = %s',
+                    [max(int(seconds * 1000), 1)]
+                )
+            yield
+    else:
+        yield
+
+
+def capped_count(queryset, cap):
+    """Считает не больше cap + 1 строк: «не меньше cap» вместо COUNT(*)."""
+    value = queryset.order_by()[:cap + 1].count()
+    if value > cap:
+        return TotalCount(cap, exact=False)
+    return TotalCount(value)
+
+
+def estimate_count(queryset):
+    """Оценка количества строк по плану запроса, без их перебора."""
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return TotalCount(
+            int(plan[0]['Plan']['Plan Rows']), exact=False, estimated=True
+        )
+    return capped_count(queryset, _setting('POSTS_COUNT_CAP', 1000))
+
+
+def _budgeted(count, queryset):
+    budget = _setting('POSTS_COUNT_TIME_BUDGET', 0.05)
+    try:
+        with time_budget(queryset.db, budget):
+            return count(queryset)
+    except DatabaseError:
+        return estimate_count(queryset)
+
+
+def total_count(queryset, scope=None, signature=''):
+    """Количество постов для постраничного вывода.
+
+    scope — область выборки (лента, группа, автор), signature —
+    каноническая запись фильтра. Без scope счётчик не кэшируется.
+    """
+    timeout = _setting('POSTS_COUNT_CACHE_TIMEOUT', 60 * 60)
+    if signature:
+        cap = _setting('POSTS_COUNT_CAP', 1000)
+        key = _filtered_key(scope, signature) if scope else None
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            return TotalCount(*cached)
+        total = _budgeted(lambda qs: capped_count(qs, cap), queryset)
+        if key:
+            cache.set(
+                key, (total.value, total.exact, total.estimated), timeout
+            )
+        return total
+
+    if scope is None:
+        return _budgeted(lambda qs: TotalCount(qs.count()), queryset)
+    value = cache.get(_count_key(scope))
+    if value is not None:
+        return TotalCount(value)
+    estimate = cache.get(_estimate_key(scope))
+    if estimate is not None:
+        return TotalCount(*estimate)
+    total = _budgeted(lambda qs: TotalCount(qs.count()), queryset)
+    if total.exact:
+        cache.set(_count_key(scope), total.value, timeout)
+    else:
+        cache.set(
+            _estimate_key(scope), (total.value, False, total.estimated),
+            timeout
+        )
+    return total
+
+
+def adjust_count(scope, delta):
+    """Сдвигает закэшированный точный счётчик области, если он есть."""
+    try:
+        cache.incr(_count_key(scope), delta)
+    except ValueError:
+        pass
+
+
+def forget_count(scope):
+    cache.delete_many([_count_key(scope), _estimate_key(scope)])
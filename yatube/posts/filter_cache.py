@@ -0,0 +1,73 @@
+"""Кэш результатов PostFilter.
+
+Результат фильтра хранится как упорядоченный список id под ключом из
+канонической записи параметров (PostFilter.signature), и все страницы
+выдачи режутся из этого списка. Ключ включает поколение области
+SCOPE (см. generations): создание, удаление поста или изменение полей,
+по которым фильтруют, начинают новое поколение, и старые записи просто
+перестают читаться.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from . import generations, search
+
+SCOPE = 'filter'
+# Поля поста, от которых зависит результат PostFilter и порядок выдачи.
+FIELDS = ('title', 'text', 'cost', 'pub_date', 'end_date')
+
+
+def version():
+    return generations.generation(SCOPE)
+
+
+def invalidate():
+    """Сбрасывает все закэшированные результаты фильтров."""
+    generations.bump(SCOPE)
+
+
+def snapshot(post):
+    """Значения полей FIELDS, загруженные в объект поста."""
+    return tuple(post.__dict__.get(field) for field in FIELDS)
+
+
+def _key(signature):
+    return f'posts:filter:v{version()}:{signature}'
+
+
+def _compute(post_filter):
+    queryset = post_filter.qs
+    expression = post_filter.search_expression
+    if expression:
+        # Ранжируются только посты фильтра, иначе лимит по рангу
+        # отсекал бы подходящие под остальные условия посты.
+        ranked = search.ranked_ids(
+            expression, search.RANKED_LIMIT + 1, queryset.db, queryset
+        )
+        return (
+            ranked[:search.RANKED_LIMIT],
+            len(ranked) > search.RANKED_LIMIT,
+        )
+    limit = getattr(settings, 'POSTS_FILTER_CACHE_LIMIT', 1000)
+    ids = list(
+        queryset.order_by('-pub_date', '-pk').values_list(
+            'pk', flat=True
+        )[:limit + 1]
+    )
+    return ids[:limit], len(ids) > limit
+
+
+def result_ids(post_filter):
+    """Список id постов фильтра и признак того, что он обрезан.
+
+    Поисковые фильтры упорядочены по релевантности, остальные — от новых
+    к старым. Список ограничен RANKED_LIMIT или POSTS_FILTER_CACHE_LIMIT.
+    """
+    key = _key(post_filter.signature)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    result = _compute(post_filter)
+    timeout = getattr(settings, 'POSTS_FILTER_CACHE_TIMEOUT', 60 * 10)
+    cache.set(key, result, timeout)
+    return result
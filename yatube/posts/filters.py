@@ -1,14 +1,111 @@
+import hashlib
+
+from django.db import connections
+from django.db.models import Func
+from django.db.models.expressions import RawSQL
+from django.utils.http import urlencode
+
+from . import search
 from .models import Post
 from django_filters import FilterSet, DateFromToRangeFilter, NumberFilter, CharFilter, DateFilter
 
 
+# Поля с индексами, которые фильтр сравнивает диапазоном (см. scan_qs).
+INDEXED_RANGES = ('cost', 'end_date')
+
+
+class Unindexed(Func):
+    """Поле, условие на которое SQLite не ищет по индексу (унарный +)."""
+    template = '+%(expressions)s'
+
+
 class PostFilter(FilterSet):
     cost_lt = NumberFilter(label='Цена', field_name='cost', lookup_expr='lt')
-    title = CharFilter(label='Заголовок', lookup_expr='icontains')
-    text = CharFilter(label='Текст поста', lookup_expr='icontains')
+    title = CharFilter(label='Заголовок', method='filter_search')
+    text = CharFilter(label='Текст поста', method='filter_search')
     date_start = DateFilter(label='Дата начала', field_name='pub_date', lookup_expr='gt')
     date_end = DateFilter(label='Дата окончания', field_name='end_date', lookup_expr='lt')
 
     class Meta:
         model = Post
         fields = ['title', 'text', 'cost_lt', 'date_start', 'date_end']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.search_terms = {}
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по полю, без FTS5 — icontains."""
+        expression = search.match_expression(value, column=name)
+        if not search.is_enabled(queryset.db) or not expression:
+            return queryset.filter(**{f'{name}__icontains': value})
+        self.search_terms[name] = value
+        return queryset.filter(
+            pk__in=RawSQL(search.match_sql(), [expression])
+        )
+
+    def scan_qs(self):
+        """qs, который читается по индексу даты, а не по условиям.
+
+        Для фильтра, под который подходит больше постов, чем хранит
+        filter_cache, страница с LIMIT быстрее всего находится чтением
+        ленты от новых постов. По индексу цены или даты окончания SQLite
+        выбрал бы все подходящие посты и сортировал бы их по дате.
+        """
+        queryset = self.queryset.all()
+        sqlite = connections[queryset.db].vendor == 'sqlite'
+        for name, value in self.form.cleaned_data.items():
+            post_filter = self.filters[name]
+            field = post_filter.field_name
+            if not sqlite or field not in INDEXED_RANGES or value is None:
+                queryset = post_filter.filter(queryset, value)
+                continue
+            alias = f'{field}_unindexed'
+            queryset = queryset.alias(**{alias: Unindexed(field)}).filter(
+                **{f'{alias}__{post_filter.lookup_expr}': value}
+            )
+        return queryset
+
+    @property
+    def search_expression(self):
+        """Выражение FTS5 для ранжирования, '' без поисковых полей."""
+        return ' AND '.join(
+            search.match_expression(value, column=name)
+            for name, value in sorted(self.search_terms.items())
+        )
+
+    @property
+    def search_query(self):
+        return ' '.join(self.search_terms.values())
+
+    @property
+    def canonical_params(self):
+        """Непустые параметры фильтра в каноническом виде и порядке.
+
+        Для формы с ошибками — введённые значения как есть, чтобы
+        показать ошибки по тому же адресу.
+        """
+        if not self.is_bound:
+            return []
+        if self.form.is_valid():
+            values = self.form.cleaned_data.items()
+        else:
+            values = (
+                (name, self.data.get(name, '').strip())
+                for name in self.filters
+            )
+        return sorted(
+            (name, str(value))
+            for name, value in values
+            if value not in (None, '')
+        )
+
+    @property
+    def signature(self):
+        """Отпечаток применённых фильтров, '' без фильтров."""
+        if not self.is_bound or not self.form.is_valid():
+            return ''
+        params = self.canonical_params
+        if not params:
+            return ''
+        return hashlib.sha1(urlencode(params).encode()).hexdigest()
@@ -0,0 +1,78 @@
+"""Счётчики поколений для инвалидации кэша.
+
+У каждой области — всё (global), группа, автор, пост, лента
+подписчика (follower) — есть счётчик поколения в кэше. Сигналы
+увеличивают счётчики областей, которые задевает запись, а ключи кэша
+строятся из текущих поколений. После записи ключ меняется, и старые
+значения больше не читаются, поэтому кэшировать можно на часы.
+Потерянный счётчик начинается заново со значения от текущего времени,
+а не с 1, чтобы не совпасть со старыми ключами, которые ещё в кэше.
+
+    key = generations.make_key('profile', [author_scope(pk)], cursor)
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+GLOBAL = 'global'
+PREFIX = 'posts:gen:'
+
+
+def group(group_id):
+    return f'group:{group_id}'
+
+
+def author(author_id):
+    return f'author:{author_id}'
+
+
+def post(post_id):
+    return f'post:{post_id}'
+
+
+def follower(user_id):
+    """Лента подписок пользователя user_id."""
+    return f'follower:{user_id}'
+
+
+def _initial():
+    return time.time_ns() // 1000
+
+
+def generations(scopes):
+    """Текущие поколения областей в том же порядке, одним get_many."""
+    keys = [PREFIX + scope for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _initial() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def generation(scope):
+    return generations([scope])[0]
+
+
+def bump(*scopes):
+    """Начинает новое поколение областей."""
+    for scope in set(scopes):
+        try:
+            cache.incr(PREFIX + scope)
+        except ValueError:
+            cache.set(PREFIX + scope, _initial(), None)
+
+
+def stamp(scopes):
+    """Строка поколений областей для ключа кэша."""
+    return '.'.join(
+        f'{scope}={value}'
+        for scope, value in zip(scopes, generations(scopes))
+    )
+
+
+def make_key(name, scopes, *parts):
+    """Ключ кэша, который меняется с поколением любой из областей."""
+    raw = '|'.join([stamp(scopes), *map(str, parts)])
+    return f'posts:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
@@ -0,0 +1,355 @@
+"""Импорт постов из ленты партнёров.
+
+Лента — NDJSON, объект на строку:
+
+    {"text": "...", "author": "username", "group": "slug",
+     "title": "...", "address": "...", "cost": 100,
+     "end_date": "2024-06-01", "image": "photos/1.jpg"}
+
+Обязательны text и author; image — путь к файлу
+относительно каталога картинок, пути за
+его пределы отклоняются. Вместо Post.objects.create
+на каждую строку импорт идёт пачками:
+
+- строки проверяются полями модели (clean),
+  ошибки не останавливают импорт, а
+  возвращаются с номером строки;
+- авторы и группы пачки находятся двумя
+  запросами;
+- картинки обрабатываются (posts.images.process) и
+  сохраняются в хранилище в пуле потоков:
+  Pillow отпускает GIL при раскодировании и
+  сжатии, поэтому картинки обрабатываются
+  параллельно;
+- посты пачки записываются одним bulk_create в
+  своей транзакции; если она не удалась,
+  новые файлы картинок пачки удаляются.
+
+bulk_create не вызывает сигналы post_save, поэтому
+after_create делает для всей пачки то же, что
+сигналы делают для одного поста.
+
+Номер последней записанной строки
+сохраняется в файл контрольной точки, и
+прерванный импорт продолжается с неё.
+Пачка, записанная перед самым сбоем, может
+быть импортирована повторно.
+"""
+import json
+import os
+from collections import Counter, namedtuple
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from . import (
+    autocomplete, counters, filter_cache, generations, images, markers,
+    search, thumbnails, timeline,
+)
+from core.storage import content_hash
+
+from .models import AutocompleteEntry, Group, Post, User
+
+BATCH_SIZE = 500
+FIELDS = ('title', 'text', 'address', 'cost', 'end_date')
+KEYS = FIELDS + ('author', 'group', 'image')
+
+Row = namedtuple('Row', 'line data')
+Failure = namedtuple('Failure', 'line messages')
+Ingested = namedtuple('Ingested', 'name size preview written')
+
+
+def _text(record, key, required=False):
+    value = record.get(key)
+    if value in (None, ''):
+        if required:
+            raise ValidationError(f'{key}: обязательное поле')
+        return None
+    if not isinstance(value, str):
+        raise ValidationError(f'{key}: ожидается строка')
+    return value
+
+
+def clean(raw):
+    """Проверенные значения строки ленты;
+    ValidationError со всеми ошибками.
+    """
+    try:
+        record = json.loads(raw)
+    except ValueError:
+        raise ValidationError('строка не JSON')
+    if not isinstance(record, dict):
+        raise ValidationError('ожидается объект JSON')
+    data, messages = {}, []
+    unknown = sorted(set(record) - set(KEYS))
+    if unknown:
+        messages.append(
+            f'неизвестные поля: {", ".join(unknown)}'
+        )
+    for name in FIELDS:
+        try:
+            data[name] = Post._meta.get_field(name).clean(
+                record.get(name), None
+            )
+        except ValidationError as error:
+            messages += [f'{name}: {message}' for message in error.messages]
+    for name, required in [('author', True), ('group', False),
+                           ('image', False)]:
+        try:
+            data[name] = _text(record, name, required)
+        except ValidationError as error:
+            messages += error.messages
+    if messages:
+        raise ValidationError(messages)
+    return data
+
+
+def parse(lines, start=0):
+    """Row или Failure для каждой непустой строки
+    после строки start.
+    """
+    for number, raw in enumerate(lines, start=1):
+        if number <= start or not raw.strip():
+            continue
+        try:
+            yield Row(number, clean(raw))
+        except ValidationError as error:
+            yield Failure(number, error.messages)
+
+
+def batches(items, size=BATCH_SIZE):
+    items = iter(items)
+    while batch := list(islice(items, size)):
+        yield batch
+
+
+def ingest_image(path):
+    """Обрабатывает картинку и сохраняет её с
+    версиями в хранилище.
+
+    Ingested.written — время изменения файла, если
+    его записал импорт, а не нашёл готовым
+    (см. discard_images).
+    """
+    with open(path, 'rb') as file_:
+        processed = images.process(file_)
+    field = Post._meta.get_field('image')
+    storage = field.storage
+    upload_name = field.generate_filename(None, images.variant_name(
+        os.path.basename(path), images.FALLBACK_FORMAT
+    ))
+    content = ContentFile(processed.fallback)
+    existed = storage.exists(
+        storage.hashed_name(upload_name, content_hash(content))
+    )
+    name = storage.save(upload_name, content)
+    written = None if existed else os.stat(storage.path(name)).st_mtime_ns
+    for image_format, variant in processed.variants.items():
+        storage.save_derived(
+            images.variant_name(name, image_format), ContentFile(variant)
+        )
+    return Ingested(name, processed.size, processed.preview, written)
+
+
+def check_image(path):
+    """Обрабатывает картинку, как ingest_image, но
+    ничего не сохраняет.
+
+    Картинка раскодируется целиком, поэтому
+    проверка отклоняет те же файлы, что и
+    настоящий импорт.
+    """
+    with open(path, 'rb') as file_:
+        images.process(file_)
+
+
+def image_path(image_root, name):
+    """Путь к картинке name внутри image_root.
+
+    Абсолютные пути, .. и символические
+    ссылки, ведущие за пределы каталога, —
+    ValidationError.
+    """
+    root = os.path.realpath(image_root)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValidationError(
+            f'image: {name} вне каталога картинок'
+        )
+    return path
+
+
+def _attempt(task, path):
+    try:
+        return task(path), None
+    except (OSError, Image.DecompressionBombError) as error:
+        return None, f'image: {error}'
+
+
+def _lookup(rows):
+    usernames = {row.data['author'] for row in rows}
+    slugs = {row.data['group'] for row in rows if row.data['group']}
+    authors = dict(
+        User.objects.filter(username__in=usernames).values_list(
+            'username', 'pk'
+        )
+    )
+    groups = dict(
+        Group.objects.filter(slug__in=slugs).values_list('slug', 'pk')
+    ) if slugs else {}
+    return authors, groups
+
+
+def prepare(rows, pool, image_root='.', dry_run=False):
+    """Несохранённые посты для строк пачки и
+    ошибки остальных строк.
+
+    Картинки обрабатываются в пуле pool; с dry_run
+    — только проверяются, а посты не
+    создаются.
+    """
+    authors, groups = _lookup(rows)
+    failures, resolved = [], []
+    for row in rows:
+        author_id = authors.get(row.data['author'])
+        group_id = groups.get(row.data['group'])
+        messages = []
+        if author_id is None:
+            messages.append(
+                f'author: нет пользователя {row.data["author"]}'
+            )
+        if row.data['group'] and group_id is None:
+            messages.append(f'group: нет группы {row.data["group"]}')
+        path = None
+        if row.data['image']:
+            try:
+                path = image_path(image_root, row.data['image'])
+            except ValidationError as error:
+                messages += error.messages
+        if messages:
+            failures.append(Failure(row.line, messages))
+        else:
+            resolved.append((row, author_id, group_id, path))
+    paths = sorted({path for *_, path in resolved if path})
+    task = check_image if dry_run else ingest_image
+    ingested = dict(zip(
+        paths, pool.map(lambda path: _attempt(task, path), paths)
+    ))
+    posts = []
+    for row, author_id, group_id, path in resolved:
+        image = None
+        if path:
+            image, error = ingested[path]
+            if error:
+                failures.append(Failure(row.line, [error]))
+                continue
+        if dry_run:
+            continue
+        post = Post(
+            author_id=author_id,
+            group_id=group_id,
+            **{name: row.data[name] for name in FIELDS},
+        )
+        if image:
+            post.image = image.name
+            post._image_written = image.written
+            images.describe(post, image.size, image.preview)
+        posts.append(post)
+    return posts, sorted(failures)
+
+
+def after_create(posts):
+    """Для пачки новых постов — то, что
+    сигналы post_save делают для одного.
+
+    Подписчики, счётчики, отметки и
+    поколения считаются для всей пачки
+    разом, а не по запросу на пост.
+    """
+    followers = timeline.fan_out_many(posts)
+    scope_counts = Counter(
+        scope for post in posts for scope in counters.post_scopes(post)
+    )
+    for scope, delta in scope_counts.items():
+        counters.adjust_count(scope, delta)
+    markers.touch(
+        *scope_counts, *(counters.post_scope(post.pk) for post in posts)
+    )
+    generations.bump(
+        generations.GLOBAL,
+        *(generations.post(post.pk) for post in posts),
+        *(generations.author(post.author_id) for post in posts),
+        *(
+            generations.group(post.group_id)
+            for post in posts if post.group_id is not None
+        ),
+        *(
+            generations.follower(user_id)
+            for user_ids in followers.values() for user_id in user_ids
+        ),
+    )
+    filter_cache.invalidate()
+    search.index_rows([(post.pk, post.title, post.text) for post in posts])
+    autocomplete.add_many(
+        AutocompleteEntry.ADDRESS, [post.address for post in posts]
+    )
+    for name in {post.image.name for post in posts if post.image}:
+        thumbnails.schedule_image(name)
+
+
+def discard_images(posts):
+    """Удаляет файлы картинок, которые
+    записал импорт этих постов.
+
+    Файл, найденный готовым или загруженный
+    кем-то ещё после импорта, остаётся: на
+    него может ссылаться другой, ещё не
+    записанный пост.
+    """
+    storage = Post._meta.get_field('image').storage
+    written = {
+        post.image.name: post._image_written
+        for post in posts if post.image and post._image_written
+    }
+    for name, mtime_ns in written.items():
+        images.release(name, storage, mtime_ns)
+
+
+def save(posts):
+    """Записывает пачку постов одной
+    транзакцией.
+
+    Картинки сохранены в хранилище до неё;
+    если транзакция не удалась, новые файлы
+    удаляются, чтобы не остаться без ссылок.
+    """
+    if not posts:
+        return
+    try:
+        with transaction.atomic():
+            Post.objects.bulk_create(posts)
+            after_create(posts)
+    except BaseException:
+        discard_images(posts)
+        raise
+
+
+def read_checkpoint(path):
+    """Номер последней импортированной
+    строки; 0, если файла нет.
+    """
+    try:
+        with open(path, encoding='utf-8') as file_:
+            return json.load(file_)['line']
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(path, line):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file_:
+        json.dump({'line': line}, file_)
+    os.replace(temporary, path)
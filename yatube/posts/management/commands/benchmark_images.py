@@ -0,0 +1,101 @@
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageFilter, ImageOps
+
+from posts import images
+from posts.thumbnails import GEOMETRIES
+
+
+def synthetic_photo(width, height):
+    """JPEG размером с фото с телефона: шум и градиенты, EXIF с поворотом."""
+    size = (width, height)
+    image = Image.merge('RGB', [
+        Image.effect_noise(size, 40).filter(ImageFilter.GaussianBlur(2)),
+        Image.linear_gradient('L').resize(size),
+        Image.radial_gradient('L').resize(size),
+    ])
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    exif[0x010F] = 'Камера телефона'
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=95, exif=exif.tobytes())
+    return output.getvalue()
+
+
+def thumbnail_time(content, repeat):
+    """Среднее время создания миниатюр всех размеров из шаблонов, мс."""
+    sizes = [
+        tuple(int(side) for side in geometry.split('x'))
+        for geometry in sorted(GEOMETRIES)
+    ]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for size in sizes:
+            with Image.open(io.BytesIO(content)) as image:
+                ImageOps.fit(image, size, Image.Resampling.LANCZOS)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def kilobytes(size):
+    return f'{size / 1024:9.1f} КБ'
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает, сколько места экономит обработка загруженных '
+        'картинок и насколько быстрее из них создаются миниатюры.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources', nargs='*',
+            help='Файлы картинок; без них — синтетическое фото.',
+        )
+        parser.add_argument('--width', type=int, default=4032)
+        parser.add_argument('--height', type=int, default=3024)
+        parser.add_argument(
+            '--repeat', type=int, default=3,
+            help='Сколько раз повторить создание миниатюр.',
+        )
+
+    def handle(self, *args, sources, width, height, repeat, **options):
+        if sources:
+            originals = {}
+            for path in sources:
+                with open(path, 'rb') as file_:
+                    originals[path] = file_.read()
+        else:
+            originals = {
+                f'синтетическое фото {width}x{height}':
+                    synthetic_photo(width, height),
+            }
+        for name, content in originals.items():
+            self.report(name, content, repeat)
+
+    def report(self, name, content, repeat):
+        start = time.perf_counter()
+        processed = images.process(io.BytesIO(content))
+        fallback = processed.fallback
+        process_time = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'{name}: обработка {process_time:.0f} мс')
+        self.stdout.write(f'  оригинал  {kilobytes(len(content))}')
+        for image_format, result in [
+            (images.FALLBACK_FORMAT, fallback), *processed.variants.items()
+        ]:
+            saving = 100 - len(result) * 100 / len(content)
+            self.stdout.write(
+                f'  {image_format:<9} {kilobytes(len(result))}'
+                f'  экономия {saving:5.1f}%'
+            )
+        self.stdout.write(
+            f'  превью    {len(processed.preview):6d} байт в data URI'
+        )
+        before = thumbnail_time(content, repeat)
+        after = thumbnail_time(fallback, repeat)
+        self.stdout.write(
+            f'  миниатюры из оригинала {before:.0f} мс, '
+            f'из обработанного JPEG {after:.0f} мс '
+            f'(в {before / after:.1f} раза быстрее)'
+        )
@@ -0,0 +1,129 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+
+from posts import importer
+from posts.models import Group, Post
+
+from .benchmark_images import synthetic_photo
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость импорта постов по одному через '
+        'Post.objects.create и пачками через import_posts, строк в секунду.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=2000)
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='Сколько строк ленты с картинкой.',
+        )
+        parser.add_argument('--width', type=int, default=1600)
+        parser.add_argument('--height', type=int, default=1200)
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workers', type=int, default=min(4, os.cpu_count() or 1)
+        )
+
+    def handle(self, *args, rows, images, width, height, batch_size,
+               workers, **options):
+        directory = tempfile.mkdtemp()
+        # Записи откатываются, а файлы и кэш — во временных, чтобы замер
+        # не оставил следов в данных сайта.
+        isolated = override_settings(
+            MEDIA_ROOT=os.path.join(directory, 'media'),
+            CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'benchmark_import',
+            }},
+        )
+        try:
+            lines = self.feed(directory, rows, images, width, height)
+            with isolated:
+                one_by_one = self.measure(
+                    lambda: self.create_one_by_one(lines, directory)
+                )
+                batched = self.measure(
+                    lambda: self.import_batched(
+                        lines, directory, batch_size, workers
+                    )
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.stdout.write(
+            f'{rows} строк, из них с картинкой {images}:'
+        )
+        self.stdout.write(
+            f'  {"по одному (Post.objects.create)":<34}'
+            f'{rows / one_by_one:8.0f} строк/с'
+        )
+        self.stdout.write(
+            f'  {f"пачками по {batch_size}, потоков {workers}":<34}'
+            f'{rows / batched:8.0f} строк/с '
+            f'(в {one_by_one / batched:.1f} раза быстрее)'
+        )
+
+    def feed(self, directory, rows, images, width, height):
+        """Строки ленты; картинки — разные синтетические фото."""
+        for number in range(images):
+            path = os.path.join(directory, f'{number}.jpg')
+            with open(path, 'wb') as file_:
+                file_.write(synthetic_photo(width + number, height))
+        return [
+            json.dumps({
+                'text': f'Событие {number}',
+                'author': 'benchmark_author',
+                'group': 'benchmark_group',
+                'address': f'Адрес {number % 50}',
+                'cost': number % 1000,
+                **({'image': f'{number}.jpg'} if number < images else {}),
+            }, ensure_ascii=False)
+            for number in range(rows)
+        ]
+
+    def measure(self, run):
+        """Время run в секундах; всё, что записано, откатывается."""
+        with transaction.atomic():
+            get_user_model().objects.create(username='benchmark_author')
+            Group.objects.create(
+                title='Замер', slug='benchmark_group', description='-'
+            )
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            transaction.set_rollback(True)
+        return elapsed
+
+    def create_one_by_one(self, lines, directory):
+        author = get_user_model().objects.get(username='benchmark_author')
+        group = Group.objects.get(slug='benchmark_group')
+        for line in lines:
+            data = json.loads(line)
+            image = data.pop('image', None)
+            data.update(author=author, group=group)
+            if image:
+                with open(os.path.join(directory, image), 'rb') as file_:
+                    Post.objects.create(**data, image=File(file_, image))
+            else:
+                Post.objects.create(**data)
+
+    def import_batched(self, lines, directory, batch_size, workers):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch in importer.batches(
+                importer.parse(lines), batch_size
+            ):
+                posts, _ = importer.prepare(batch, pool, directory)
+                importer.save(posts)
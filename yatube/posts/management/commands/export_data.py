@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает таблицу постов, комментариев, подписок или групп '
+        'потоком, не загружая её в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=export.TABLES)
+        parser.add_argument(
+            '--format',
+            dest='output_format',
+            choices=export.FORMATS,
+            default='ndjson',
+        )
+        parser.add_argument(
+            '--since',
+            help=(
+                'Только строки, изменённые начиная с этого времени (ISO '
+                '8601); группы выгружаются целиком.'
+            ),
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; без него — stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=export.CHUNK_SIZE,
+            help='Сколько строк читать из базы за раз.',
+        )
+
+    def handle(self, *args, table, output_format, since, output, chunk_size,
+               **options):
+        if since is not None:
+            since = self.parse_since(since)
+        until = timezone.now()
+        if output:
+            with open(output, 'w', newline='', encoding='utf-8') as file_:
+                count = export.export(
+                    file_, table, output_format, since, until, chunk_size
+                )
+        else:
+            # Строки выгрузки пишутся как есть, без перевода строки.
+            self.stdout.ending = ''
+            count = export.export(
+                self.stdout, table, output_format, since, until, chunk_size
+            )
+        self.stderr.write(
+            f'Выгружено строк: {count}. Следующая выгрузка: '
+            f'--since {export.next_since(until).isoformat()}'
+        )
+
+    def parse_since(self, value):
+        try:
+            since = parse_datetime(value)
+        except ValueError:
+            since = None
+        if since is None:
+            raise CommandError(f'Неверное время --since: {value}')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
@@ -0,0 +1,90 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из ленты NDJSON пачками: bulk_create, '
+        'картинки обрабатываются параллельно.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Файл NDJSON; - — stdin.')
+        parser.add_argument(
+            '--images', default='.',
+            help='Каталог, от которого считаются пути картинок.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE,
+            help='Сколько строк записывать одной транзакцией.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=min(4, os.cpu_count() or 1),
+            help='Сколько картинок обрабатывать одновременно.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки: импорт продолжится с неё.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить строки и картинки, ничего не записывая.',
+        )
+
+    def handle(self, *args, source, images, batch_size, workers, checkpoint,
+               dry_run, **options):
+        start = 0
+        if checkpoint and not dry_run:
+            start = importer.read_checkpoint(checkpoint)
+            if start:
+                self.stdout.write(f'Продолжение после строки {start}')
+        if source == '-':
+            self.run(sys.stdin, start, images, batch_size, workers,
+                     checkpoint, dry_run)
+        else:
+            with open(source, encoding='utf-8') as lines:
+                self.run(lines, start, images, batch_size, workers,
+                         checkpoint, dry_run)
+
+    def run(self, lines, start, image_root, batch_size, workers, checkpoint,
+            dry_run):
+        started = time.perf_counter()
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for batch in importer.batches(
+                importer.parse(lines, start), batch_size
+            ):
+                rows = [
+                    item for item in batch if isinstance(item, importer.Row)
+                ]
+                failures = [
+                    item for item in batch
+                    if isinstance(item, importer.Failure)
+                ]
+                posts, more = importer.prepare(
+                    rows, pool, image_root, dry_run
+                )
+                failures += more
+                if not dry_run:
+                    importer.save(posts)
+                    if checkpoint:
+                        importer.write_checkpoint(checkpoint, batch[-1].line)
+                for failure in sorted(failures):
+                    self.stderr.write(
+                        f'Строка {failure.line}: '
+                        f'{"; ".join(failure.messages)}'
+                    )
+                done += len(batch) - len(failures)
+                failed += len(failures)
+        elapsed = time.perf_counter() - started
+        verb = 'Проверено без ошибок' if dry_run else 'Импортировано'
+        self.stdout.write(
+            f'{verb}: {done}, с ошибками: {failed}; '
+            f'{(done + failed) / elapsed:.0f} строк/с'
+        )
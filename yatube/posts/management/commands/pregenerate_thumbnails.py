@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts import images, markers, thumbnails
+from posts.counters import post_scope, post_scopes
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт недостающие миниатюры всех размеров и превью для '
+        'картинок существующих постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--post',
+            type=int,
+            action='append',
+            dest='post_ids',
+            help='Только для картинки этого поста.',
+        )
+
+    def handle(self, *args, post_ids, **options):
+        posts = Post.objects.exclude(image='')
+        if post_ids:
+            posts = posts.filter(pk__in=post_ids)
+        self.fill_previews(posts)
+        names = posts.order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        images_count = created = 0
+        for name in names.iterator():
+            created += thumbnails.generate_for_image(name)
+            images_count += 1
+        self.stdout.write(
+            f'Картинок: {images_count}, создано миниатюр: {created}'
+        )
+
+    def fill_previews(self, posts):
+        """Размеры и превью картинок, загруженных до их появления."""
+        scopes = []
+        filled = 0
+        for post in posts.filter(image_preview='').only(
+            'pk', 'image', 'author_id', 'group_id'
+        ).iterator():
+            try:
+                images.describe_saved(post)
+            except (OSError, Image.DecompressionBombError):
+                self.stderr.write(f'Не удалось прочитать {post.image.name}')
+                continue
+            Post.objects.filter(pk=post.pk).update(
+                image_width=post.image_width,
+                image_height=post.image_height,
+                image_preview=post.image_preview,
+            )
+            scopes += [post_scope(post.pk), *post_scopes(post)]
+            filled += 1
+        if scopes:
+            markers.touch(*scopes)
+        self.stdout.write(f'Заполнено превью: {filled}')
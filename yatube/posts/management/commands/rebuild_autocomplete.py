@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import autocomplete
+from posts.models import AutocompleteEntry, Group, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает индекс подсказок для групп и адресов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько ключей вставлять одним запросом.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        sources = {
+            AutocompleteEntry.GROUP: Group.objects.values_list(
+                'title', flat=True
+            ),
+            AutocompleteEntry.ADDRESS: Post.objects.filter(
+                address__isnull=False
+            ).values_list('address', flat=True),
+        }
+        with transaction.atomic():
+            for kind, values in sources.items():
+                created = autocomplete.fill(
+                    AutocompleteEntry,
+                    kind,
+                    values.iterator(chunk_size=batch_size),
+                    batch_size,
+                )
+                self.stdout.write(f'{kind}: ключей {created}')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько постов индексировать в одной транзакции.',
+        )
+
+    def handle(self, *args, batch_size, **options):
+        if not search.is_enabled():
+            raise CommandError(
+                'Полнотекстовый поиск доступен только в SQLite.'
+            )
+        search.clear()
+        indexed = 0
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk').values_list(
+                    'pk', 'title', 'text'
+                )[:batch_size]
+            )
+            if not rows:
+                break
+            with transaction.atomic():
+                search.index_rows(rows)
+            indexed += len(rows)
+            last_pk = rows[-1][0]
+        self.stdout.write(f'Проиндексировано постов: {indexed}')
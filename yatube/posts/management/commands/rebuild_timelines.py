@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей пачками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Сколько пользователей пересобирать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, batch_size, usernames, **options):
+        followers = Follow.objects.all()
+        readers = TimelineEntry.objects.all()
+        if usernames:
+            followers = followers.filter(user__username__in=usernames)
+            readers = readers.filter(user__username__in=usernames)
+        # Пользователи без подписок тоже попадают сюда, чтобы очистить
+        # оставшиеся от них записи.
+        user_ids = followers.values_list('user_id', flat=True).union(
+            readers.values_list('user_id', flat=True)
+        ).order_by('user_id')
+        batch = []
+        rebuilt = 0
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if len(batch) == batch_size:
+                timeline.rebuild(batch)
+                rebuilt += len(batch)
+                batch = []
+        if batch:
+            timeline.rebuild(batch)
+            rebuilt += len(batch)
+        self.stdout.write(f'Пересобрано лент: {rebuilt}')
@@ -0,0 +1,103 @@
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import delete as thumbnail_delete
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import content_hash
+from posts import counters, generations, images, markers, thumbnails
+from posts.models import Follow, Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки постов, загруженные до хранения по '
+        'содержимому, в имена из sha256 на месте; одинаковые файлы '
+        'объединяются.'
+    )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        names = list(
+            Post.objects.exclude(image='').order_by('image').values_list(
+                'image', flat=True
+            ).distinct()
+        )
+        renamed = merged = 0
+        for name in names:
+            if self.storage.is_hashed(name):
+                continue
+            if not self.storage.exists(name):
+                self.stderr.write(f'Нет файла {name}')
+                continue
+            with self.storage.open(name) as file_:
+                new_name = self.storage.hashed_name(
+                    name, content_hash(File(file_))
+                )
+            duplicate = self.storage.exists(new_name)
+            with transaction.atomic():
+                posts = list(Post.objects.filter(image=name).only(
+                    'pk', 'author_id', 'group_id'
+                ))
+                Post.objects.filter(image=name).update(
+                    image=new_name, updated_at=timezone.now()
+                )
+                self.move(name, new_name)
+                for image_format in images.EXTENSIONS:
+                    if image_format != images.FALLBACK_FORMAT:
+                        self.move(
+                            images.variant_name(name, image_format),
+                            images.variant_name(new_name, image_format),
+                        )
+            # Миниатюры старого имени больше не нужны, новые создаются сразу.
+            thumbnail_delete(ImageFile(name, self.storage), delete_file=False)
+            thumbnails.generate_for_image(new_name)
+            self.forget_pages(posts)
+            if duplicate:
+                merged += 1
+            else:
+                renamed += 1
+        self.stdout.write(
+            f'Переименовано: {renamed}, объединено с такими же: {merged}'
+        )
+
+    def forget_pages(self, posts):
+        """Отмечает изменёнными страницы и фрагменты постов с картинкой.
+
+        update() не вызывает сигналы, а для файла, объединённого с
+        дубликатом, generate_for_image не создаёт миниатюр и ничего не
+        отмечает: страницы остались бы со ссылкой на старое имя.
+        """
+        markers.touch(*(
+            scope
+            for post in posts
+            for scope in [counters.post_scope(post.pk),
+                          *counters.post_scopes(post)]
+        ))
+        follower_ids = Follow.objects.filter(
+            author_id__in={post.author_id for post in posts}
+        ).values_list('user_id', flat=True)
+        generations.bump(
+            generations.GLOBAL,
+            *(generations.post(post.pk) for post in posts),
+            *(generations.author(post.author_id) for post in posts),
+            *(
+                generations.group(post.group_id)
+                for post in posts if post.group_id is not None
+            ),
+            *(generations.follower(user_id) for user_id in follower_ids),
+        )
+
+    def move(self, name, new_name):
+        """Переносит файл под новое имя; дубликат просто удаляется."""
+        if not self.storage.exists(name):
+            return
+        if self.storage.exists(new_name):
+            self.storage.delete(name)
+            return
+        path = self.storage.path(new_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.storage.path(name), path)
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не осталось ссылок, с '
+        'версиями и миниатюрами. Недавно загруженные файлы остаются '
+        'на POSTS_IMAGE_RELEASE_GRACE секунд.'
+    )
+
+    def handle(self, *args, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        extension = f'.{images.EXTENSIONS[images.FALLBACK_FORMAT]}'
+        checked = deleted = 0
+        for name in self.walk(storage, field.upload_to.rstrip('/')):
+            if not (storage.is_hashed(name) and name.endswith(extension)):
+                continue
+            checked += 1
+            if images.release(name, storage):
+                deleted += 1
+        self.stdout.write(f'Проверено: {checked}, удалено: {deleted}')
+
+    def walk(self, storage, directory):
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for name in directories:
+            yield from self.walk(storage, os.path.join(directory, name))
@@ -0,0 +1,110 @@
+"""Отметки последнего изменения страниц для условных GET-запросов.
+
+Для каждой области — автора, группы, поста — в ChangeMarker хранится
+время последней записи, которая меняет её страницы. Отметки
+обновляются сигналами одним запросом на запись. View читают их одним
+запросом по уникальному индексу и отвечают 304 Not Modified, не
+выполняя запросы ленты и не отрисовывая шаблон.
+"""
+import hashlib
+
+from django.utils import timezone
+
+from .counters import author_scope, group_scope, post_scope
+from .models import ChangeMarker, Group, Post, User
+
+
+def touch(*scopes):
+    """Отмечает области изменёнными сейчас."""
+    now = timezone.now()
+    ChangeMarker.objects.bulk_create(
+        [ChangeMarker(scope=scope, changed_at=now) for scope in set(scopes)],
+        update_conflicts=True,
+        unique_fields=['scope'],
+        update_fields=['changed_at'],
+    )
+
+
+def last_changed(scopes):
+    """Время последнего изменения областей, None без отметок."""
+    return max(
+        ChangeMarker.objects.filter(scope__in=scopes).values_list(
+            'changed_at', flat=True
+        ),
+        default=None,
+    )
+
+
+def _page_changed(request, scopes_func, *args):
+    """Время изменения страницы, один раз на запрос.
+
+    condition() вызывает функции ETag и Last-Modified по отдельности,
+    поэтому результат сохраняется в запросе.
+    """
+    if not hasattr(request, '_page_changed'):
+        scopes = scopes_func(*args)
+        request._page_changed = last_changed(scopes) if scopes else None
+    return request._page_changed
+
+
+def _etag(request, changed):
+    # Страницы отличаются для разных пользователей: шапка, подписка,
+    # форма комментария.
+    if changed is None:
+        return None
+    user_id = request.user.pk if request.user.is_authenticated else ''
+    raw = f'{changed.isoformat()}|{user_id}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _group_scopes(slug):
+    return [
+        group_scope(pk)
+        for pk in Group.objects.filter(slug=slug).values_list('pk', flat=True)
+    ]
+
+
+def _profile_scopes(username):
+    return [
+        author_scope(pk)
+        for pk in User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        )
+    ]
+
+
+def _post_scopes(post_id):
+    # Страница поста показывает название группы, поэтому её область
+    # тоже входит в ETag.
+    scopes = []
+    for author_id, group_id in Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ):
+        scopes += [post_scope(post_id), author_scope(author_id)]
+        if group_id is not None:
+            scopes.append(group_scope(group_id))
+    return scopes
+
+
+def group_last_modified(request, slug):
+    return _page_changed(request, _group_scopes, slug)
+
+
+def group_etag(request, slug):
+    return _etag(request, group_last_modified(request, slug))
+
+
+def profile_last_modified(request, username):
+    return _page_changed(request, _profile_scopes, username)
+
+
+def profile_etag(request, username):
+    return _etag(request, profile_last_modified(request, username))
+
+
+def post_last_modified(request, post_id):
+    return _page_changed(request, _post_scopes, post_id)
+
+
+def post_etag(request, post_id):
+    return _etag(request, post_last_modified(request, post_id))
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_timelines(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    size = getattr(settings, 'POSTS_TIMELINE_SIZE', 1000)
+    user_ids = Follow.objects.values_list('user_id', flat=True).distinct()
+    for user_id in user_ids.iterator():
+        posts = Post.objects.filter(
+            author__following__user_id=user_id
+        ).order_by('-pub_date', '-pk').values_list(
+            'pk', 'author_id', 'pub_date'
+        )[:size]
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(
+                    user_id=user_id,
+                    post_id=pk,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for pk, author_id, pub_date in posts
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_post_follow_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_pub_date_idx'), models.Index(fields=['user', 'author'], name='timeline_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(build_timelines, migrations.RunPython.noop),
+    ]
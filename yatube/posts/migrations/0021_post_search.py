@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_search_table(apps, schema_editor):
+    from posts.search import create_table
+
+    if schema_editor.connection.vendor == 'sqlite':
+        create_table(schema_editor.connection)
+
+
+def drop_search_table(apps, schema_editor):
+    from posts.search import drop_table
+
+    if schema_editor.connection.vendor == 'sqlite':
+        drop_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_timelineentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
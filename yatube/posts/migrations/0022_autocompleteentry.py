@@ -0,0 +1,47 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+def fill_autocomplete(apps, schema_editor):
+    from posts.autocomplete import fill
+
+    entry = apps.get_model('posts', 'AutocompleteEntry')
+    group = apps.get_model('posts', 'Group')
+    post = apps.get_model('posts', 'Post')
+    fill(entry, 'group', group.objects.values_list('title', flat=True))
+    fill(
+        entry,
+        'address',
+        post.objects.filter(address__isnull=False).values_list(
+            'address', flat=True
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutocompleteEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('group', 'Группа'), ('address', 'Адрес')], max_length=10)),
+                ('key', models.CharField(max_length=200)),
+                ('value', models.CharField(max_length=200)),
+                ('weight', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'value'], name='autocomplete_kind_value_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='autocompleteentry',
+            constraint=models.UniqueConstraint(fields=('kind', 'key', 'value'), name='unique_autocomplete_key'),
+        ),
+        migrations.RunPython(fill_autocomplete, migrations.RunPython.noop),
+    ]
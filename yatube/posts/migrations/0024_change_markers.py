@@ -0,0 +1,55 @@
+# Generated by Django 4.2.2 on 2026-10-18 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_markers(apps, schema_editor):
+    from posts.counters import author_scope, group_scope, post_scope
+
+    marker = apps.get_model('posts', 'ChangeMarker')
+    group = apps.get_model('posts', 'Group')
+    post = apps.get_model('posts', 'Post')
+    user = apps.get_model(settings.AUTH_USER_MODEL)
+    now = timezone.now()
+    scopes = []
+    for model, scope in ((group, group_scope), (user, author_scope),
+                         (post, post_scope)):
+        scopes += [
+            scope(pk) for pk in model.objects.values_list('pk', flat=True)
+        ]
+    marker.objects.bulk_create(
+        (marker(scope=scope, changed_at=now) for scope in scopes),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0023_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeMarker',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, unique=True)),
+                ('changed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.AddField(
+            model_name='follow',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(create_markers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.2 on 2026-10-18 20:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='autocompleteentry',
+            index=models.Index(fields=['kind', '-weight', 'key', 'value'], name='autocomplete_kind_weight_idx'),
+        ),
+    ]
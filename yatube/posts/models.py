@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -67,8 +69,31 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_preview = models.TextField(
+        'Превью картинки',
+        blank=True,
+        editable=False,
+        help_text='Крошечная копия картинки в data URI для заглушки'
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     def __str__(self):
         return self.text
@@ -77,6 +102,19 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date'], name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', 'pub_date'], name='post_group_pub_date_idx'
+            ),
+            models.Index(fields=['end_date'], name='post_end_date_idx'),
+            models.Index(fields=['cost'], name='post_cost_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -106,6 +144,10 @@ class Comment(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
 
     def __str__(self):
         return self.text
@@ -122,3 +164,102 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following'
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписок пользователя.
+
+    Лента заполняется при публикации поста (fan-out on write), поэтому
+    страница подписок читается одним диапазоном индекса.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'], name='timeline_user_author_idx'
+            ),
+        ]
+
+
+class AutocompleteEntry(models.Model):
+    """Ключ префиксного поиска для подсказок.
+
+    Для каждого значения хранится по строке на каждое слово: нормализованный
+    текст от этого слова до конца. Поэтому подсказка находит значение по
+    началу любого слова одним диапазоном индекса (kind, key).
+    """
+    GROUP = 'group'
+    ADDRESS = 'address'
+    KIND_CHOICES = [
+        (GROUP, 'Группа'),
+        (ADDRESS, 'Адрес'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=200)
+    value = models.CharField(max_length=200)
+    weight = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'key', 'value'], name='unique_autocomplete_key'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['kind', 'value'], name='autocomplete_kind_value_idx'
+            ),
+            # Частые подсказки читаются по убыванию веса, ключ и значение
+            # берутся из индекса.
+            models.Index(
+                fields=['kind', '-weight', 'key', 'value'],
+                name='autocomplete_kind_weight_idx',
+            ),
+        ]
+
+
+class ChangeMarker(models.Model):
+    """Время последнего изменения области: автора, группы или поста.
+
+    Обновляется сигналами при любой записи, которая меняет страницы
+    области, и служит Last-Modified/ETag для условных GET-запросов.
+    """
+    scope = models.CharField(max_length=50, unique=True)
+    changed_at = models.DateTimeField()
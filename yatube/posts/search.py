@@ -0,0 +1,223 @@
+"""Полнотекстовый поиск по заголовку и
+тексту постов.
+
+Слова приводятся к основе стеммером Snowball
+для русского языка и хранятся в
+виртуальной таблице SQLite FTS5, по одной строке
+на пост (rowid совпадает с id поста). Таблица
+обновляется сигналами при сохранении и
+удалении постов; команда rebuild_search_index
+пересобирает её целиком. На других СУБД
+поиск выключен и фильтры работают через
+icontains.
+"""
+import re
+
+from django.db import connections
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+TABLE = 'posts_post_search'
+COLUMNS = ('title', 'text')
+RANKED_LIMIT = 1000
+SNIPPET_LENGTH = 300
+
+WORD = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|'
+    r'((?<=[ая])(в|вши|вшись)))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|'
+    r'ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+PARTICIPLE = re.compile(
+    r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$'
+)
+VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|'
+    r'уй|ил|ыл|им|ым|ен|ило|ыло|ено|ят|'
+    r'ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|'
+    r'н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|'
+    r'ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+DERIVATIONAL = re.compile(r'ость?$')
+
+
+def _region(word, start):
+    """Начало области после первой согласной,
+    следующей за гласной.
+    """
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stem(word):
+    """Основа русского слова по алгоритму
+    Snowball.
+    """
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS), None
+    )
+    if rv_start is None:
+        return word
+    r2_start = _region(word, _region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv, removed = PERFECTIVE_GERUND.subn('', rv)
+    if not removed:
+        rv = REFLEXIVE.sub('', rv)
+        rv, removed = ADJECTIVE.subn('', rv)
+        if removed:
+            rv = PARTICIPLE.sub('', rv)
+        else:
+            rv, removed = VERB.subn('', rv)
+            if not removed:
+                rv = NOUN.sub('', rv)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    rv, removed = SUPERLATIVE.subn('', rv)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not removed and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def stems(text):
+    """Текст, разобранный на основы слов через
+    пробел.
+    """
+    return ' '.join(stem(word) for word in WORD.findall(text or ''))
+
+
+def match_expression(query, column=None):
+    """Запрос FTS5: все основы слов запроса, с
+    поиском по префиксу.
+    """
+    terms = ' '.join(f'"{stem(word)}"*' for word in WORD.findall(query))
+    if not terms:
+        return ''
+    if column:
+        return f'{column} : ({terms})'
+    return terms
+
+
+def is_enabled(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def create_table(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+            f'{", ".join(COLUMNS)}, tokenize="unicode61 remove_diacritics 2")'
+        )
+
+
+def drop_table(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def index_rows(rows, using='default'):
+    """Индексирует строки (id, title, text)."""
+    rows = [(pk, stems(title), stems(text)) for pk, title, text in rows]
+    if not rows or not is_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [(pk,) for pk, _, _ in rows]
+        )
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, title, text) VALUES (%s, %s, %s)',
+            rows
+        )
+
+
+def unindex(pk, using='default'):
+    if not is_enabled(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [pk])
+
+
+def clear(using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+
+
+def match_sql():
+    """Подзапрос id постов, подходящих под
+    выражение FTS5.
+    """
+    return f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+
+
+def ranked_ids(expression, limit=RANKED_LIMIT, using='default',
+               within=None):
+    """id постов по убыванию релевантности (bm25),
+    не больше limit.
+
+    within — выборка постов, среди которых
+    ранжировать: остальные условия фильтра
+    применяются до LIMIT, а не после него.
+    """
+    sql = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+    params = [expression]
+    if within is not None:
+        subquery, subquery_params = (
+            within.order_by().values('pk').query.sql_with_params()
+        )
+        sql += f' AND rowid IN ({subquery})'
+        params += subquery_params
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'{sql} ORDER BY rank LIMIT %s', [*params, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def snippet(text, query, length=SNIPPET_LENGTH):
+    """Фрагмент текста вокруг первого
+    совпадения, слова выделены <mark>.
+    """
+    text = text or ''
+    query_stems = [stem(word) for word in WORD.findall(query)]
+    matches = [
+        match for match in WORD.finditer(text)
+        if any(stem(match.group()).startswith(s) for s in query_stems)
+    ]
+    if not matches:
+        return None
+    start = max(matches[0].start() - length // 3, 0)
+    end = min(start + length, len(text))
+    parts = ['…' if start else '']
+    position = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(escape(text[position:match.start()]))
+        parts.append(f'<mark>{escape(match.group())}</mark>')
+        position = match.end()
+    parts.append(escape(text[position:end]))
+    parts.append('…' if end < len(text) else '')
+    return mark_safe(''.join(parts))
@@ -0,0 +1,305 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from . import (
+    autocomplete, counters, filter_cache, generations, images, markers,
+    search, thumbnails, timeline,
+)
+from .models import AutocompleteEntry, Comment, Follow, Group, Post, User
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Запоминает исходную группу, чтобы заметить перенос поста."""
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+    instance._loaded_filter_values = filter_cache.snapshot(instance)
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_delete, sender=Post)
+def remember_old_group(sender, instance, **kwargs):
+    """Группа до записи — для всех receiver'ов post_save и post_delete.
+
+    Снимок делается один раз до записи, и receiver'ы его не меняют,
+    поэтому им неважно, в каком порядке они подключены.
+    """
+    instance._old_group_id = instance._loaded_group_id
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def touch_post_pages(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    scopes = counters.post_scopes(instance) + [
+        counters.post_scope(instance.pk)
+    ]
+    # Пост, перенесённый из другой группы, меняет и её страницу.
+    old_group_id = getattr(instance, '_old_group_id', None)
+    if old_group_id is not None:
+        scopes.append(counters.group_scope(old_group_id))
+    markers.touch(*scopes)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_generations(sender, instance, **kwargs):
+    if kwargs.get('raw'):
+        return
+    scopes = [
+        generations.GLOBAL,
+        generations.post(instance.pk),
+        generations.author(instance.author_id),
+    ]
+    old_group_id = getattr(instance, '_old_group_id', None)
+    for group_id in {instance.group_id, old_group_id}:
+        if group_id is not None:
+            scopes.append(generations.group(group_id))
+    follower_ids = Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True)
+    scopes += [generations.follower(user_id) for user_id in follower_ids]
+    generations.bump(*scopes)
+
+
+@receiver(post_save, sender=Post)
+def update_counts_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        for scope in counters.post_scopes(instance):
+            counters.adjust_count(scope, 1)
+    else:
+        old_group_id = getattr(instance, '_old_group_id', None)
+        if old_group_id != instance.group_id:
+            if old_group_id is not None:
+                counters.adjust_count(counters.group_scope(old_group_id), -1)
+            if instance.group_id is not None:
+                counters.adjust_count(
+                    counters.group_scope(instance.group_id), 1
+                )
+    filter_values = filter_cache.snapshot(instance)
+    if created or filter_values != instance._loaded_filter_values:
+        filter_cache.invalidate()
+    instance._loaded_filter_values = filter_values
+
+
+@receiver(post_delete, sender=Post)
+def update_counts_on_delete(sender, instance, **kwargs):
+    for scope in counters.post_scopes(instance):
+        counters.adjust_count(scope, -1)
+    filter_cache.invalidate()
+
+
+@receiver(post_delete, sender=Group)
+def forget_group_count(sender, instance, **kwargs):
+    counters.forget_count(counters.group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, using='default', **kwargs):
+    search.index_rows([(instance.pk, instance.title, instance.text)], using)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, using='default', **kwargs):
+    search.unindex(instance.pk, using)
+
+
+@receiver(post_init, sender=Post)
+def remember_address(sender, instance, **kwargs):
+    instance._loaded_address = instance.__dict__.get('address')
+
+
+@receiver(post_save, sender=Post)
+def update_address_suggestions(sender, instance, created, raw=False,
+                               **kwargs):
+    if raw:
+        return
+    old = None if created else instance._loaded_address
+    autocomplete.replace(AutocompleteEntry.ADDRESS, old, instance.address)
+    instance._loaded_address = instance.address
+
+
+@receiver(post_delete, sender=Post)
+def remove_address_suggestion(sender, instance, **kwargs):
+    autocomplete.remove(AutocompleteEntry.ADDRESS, instance._loaded_address)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    image = instance.__dict__.get('image')
+    instance._loaded_image = getattr(image, 'name', image)
+
+
+@receiver(pre_save, sender=Post)
+def normalize_image(sender, instance, raw=False, **kwargs):
+    """Обрабатывает новую загруженную картинку до записи в хранилище."""
+    if raw:
+        return
+    if not instance.image:
+        images.describe(instance)
+    elif not instance.image._committed:
+        instance._image_variants = images.normalize_upload(instance)
+
+
+@receiver(post_save, sender=Post)
+def save_image_variants(sender, instance, raw=False, **kwargs):
+    variants = getattr(instance, '_image_variants', None)
+    if raw or not variants:
+        return
+    images.save_variants(instance.image, variants)
+    instance._image_variants = None
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, created, raw=False, **kwargs):
+    old = None if created else instance._loaded_image
+    if raw or not old or old == instance.image.name:
+        return
+    storage = instance.image.storage
+    transaction.on_commit(partial(images.release, old, storage))
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(
+            images.release, instance.image.name, instance.image.storage
+        ))
+
+
+@receiver(post_save, sender=Post)
+def pregenerate_thumbnails(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.image and instance.image.name != instance._loaded_image:
+        thumbnails.schedule_image(instance.image.name)
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_init, sender=Group)
+def remember_title(sender, instance, **kwargs):
+    instance._loaded_title = instance.__dict__.get('title')
+
+
+@receiver(post_save, sender=Group)
+def update_group_suggestions(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old = None if created else instance._loaded_title
+    autocomplete.replace(AutocompleteEntry.GROUP, old, instance.title)
+    instance._loaded_title = instance.title
+
+
+@receiver(post_delete, sender=Group)
+def remove_group_suggestion(sender, instance, **kwargs):
+    autocomplete.remove(AutocompleteEntry.GROUP, instance._loaded_title)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def touch_comment_pages(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        markers.touch(counters.post_scope(instance.post_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def touch_follow_pages(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        markers.touch(counters.author_scope(instance.author_id))
+
+
+@receiver(post_save, sender=Group)
+def touch_group_pages(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Название группы есть и в профилях авторов, которые в ней писали;
+    # страницы постов группы учитывают её область в ETag.
+    author_ids = [] if created else Post.objects.filter(
+        group_id=instance.pk
+    ).values_list('author_id', flat=True).distinct()
+    markers.touch(
+        counters.group_scope(instance.pk),
+        *(counters.author_scope(author_id) for author_id in author_ids),
+    )
+
+
+@receiver(post_save, sender=User)
+def touch_author_pages(sender, instance, created, raw=False,
+                       update_fields=None, **kwargs):
+    # Вход пользователя сохраняет только last_login — страницы не меняются.
+    if raw or update_fields == frozenset(['last_login']):
+        return
+    # Имя комментатора есть на страницах постов, которые он обсуждал.
+    post_ids = [] if created else Comment.objects.filter(
+        author_id=instance.pk
+    ).values_list('post_id', flat=True).distinct()
+    markers.touch(
+        counters.author_scope(instance.pk),
+        *(counters.post_scope(post_id) for post_id in post_ids),
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_user_generations(sender, instance, created, raw=False,
+                          update_fields=None, **kwargs):
+    # Имя пользователя есть в закэшированных фрагментах его постов и
+    # комментариев, в том числе к чужим постам.
+    if raw or created or update_fields == frozenset(['last_login']):
+        return
+    post_ids = Comment.objects.filter(author_id=instance.pk).values_list(
+        'post_id', flat=True
+    ).distinct()
+    generations.bump(
+        generations.author(instance.pk),
+        *(generations.post(post_id) for post_id in post_ids),
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_generations(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        generations.bump(generations.post(instance.post_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_generations(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        generations.bump(generations.GLOBAL, generations.group(instance.pk))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_generations(sender, instance, **kwargs):
+    if not kwargs.get('raw'):
+        generations.bump(
+            generations.follower(instance.user_id),
+            generations.author(instance.author_id),
+        )
@@ -0,0 +1,16 @@
+from django import template
+
+from posts import generations
+
+register = template.Library()
+
+
+@register.simple_tag
+def generation_stamp(scope, pk=None):
+    """Поколение области для ключа {% cache %}.
+
+    {% generation_stamp 'post' post.pk as stamp %}
+    {% cache 21600 post_comments post.pk stamp %}
+    """
+    name = scope if pk is None else getattr(generations, scope)(pk)
+    return generations.stamp([name])
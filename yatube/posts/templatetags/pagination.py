@@ -0,0 +1,17 @@
+from django import template
+
+from posts.utils import CURSOR_PARAM, page_query
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cursor_url(context, cursor):
+    """Ссылка на страницу с тем же фильтром и другим курсором."""
+    params = [
+        (name, value)
+        for name, values in context['request'].GET.lists()
+        for value in values
+        if name != CURSOR_PARAM
+    ]
+    return '?' + page_query(params, cursor)
@@ -0,0 +1,47 @@
+from django import template
+
+from posts.thumbnails import KINDS, thumbnails_for
+
+register = template.Library()
+
+PLACEHOLDER_COLOR = '#e9ecef'
+
+
+def background(post):
+    """CSS-фон заглушки: превью картинки поверх серого цвета."""
+    if not post.image_preview:
+        return f'background: {PLACEHOLDER_COLOR};'
+    return (
+        f'background: {PLACEHOLDER_COLOR} url({post.image_preview}) '
+        'center / cover no-repeat;'
+    )
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, kind, css_class='', style='', lazy=False):
+    """Картинка поста с вариантами ширины в srcset или заглушка.
+
+    Пока картинка грузится, на её месте видно растянутое превью из
+    post.image_preview. lazy — картинка ниже первого экрана, браузер
+    загрузит её при прокрутке.
+    """
+    variants = sorted(thumbnails_for(post, kind).items())
+    width, height = KINDS[kind]['size']
+    context = {
+        'post': post,
+        'css_class': css_class,
+        'style': style,
+        'lazy': lazy,
+        'aspect_ratio': f'{width} / {height}',
+        'background': background(post),
+    }
+    if variants:
+        context.update(
+            image=variants[-1][1],
+            srcset=', '.join(
+                f'{thumbnail.url} {variant}w'
+                for variant, thumbnail in variants
+            ),
+            sizes=KINDS[kind]['sizes'],
+        )
+    return context
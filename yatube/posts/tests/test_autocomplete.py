@@ -0,0 +1,127 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import autocomplete
+from posts.models import AutocompleteEntry, Group, Post
+
+User = get_user_model()
+
+
+class AutocompleteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.guest_client = Client()
+
+    def suggest(self, kind, query):
+        response = self.guest_client.get(
+            reverse('posts:autocomplete', kwargs={'kind': kind}), {'q': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_normalize(self):
+        """Нормализация убирает регистр, ё и пунктуацию"""
+        self.assertEqual(
+            autocomplete.normalize('  Ул. Фёдорова,  д.5 '), 'ул федорова д 5'
+        )
+
+    def test_group_titles_by_any_word(self):
+        """Группа находится по началу любого слова названия"""
+        Group.objects.create(title='Клуб любителей Ёлок', slug='elki')
+        Group.objects.create(title='Другая группа', slug='other')
+        for query in ('клу', 'ЛЮБИТ', 'ело', 'клуб люб'):
+            with self.subTest(query=query):
+                self.assertEqual(
+                    self.suggest('group', query), ['Клуб любителей Ёлок']
+                )
+        self.assertEqual(self.suggest('group', ''), [])
+
+    def test_group_rename_and_delete(self):
+        """Переименование и удаление группы обновляют подсказки"""
+        group = Group.objects.create(title='Старое имя', slug='group')
+        group.title = 'Новое имя'
+        group.save()
+        self.assertEqual(self.suggest('group', 'стар'), [])
+        self.assertEqual(self.suggest('group', 'нов'), ['Новое имя'])
+        group.delete()
+        self.assertEqual(self.suggest('group', 'нов'), [])
+
+    def test_addresses_ranked_by_frequency(self):
+        """Частые адреса идут первыми и исчезают вместе с последним постом"""
+        Post.objects.create(text='a', author=self.author, address='Ленина, 2')
+        posts = [
+            Post.objects.create(
+                text='b', author=self.author, address='Ленина, 1'
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(
+            self.suggest('address', 'лен'), ['Ленина, 1', 'Ленина, 2']
+        )
+        for post in posts:
+            post.delete()
+        self.assertEqual(self.suggest('address', 'лен'), ['Ленина, 2'])
+        self.assertFalse(
+            AutocompleteEntry.objects.filter(value='Ленина, 1').exists()
+        )
+
+    def test_frequent_value_ranked_among_all_matches(self):
+        """Частое значение выше редких, даже если оно дальше по алфавиту"""
+        for number in range(60):
+            autocomplete.add(AutocompleteEntry.ADDRESS, f'Улица А{number}')
+        for _ in range(3):
+            autocomplete.add(AutocompleteEntry.ADDRESS, 'Улица Я')
+        results = self.suggest('address', 'ули')
+        self.assertEqual(results[0], 'Улица Я')
+        self.assertEqual(len(results), autocomplete.RESULTS_LIMIT)
+        self.assertEqual(len(set(results)), len(results))
+
+    def test_shared_address_survives_delete(self):
+        """Удаление одного из двух постов с адресом оставляет подсказку"""
+        posts = [
+            Post.objects.create(text=text, author=self.author, address='Мира')
+            for text in 'ab'
+        ]
+        posts[0].delete()
+        self.assertEqual(self.suggest('address', 'мир'), ['Мира'])
+        self.assertEqual(
+            set(
+                AutocompleteEntry.objects.filter(value='Мира')
+                .values_list('weight', flat=True)
+            ),
+            {1},
+        )
+
+    def test_response_headers_and_queries(self):
+        """Ответ кешируется и стоит одного запроса; неизвестный вид — 404"""
+        url = reverse('posts:autocomplete', kwargs={'kind': 'group'})
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url, {'q': 'клуб'})
+        self.assertIn('max-age=300', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+        response = self.guest_client.get(
+            reverse('posts:autocomplete', kwargs={'kind': 'unknown'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_command(self):
+        """Команда пересобирает подсказки с весами"""
+        Group.objects.create(title='Группа', slug='group')
+        Post.objects.create(text='a', author=self.author, address='Мира, 1')
+        Post.objects.create(text='b', author=self.author, address='Мира, 1')
+        AutocompleteEntry.objects.all().delete()
+        call_command('rebuild_autocomplete', stdout=StringIO())
+        self.assertEqual(self.suggest('group', 'гр'), ['Группа'])
+        self.assertEqual(
+            set(
+                AutocompleteEntry.objects.filter(value='Мира, 1')
+                .values_list('weight', flat=True)
+            ),
+            {2},
+        )
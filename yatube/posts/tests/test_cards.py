@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            title='Заголовок', text='Текст', author=self.user, group=self.group
+        )
+
+    def load(self):
+        return Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+
+    def test_cached_card_is_reused(self):
+        """Повторная отрисовка берёт карточку из кэша"""
+        html = cards.render_cards([self.load()])
+        with mock.patch.object(cards, 'render_card') as render_card:
+            self.assertEqual(cards.render_cards([self.load()]), html)
+        render_card.assert_not_called()
+
+    def test_version_changes(self):
+        """Правка поста, переименование группы и автора меняют ключ"""
+        key = cards.card_key(self.load())
+        self.post.text = 'Новый текст'
+        self.post.save()
+        edited = cards.card_key(self.load())
+        self.assertNotEqual(edited, key)
+        self.group.title = 'Новая группа'
+        self.group.save()
+        renamed = cards.card_key(self.load())
+        self.assertNotEqual(renamed, edited)
+        self.user.first_name = 'Иван'
+        self.user.save()
+        self.assertNotEqual(cards.card_key(self.load()), renamed)
+        self.assertIn('Новый текст', cards.render_cards([self.load()])[0])
+
+    def test_search_snippet_is_not_cached(self):
+        """Карточка с фрагментом поиска не попадает в кэш"""
+        post = self.load()
+        post.search_snippet = 'фрагмент'
+        cards.render_cards([post])
+        self.assertIsNone(cache.get(cards.card_key(post)))
+
+    def test_listings_use_one_multi_get(self):
+        """Ленты собирают карточки одним get_many"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with mock.patch.object(
+                    cards.cache, 'get_many', wraps=cards.cache.get_many
+                ) as get_many:
+                    response = self.client.get(url)
+                get_many.assert_called_once()
+                self.assertContains(response, 'Заголовок')
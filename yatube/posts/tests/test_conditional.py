@@ -0,0 +1,116 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            text='Запись', author=self.author, group=self.group
+        )
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'post': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': 'author'}
+            ),
+            'group': reverse('posts:group_list', kwargs={'slug': 'group'}),
+        }
+
+    def revalidate(self, url):
+        """Статус повторного запроса с заголовками первого ответа."""
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        return lambda: self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        ).status_code
+
+    def test_unchanged_pages_return_304_cheaply(self):
+        """Неизменённая страница отдаёт 304 без запросов ленты"""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                status = self.revalidate(url)
+                with self.assertNumQueries(4):
+                    # Сессия, пользователь, id области, отметка изменения.
+                    self.assertEqual(status(), HTTPStatus.NOT_MODIFIED)
+
+    def test_writes_change_pages(self):
+        """Записи в области делают её страницы изменёнными"""
+        writes = {
+            'post': lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            'profile': lambda: Follow.objects.create(
+                user=self.reader, author=self.author
+            ),
+            'group': lambda: Post.objects.create(
+                text='Новая', author=self.reader, group=self.group
+            ),
+        }
+        for name, write in writes.items():
+            with self.subTest(page=name):
+                status = self.revalidate(self.urls[name])
+                write()
+                self.assertEqual(status(), HTTPStatus.OK)
+
+    def test_moved_post_changes_old_group(self):
+        """Перенос поста меняет страницу прежней группы"""
+        status = self.revalidate(self.urls['group'])
+        self.post.group = self.other_group
+        self.post.save()
+        self.assertEqual(status(), HTTPStatus.OK)
+
+    def test_renames_change_post_page(self):
+        """Переименование группы или комментатора меняет страницу поста"""
+        commenter = User.objects.create_user(username='commenter')
+        Comment.objects.create(
+            post=self.post, author=commenter, text='Комментарий'
+        )
+        comments_url = reverse(
+            'api:v1:comment_list', kwargs={'post_id': self.post.pk}
+        )
+
+        def rename_group():
+            self.group.title = 'Новое название'
+            self.group.save()
+
+        def rename_commenter():
+            commenter.username = 'renamed'
+            commenter.save()
+
+        for rename in (rename_group, rename_commenter):
+            for url in (self.urls['post'], comments_url):
+                with self.subTest(rename=rename.__name__, url=url):
+                    status = self.revalidate(url)
+                    rename()
+                    self.assertEqual(status(), HTTPStatus.OK)
+
+    def test_etag_depends_on_user(self):
+        """Другой пользователь не получает 304 по чужому ETag"""
+        etag = self.client.get(self.urls['profile'])['ETag']
+        response = Client().get(self.urls['profile'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
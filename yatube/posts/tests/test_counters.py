@@ -0,0 +1,119 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+
+from posts import counters
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class TotalCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовый текст'
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other_slug',
+            description='Тестовый текст'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Тестовая запись',
+            author=self.user,
+            group=self.group,
+        )
+
+    def group_count(self, group):
+        return counters.total_count(
+            group.posts.all(), counters.group_scope(group.pk)
+        )
+
+    def test_count_is_cached(self):
+        """Повторный подсчёт берётся из кэша без запроса к базе"""
+        self.assertEqual(self.group_count(self.group), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.group), 1)
+
+    def test_count_follows_create_and_delete(self):
+        """Кэшированный счётчик меняется при создании и удалении поста"""
+        self.group_count(self.group)
+        post = Post.objects.create(
+            text='Ещё запись', author=self.user, group=self.group
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.group), 2)
+        post.delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.group_count(self.group), 1)
+
+    def test_count_follows_group_change(self):
+        """Перенос поста в другую группу меняет счётчики обеих групп"""
+        self.group_count(self.group)
+        self.group_count(self.other_group)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(self.group_count(self.group), 0)
+        self.assertEqual(self.group_count(self.other_group), 1)
+
+    @override_settings(POSTS_COUNT_CAP=3)
+    def test_filtered_count_is_capped(self):
+        """Отфильтрованный счётчик ограничен сверху"""
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.user) for i in range(5)
+        )
+        total = counters.total_count(
+            Post.objects.all(), counters.INDEX_SCOPE, 'signature'
+        )
+        self.assertFalse(total.exact)
+        self.assertEqual(total.value, 3)
+        self.assertEqual(str(total), 'более 3')
+
+    def test_filtered_count_invalidated_on_create(self):
+        """Отфильтрованный счётчик пересчитывается после нового поста"""
+        queryset = Post.objects.filter(text__icontains='запись')
+        first = counters.total_count(
+            queryset, counters.INDEX_SCOPE, 'signature'
+        )
+        Post.objects.create(text='Новая запись', author=self.user)
+        second = counters.total_count(
+            queryset, counters.INDEX_SCOPE, 'signature'
+        )
+        self.assertEqual(int(second), int(first) + 1)
+
+    @override_settings(POSTS_COUNT_CAP=0)
+    def test_estimate_when_budget_exceeded(self):
+        """При превышении бюджета времени возвращается оценка"""
+        with mock.patch.object(
+            counters, 'time_budget', side_effect=DatabaseError
+        ):
+            total = counters.total_count(
+                Post.objects.all(), counters.INDEX_SCOPE
+            )
+        self.assertFalse(total.exact)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                counters.total_count(Post.objects.all(), counters.INDEX_SCOPE),
+                total
+            )
+
+    def test_sqlite_budget_interrupts_count(self):
+        """Долгий подсчёт прерывается по бюджету времени"""
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=self.user) for i in range(300)
+        )
+        with self.assertRaises(DatabaseError):
+            with counters.time_budget('default', 0):
+                Post.objects.filter(text__contains='9').count()
@@ -0,0 +1,164 @@
+import csv
+import datetime
+import io
+import json
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, tag
+from django.utils import timezone
+
+from posts import export
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class NullOutput:
+    """Поток, который ничего не хранит: память считается без выгрузки."""
+
+    def write(self, text):
+        return len(text)
+
+
+class ExportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост, "{number}"\nвторая строка',
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                end_date=datetime.date(2030, 1, number + 1),
+            )
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Ответ'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def run_export(self, table, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command('export_data', table, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_ndjson(self):
+        """NDJSON: объект на строку со всеми полями таблицы"""
+        output, _ = self.run_export('posts')
+        lines = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([line['id'] for line in lines],
+                         [post.pk for post in self.posts])
+        self.assertEqual(list(lines[0]), list(export.TABLES['posts'].fields))
+        self.assertEqual(lines[0]['text'], self.posts[0].text)
+        self.assertEqual(lines[0]['end_date'], '2030-01-01')
+        self.assertIsNone(lines[0]['group_id'])
+
+    def test_csv(self):
+        """CSV читается обратно с заголовком"""
+        output, _ = self.run_export('posts', '--format', 'csv')
+        rows = list(csv.DictReader(io.StringIO(output, newline='')))
+        self.assertEqual(len(rows), len(self.posts))
+        self.assertEqual(rows[0]['text'], self.posts[0].text)
+        self.assertEqual(rows[1]['group_id'], str(self.group.pk))
+
+    def test_columns(self):
+        """Столбцовый формат: строка JSON на каждую пачку строк"""
+        output, _ = self.run_export(
+            'posts', '--format', 'columns', '--chunk-size', '2'
+        )
+        chunks = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([len(chunk['id']) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            sum((chunk['id'] for chunk in chunks), []),
+            [post.pk for post in self.posts],
+        )
+
+    def test_all_tables(self):
+        """Выгружаются посты, комментарии, подписки и группы"""
+        expected = {'posts': 5, 'comments': 1, 'follows': 1, 'groups': 1}
+        for table, count in expected.items():
+            with self.subTest(table=table):
+                output, err = self.run_export(table)
+                self.assertEqual(len(output.splitlines()), count)
+                self.assertIn(f'Выгружено строк: {count}', err)
+
+    def test_since(self):
+        """--since оставляет только строки, изменённые позже"""
+        since = timezone.now() - datetime.timedelta(hours=1)
+        Post.objects.exclude(pk=self.posts[2].pk).update(
+            updated_at=since - datetime.timedelta(days=1)
+        )
+        _, err = self.run_export('posts')
+        next_since = err.rsplit('--since ', 1)[1].strip()
+        output, _ = self.run_export('posts', '--since', since.isoformat())
+        self.assertEqual(
+            [json.loads(line)['id'] for line in output.splitlines()],
+            [self.posts[2].pk],
+        )
+        output, _ = self.run_export('posts', '--since', next_since)
+        self.assertEqual(
+            [json.loads(line)['id'] for line in output.splitlines()],
+            [self.posts[2].pk],
+        )
+
+    def test_late_commit_in_next_export(self):
+        """Строка, зафиксированная после чтения, попадёт в следующую"""
+        started = timezone.now()
+        _, err = self.run_export('posts')
+        next_since = err.rsplit('--since ', 1)[1].strip()
+        # Транзакция поставила время до выгрузки, а зафиксировалась после.
+        late = Post.objects.create(text='Поздний', author=self.author)
+        Post.objects.filter(pk=late.pk).update(updated_at=started)
+        output, _ = self.run_export('posts', '--since', next_since)
+        self.assertIn(
+            late.pk, [json.loads(line)['id'] for line in output.splitlines()]
+        )
+
+    def test_bad_since(self):
+        """Неверное время --since — ошибка команды"""
+        for value in ('вчера', '2024-13-45T00:00'):
+            with self.subTest(value=value):
+                with self.assertRaises(CommandError):
+                    self.run_export('posts', '--since', value)
+
+    def test_single_query(self):
+        """Таблица читается одним запросом с курсором"""
+        with self.assertNumQueries(1):
+            export.export(NullOutput(), 'posts', chunk_size=2)
+
+
+@tag('slow')
+class ExportMemoryTest(TestCase):
+    """Память выгрузки не растёт вместе с таблицей."""
+
+    def peak_memory(self, output_format):
+        tracemalloc.start()
+        try:
+            export.export(NullOutput(), 'posts', output_format, chunk_size=500)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_memory_flat(self):
+        author = User.objects.create_user(username='author')
+        peaks = {}
+        for size in (2_000, 20_000):
+            Post.objects.bulk_create(
+                Post(text='Текст ' * 20, author=author)
+                for _ in range(size - Post.objects.count())
+            )
+            for output_format in export.FORMATS:
+                peaks[size, output_format] = self.peak_memory(output_format)
+        for output_format in export.FORMATS:
+            with self.subTest(format=output_format):
+                self.assertLess(
+                    peaks[20_000, output_format],
+                    peaks[2_000, output_format] * 1.5,
+                )
@@ -0,0 +1,105 @@
+from datetime import date
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import filter_cache
+from posts.filters import PostFilter
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class FilterCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.posts = [
+            Post.objects.create(text=f'Запись {i}', author=self.user, cost=i)
+            for i in range(8)
+        ]
+
+    def result_ids(self, query):
+        post_filter = PostFilter(QueryDict(query), queryset=Post.objects.all())
+        post_filter.qs
+        return filter_cache.result_ids(post_filter)[0]
+
+    def test_pages_served_from_cached_ids(self):
+        """Повторный запрос фильтра не выбирает id заново"""
+        response = self.client.get(reverse('posts:index'), {'cost_lt': 7})
+        page = response.context['page_obj']
+        self.assertEqual(
+            page.paginator.ranked_ids,
+            [post.pk for post in reversed(self.posts[:7])],
+        )
+        self.assertEqual(str(page.paginator.total), '7')
+        response = self.client.get(
+            reverse('posts:index'), {'cost_lt': 7, 'cursor': 'r5'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.posts[1], self.posts[0]],
+        )
+
+    def test_create_edit_delete_invalidate(self):
+        """Изменения постов сбрасывают закэшированный результат"""
+        version = filter_cache.version()
+        self.result_ids('cost_lt=3')
+        post = Post.objects.create(text='Новая', author=self.user, cost=0)
+        self.assertIn(post.pk, self.result_ids('cost_lt=3'))
+        post.cost = 100
+        post.save()
+        self.assertNotIn(post.pk, self.result_ids('cost_lt=3'))
+        self.posts[0].delete()
+        self.assertNotIn(self.posts[0].pk, self.result_ids('cost_lt=3'))
+        self.assertEqual(filter_cache.version(), version + 3)
+
+    def test_unrelated_edit_keeps_cache(self):
+        """Перенос поста в группу не меняет результат фильтра"""
+        version = filter_cache.version()
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.group = self.group
+        post.save()
+        self.assertEqual(filter_cache.version(), version)
+
+    @override_settings(POSTS_FILTER_CACHE_LIMIT=3)
+    def test_truncated_result_falls_back_to_cursor(self):
+        """Обрезанный список дальше листается курсором по дате"""
+        response = self.client.get(reverse('posts:index'), {'cost_lt': 7})
+        page = response.context['page_obj']
+        self.assertFalse(hasattr(page.paginator, 'ranked_ids'))
+        self.assertEqual(len(page), 5)
+
+    @skipUnless(connection.vendor == 'sqlite', 'Планы запросов SQLite')
+    @override_settings(POSTS_FILTER_CACHE_LIMIT=3)
+    def test_truncated_result_read_by_date_index(self):
+        """Страница обрезанного списка читается по индексу даты"""
+        Post.objects.update(end_date=date(2000, 1, 1))
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                reverse('posts:index'),
+                {'cost_lt': 7, 'date_end': '2000-01-02'},
+            )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(reversed(self.posts[:7]))[:5],
+        )
+        sql = context.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertTrue(
+            any('post_pub_date_id_idx' in step for step in plan), plan
+        )
+        self.assertFalse(any('TEMP B-TREE' in step for step in plan), plan)
@@ -0,0 +1,123 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import generations, signals
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class GenerationsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Запись', author=self.author, group=self.group
+        )
+
+    def assertBumps(self, scopes, write):
+        before = generations.generations(scopes)
+        write()
+        after = generations.generations(scopes)
+        for scope, old, new in zip(scopes, before, after):
+            with self.subTest(scope=scope):
+                self.assertGreater(new, old)
+
+    def test_post_write_bumps_scopes(self):
+        """Правка поста начинает новое поколение его областей и лент"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertBumps(
+            [
+                generations.GLOBAL,
+                generations.post(self.post.pk),
+                generations.author(self.author.pk),
+                generations.group(self.group.pk),
+                generations.follower(self.reader.pk),
+            ],
+            self.post.save,
+        )
+
+    def test_comment_group_follow_bump_scopes(self):
+        """Комментарий, группа и подписка меняют свои области"""
+        writes = {
+            generations.post(self.post.pk): lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            generations.group(self.group.pk): self.group.save,
+            generations.follower(self.reader.pk): lambda: (
+                Follow.objects.create(user=self.reader, author=self.author)
+            ),
+        }
+        for scope, write in writes.items():
+            self.assertBumps([scope], write)
+
+    def test_make_key_changes_after_write(self):
+        """Ключ из поколений меняется после записи и стабилен без неё"""
+        scopes = [generations.author(self.author.pk)]
+        key = generations.make_key('profile', scopes, 'first')
+        self.assertEqual(generations.make_key('profile', scopes, 'first'), key)
+        self.assertNotEqual(generations.make_key('profile', scopes, 'n'), key)
+        Post.objects.create(text='Ещё', author=self.author)
+        self.assertNotEqual(
+            generations.make_key('profile', scopes, 'first'), key
+        )
+
+    def test_lost_counter_does_not_reuse_old_keys(self):
+        """Потерянный счётчик не возвращается к старым значениям"""
+        scope = generations.post(self.post.pk)
+        old = generations.generation(scope)
+        cache.delete(generations.PREFIX + scope)
+        self.assertGreater(generations.generation(scope), old)
+
+    def test_comments_fragment_follows_new_comments(self):
+        """Закэшированные комментарии обновляются после нового"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Свежий комментарий'
+        )
+        self.assertContains(self.client.get(url), 'Свежий комментарий')
+
+    def test_comments_fragment_follows_author_rename(self):
+        """Закэшированные комментарии показывают новое имя автора"""
+        commenter = User.objects.create_user(username='old_name')
+        Comment.objects.create(
+            post=self.post, author=commenter, text='Комментарий'
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'old_name')
+        commenter.username = 'new_name'
+        commenter.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'new_name')
+        self.assertNotContains(response, 'old_name')
+
+    def test_group_move_independent_of_receiver_order(self):
+        """Перенос поста меняет старую группу при любом порядке receiver'ов"""
+        other = Group.objects.create(title='Другая', slug='other')
+        counts_first = sorted(
+            post_save.receivers,
+            key=lambda receiver: receiver[1]() is not (
+                signals.update_counts_on_save
+            ),
+        )
+        post_save.sender_receivers_cache.clear()
+        self.addCleanup(post_save.sender_receivers_cache.clear)
+
+        def move():
+            self.post.group = other
+            self.post.save()
+
+        with mock.patch.object(post_save, 'receivers', counts_first):
+            self.assertBumps([generations.group(self.group.pk)], move)
@@ -0,0 +1,260 @@
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from posts import cards, images, markers
+from posts.counters import post_scope
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+# Значение EXIF-тега Orientation: повернуть на 90° по часовой стрелке.
+ROTATE_RIGHT = 6
+
+
+def photo(size=(400, 200), image_format='JPEG', mode='RGB', **options):
+    output = io.BytesIO()
+    Image.new(mode, size, 'red').save(output, image_format, **options)
+    return output.getvalue()
+
+
+def exif_photo(size=(400, 200)):
+    exif = Image.Exif()
+    exif[0x0112] = ROTATE_RIGHT
+    exif[0x010F] = 'Камера'
+    return photo(size, exif=exif.tobytes())
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POSTS_IMAGE_MAX_SIZE=100,
+    POSTS_THUMBNAIL_WORKERS=0,
+)
+class ImagePipelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, content, name='photo.jpg'):
+        return Post.objects.create(
+            text='Текст',
+            author=self.user,
+            image=SimpleUploadedFile(name, content),
+        )
+
+    def test_upload_normalized(self):
+        """Картинка повёрнута по EXIF, уменьшена и сохранена без EXIF"""
+        post = self.create_post(exif_photo())
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (50, 100))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_variants_next_to_fallback(self):
+        """Рядом с JPEG лежат версии в поддерживаемых форматах"""
+        post = self.create_post(photo())
+        formats = images.variant_formats()
+        self.assertIn('WEBP', formats)
+        for image_format in formats:
+            with self.subTest(image_format=image_format):
+                name = images.variant_name(post.image.name, image_format)
+                self.assertTrue(default_storage.exists(name))
+                with default_storage.open(name) as file_:
+                    with Image.open(file_) as image:
+                        self.assertEqual(image.format, image_format)
+                        self.assertEqual(image.size, (100, 50))
+
+    def test_transparent_image_flattened(self):
+        """Прозрачная PNG сохраняется в JPEG на белом фоне"""
+        post = self.create_post(
+            photo((20, 20), 'PNG', 'RGBA'), name='logo.png'
+        )
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.mode, 'RGB')
+
+    def test_saved_image_not_processed_again(self):
+        """Правка поста без новой картинки не трогает файл"""
+        post = self.create_post(photo())
+        name = post.image.name
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(post.image.name, name)
+
+    def test_unreadable_file_saved_as_is(self):
+        """Файл, который не читается как картинка, сохраняется без изменений"""
+        post = self.create_post(b'not an image', name='broken.jpg')
+        with post.image.open() as file_:
+            self.assertEqual(file_.read(), b'not an image')
+
+    def test_preview_and_size_stored(self):
+        """В посте сохраняются размеры картинки и превью в data URI"""
+        post = Post.objects.get(pk=self.create_post(exif_photo()).pk)
+        self.assertEqual((post.image_width, post.image_height), (50, 100))
+        self.assertTrue(post.image_preview.startswith('data:image/'))
+        self.assertLess(len(post.image_preview), 1000)
+
+    def test_preview_cleared_with_image(self):
+        """Без картинки нет ни размеров, ни превью"""
+        post = self.create_post(photo())
+        post.image = None
+        post.save()
+        post = Post.objects.get(pk=post.pk)
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_preview, '')
+
+    def test_card_shows_preview(self):
+        """Карточка показывает превью, пока миниатюра не готова"""
+        post = self.create_post(photo())
+        post = Post.objects.select_related('author', 'group').get(pk=post.pk)
+        card = cards.render_cards([post])[0]
+        self.assertIn(post.image_preview, card)
+
+    def test_command_fills_missing_previews(self):
+        """Команда заполняет превью картинок, загруженных раньше"""
+        post = self.create_post(photo())
+        Post.objects.filter(pk=post.pk).update(
+            image_width=None, image_height=None, image_preview=''
+        )
+        call_command('pregenerate_thumbnails', stdout=io.StringIO())
+        post = Post.objects.get(pk=post.pk)
+        self.assertEqual((post.image_width, post.image_height), (100, 50))
+        self.assertTrue(post.image_preview.startswith('data:image/'))
+
+    def test_identical_uploads_share_file(self):
+        """Одна и та же картинка у двух постов хранится одним файлом"""
+        first = self.create_post(photo())
+        second = self.create_post(photo(), name='copy.jpg')
+        self.assertEqual(first.image.name, second.image.name)
+
+    @override_settings(POSTS_IMAGE_RELEASE_GRACE=0)
+    def test_file_deleted_with_last_reference(self):
+        """Файл и версии удаляются вместе с последним постом с ними"""
+        first = self.create_post(photo())
+        second = self.create_post(photo())
+        name = first.image.name
+        files = [name] + [
+            images.variant_name(name, image_format)
+            for image_format in images.variant_formats()
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        for file_name in files:
+            with self.subTest(file_name=file_name):
+                self.assertTrue(default_storage.exists(file_name))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        for file_name in files:
+            with self.subTest(file_name=file_name):
+                self.assertFalse(default_storage.exists(file_name))
+
+    @override_settings(POSTS_IMAGE_RELEASE_GRACE=0)
+    def test_replaced_image_released(self):
+        """Заменённая картинка без других ссылок удаляется"""
+        post = self.create_post(photo())
+        old = post.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.image = SimpleUploadedFile('new.jpg', photo((30, 30)))
+            post.save()
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(post.image.name))
+
+    def age(self, storage, name, seconds=60 * 60):
+        path = storage.path(name)
+        old = os.stat(path).st_mtime - seconds
+        os.utime(path, (old, old))
+
+    def test_recent_file_kept_until_sweep(self):
+        """Недавно загруженный файл без ссылок удаляет sweep_media"""
+        post = self.create_post(photo((40, 40)))
+        storage, name = post.image.storage, post.image.name
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertTrue(storage.exists(name))
+        out = io.StringIO()
+        call_command('sweep_media', stdout=out)
+        self.assertTrue(storage.exists(name))
+        self.age(storage, name)
+        call_command('sweep_media', stdout=out)
+        for file_name in [name] + [
+            images.variant_name(name, image_format)
+            for image_format in images.variant_formats()
+        ]:
+            with self.subTest(file_name=file_name):
+                self.assertFalse(storage.exists(file_name))
+        self.assertIn('удалено: 1', out.getvalue())
+
+    def test_reused_file_survives_release(self):
+        """Файл, найденный параллельной загрузкой, не удаляется"""
+        post = self.create_post(photo((50, 50)))
+        storage, name = post.image.storage, post.image.name
+        self.age(storage, name)
+        # Другая загрузка того же содержимого ещё не записала пост.
+        with storage.open(name) as file_:
+            self.assertEqual(storage.save('posts/again.jpg', file_), name)
+        with self.captureOnCommitCallbacks(execute=True):
+            post.delete()
+        self.assertTrue(storage.exists(name))
+
+    def test_rehash_command(self):
+        """Старые картинки переименовываются по содержимому, дубли объединяются"""
+        for legacy in ('posts/a.jpg', 'posts/b.jpg'):
+            default_storage.save(legacy, io.BytesIO(photo()))
+        first = self.create_post(photo())
+        second = self.create_post(photo())
+        Post.objects.filter(pk=first.pk).update(image='posts/a.jpg')
+        Post.objects.filter(pk=second.pk).update(image='posts/b.jpg')
+        started = timezone.now()
+        out = io.StringIO()
+        call_command('rehash_media', stdout=out)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        # Объединённый с дубликатом файл тоже меняет страницы и выгрузку.
+        for post in (first, second):
+            with self.subTest(post=post.pk):
+                self.assertGreaterEqual(post.updated_at, started)
+                self.assertGreaterEqual(
+                    markers.last_changed([post_scope(post.pk)]), started
+                )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.storage.is_hashed(first.image.name))
+        self.assertTrue(default_storage.exists(first.image.name))
+        for legacy in ('posts/a.jpg', 'posts/b.jpg'):
+            with self.subTest(legacy=legacy):
+                self.assertFalse(default_storage.exists(legacy))
+        self.assertIn('Переименовано: 1, объединено с такими же: 1',
+                      out.getvalue())
+
+    def test_benchmark_reports_savings(self):
+        """Бенчмарк показывает размеры форматов и время миниатюр"""
+        out = io.StringIO()
+        call_command(
+            'benchmark_images', width=300, height=200, repeat=1, stdout=out
+        )
+        report = out.getvalue()
+        for text in ('оригинал', 'JPEG', 'экономия', 'миниатюры'):
+            with self.subTest(text=text):
+                self.assertIn(text, report)
@@ -0,0 +1,282 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import images, importer, search
+from posts.counters import author_scope, total_count
+from posts.models import AutocompleteEntry, Follow, Group, Post, TimelineEntry
+
+from .test_images import photo
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+def corrupt_png():
+    """PNG с испорченными данными блока IDAT."""
+    content = bytearray(photo(image_format='PNG'))
+    content[content.index(b'IDAT') + 4] ^= 0xFF
+    return bytes(content)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POSTS_IMAGE_MAX_SIZE=100,
+    POSTS_THUMBNAIL_WORKERS=0,
+)
+class ImportTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'a.jpg'), 'wb') as file_:
+            file_.write(photo())
+        with open(os.path.join(self.directory, 'broken.jpg'), 'wb') as file_:
+            file_.write(b'not an image')
+        with open(os.path.join(self.directory, 'bad.png'), 'wb') as file_:
+            file_.write(corrupt_png())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write_feed(self, records):
+        path = os.path.join(self.directory, 'feed.ndjson')
+        with open(path, 'w', encoding='utf-8') as file_:
+            for record in records:
+                if not isinstance(record, str):
+                    record = json.dumps(record, ensure_ascii=False)
+                file_.write(record + '\n')
+        return path
+
+    def run_import(self, records, *args):
+        out, err = io.StringIO(), io.StringIO()
+        call_command(
+            'import_posts', self.write_feed(records), '--images',
+            self.directory, *args, stdout=out, stderr=err,
+        )
+        return out.getvalue(), err.getvalue()
+
+    def media_files(self):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(TEMP_MEDIA_ROOT)
+            for name in names
+        )
+
+    def record(self, number, **fields):
+        return {'text': f'Событие {number}', 'author': 'author', **fields}
+
+    def test_rows_imported(self):
+        """Строки ленты становятся постами с авторами и группами"""
+        records = [
+            self.record(1, group='group', cost=100, end_date='2030-01-02'),
+            self.record(2, title='Заголовок', address='Москва'),
+        ]
+        out, _ = self.run_import(records, '--batch-size', '1')
+        self.assertIn('Импортировано: 2, с ошибками: 0', out)
+        self.assertIn('строк/с', out)
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.cost, 100)
+        self.assertEqual(str(first.end_date), '2030-01-02')
+        self.assertEqual(second.author, self.author)
+        self.assertEqual(second.title, 'Заголовок')
+
+    def test_side_effects_match_signals(self):
+        """Импорт обновляет ленты, счётчики, поиск и подсказки"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = Post.objects.filter(author=self.author)
+        scope = author_scope(self.author.pk)
+        # Счётчик попадает в кэш и должен сдвинуться при импорте.
+        self.assertEqual(total_count(posts, scope), 0)
+        self.run_import([
+            self.record(1, address='Москва'),
+            self.record(2, address='Москва'),
+        ])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(total_count(posts, scope), 2)
+        self.assertEqual(
+            AutocompleteEntry.objects.get(
+                kind=AutocompleteEntry.ADDRESS, key='москва'
+            ).weight,
+            2,
+        )
+        if search.is_enabled():
+            expression = search.match_expression('событие')
+            self.assertEqual(len(search.ranked_ids(expression)), 2)
+
+    def test_lookups_per_batch(self):
+        """Авторы и группы пачки находятся двумя запросами"""
+        rows = [
+            importer.Row(number, importer.clean(json.dumps(
+                self.record(number, group='group')
+            )))
+            for number in range(1, 21)
+        ]
+        with ThreadPoolExecutor() as pool:
+            with self.assertNumQueries(2):
+                posts, failures = importer.prepare(rows, pool)
+        self.assertEqual(len(posts), 20)
+        self.assertEqual(failures, [])
+
+    def test_images_ingested(self):
+        """Картинки обрабатываются и сохраняются с версиями и превью"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.run_import([
+                self.record(1, image='a.jpg'),
+                self.record(2, image='a.jpg'),
+            ])
+        first, second = Post.objects.order_by('pk')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.endswith('.jpg'))
+        self.assertEqual((first.image_width, first.image_height), (100, 50))
+        self.assertTrue(first.image_preview.startswith('data:image/'))
+        for image_format in images.variant_formats():
+            with self.subTest(image_format=image_format):
+                self.assertTrue(first.image.storage.exists(
+                    images.variant_name(first.image.name, image_format)
+                ))
+        # Миниатюры одной картинки ставятся в очередь один раз.
+        self.assertEqual(len(callbacks), 1)
+
+    def test_invalid_rows_reported(self):
+        """Ошибочные строки пропускаются с номером строки"""
+        records = [
+            self.record(1),
+            'не json',
+            {'author': 'author'},
+            self.record(4, author='nobody'),
+            self.record(5, group='none'),
+            self.record(6, cost='дорого'),
+            self.record(7, image='broken.jpg'),
+            self.record(8, image='missing.jpg'),
+            self.record(9, extra='поле'),
+        ]
+        out, err = self.run_import(records)
+        self.assertIn('Импортировано: 1, с ошибками: 8', out)
+        for line in range(2, 10):
+            with self.subTest(line=line):
+                self.assertIn(f'Строка {line}:', err)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_image_paths_outside_root_rejected(self):
+        """Пути картинок за пределы каталога отклоняются"""
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside, ignore_errors=True)
+        with open(os.path.join(outside, 'secret.jpg'), 'wb') as file_:
+            file_.write(photo())
+        os.symlink(
+            os.path.join(outside, 'secret.jpg'),
+            os.path.join(self.directory, 'link.jpg'),
+        )
+        relative = os.path.relpath(
+            os.path.join(outside, 'secret.jpg'), self.directory
+        )
+        records = [
+            self.record(1, image=os.path.join(outside, 'secret.jpg')),
+            self.record(2, image=relative),
+            self.record(3, image='link.jpg'),
+            self.record(4, image='./a.jpg'),
+        ]
+        out, err = self.run_import(records)
+        self.assertIn('Импортировано: 1, с ошибками: 3', out)
+        for line in (1, 2, 3):
+            with self.subTest(line=line):
+                self.assertIn(f'Строка {line}: image:', err)
+        self.assertEqual(Post.objects.get().text, 'Событие 4')
+
+    def test_images_removed_when_batch_fails(self):
+        """Если пачка не записалась, новые файлы картинок удаляются"""
+        with open(os.path.join(self.directory, 'b.jpg'), 'wb') as file_:
+            file_.write(photo(size=(300, 200)))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.run_import([self.record(1, image='a.jpg')])
+        before = self.media_files()
+        rows = [
+            importer.Row(number, importer.clean(json.dumps(
+                self.record(number, image=name)
+            )))
+            for number, name in [(1, 'a.jpg'), (2, 'b.jpg')]
+        ]
+        with ThreadPoolExecutor() as pool:
+            posts, _ = importer.prepare(rows, pool, self.directory)
+        self.assertGreater(len(self.media_files()), len(before))
+        with mock.patch.object(
+            importer, 'after_create', side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                importer.save(posts)
+        self.assertEqual(Post.objects.count(), 1)
+        # Файл a.jpg уже был у первого поста и остаётся.
+        self.assertEqual(self.media_files(), before)
+
+    def test_dry_run(self):
+        """--dry-run проверяет строки и картинки, ничего не записывая"""
+        before = self.media_files()
+        out, err = self.run_import(
+            [
+                self.record(1, image='a.jpg'),
+                self.record(2, image='broken.jpg'),
+                self.record(3, image='bad.png'),
+            ],
+            '--dry-run',
+        )
+        self.assertIn('Проверено без ошибок: 1, с ошибками: 2', out)
+        self.assertIn('Строка 2:', err)
+        self.assertIn('Строка 3:', err)
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(self.media_files(), before)
+
+    def test_resume_from_checkpoint(self):
+        """Импорт продолжается после последней записанной строки"""
+        checkpoint = os.path.join(self.directory, 'checkpoint.json')
+        records = [self.record(number) for number in range(1, 6)]
+        importer.write_checkpoint(checkpoint, 3)
+        out, _ = self.run_import(records, '--checkpoint', checkpoint)
+        self.assertIn('Продолжение после строки 3', out)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['Событие 4', 'Событие 5'],
+        )
+        self.assertEqual(importer.read_checkpoint(checkpoint), 5)
+        out, _ = self.run_import(records, '--checkpoint', checkpoint)
+        self.assertIn('Импортировано: 0', out)
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_benchmark_reports_rows_per_second(self):
+        """Бенчмарк сравнивает импорт по одному и пачками"""
+        out = io.StringIO()
+        call_command(
+            'benchmark_import', rows=20, images=2, width=64, height=48,
+            batch_size=10, stdout=out,
+        )
+        self.assertIn('по одному', out.getvalue())
+        self.assertIn('пачками', out.getvalue())
+        self.assertFalse(Post.objects.exists())
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+User = get_user_model()
+
+
+class IndexFilterTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=cls.user, cost=i)
+            for i in range(12)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_redirects_to_canonical_get(self):
+        """Старая форма с POST перенаправляется на GET с фильтром"""
+        response = self.client.post(
+            reverse('posts:index'),
+            {'date_end': '', 'cost_lt': '10', 'text': ''},
+        )
+        self.assertRedirects(response, reverse('posts:index') + '?cost_lt=10')
+
+    def test_get_params_are_canonical(self):
+        """Параметры фильтра приводятся к одному порядку и виду"""
+        urls = {
+            '?text=+%D0%B7%D0%B0%D0%BF%D0%B8%D1%81%D1%8C+&cost_lt=5':
+                '?cost_lt=5&text=%D0%B7%D0%B0%D0%BF%D0%B8%D1%81%D1%8C',
+            '?cursor=r5&cost_lt=10&title=': '?cost_lt=10&cursor=r5',
+            '?utm_source=mail': '',
+        }
+        for query, canonical in urls.items():
+            with self.subTest(query=query):
+                response = self.client.get(reverse('posts:index') + query)
+                self.assertRedirects(
+                    response, reverse('posts:index') + canonical
+                )
+        response = self.client.get(reverse('posts:index') + '?cost_lt=10')
+        self.assertEqual(response.status_code, 200)
+
+    def test_pagination_links_keep_filter(self):
+        """Ссылки на страницы сохраняют параметры фильтра"""
+        response = self.client.get(reverse('posts:index') + '?cost_lt=10')
+        self.assertContains(response, 'href="?cost_lt=10&amp;cursor=r5"')
+        self.assertContains(response, 'href="?cost_lt=10&amp;cursor=last"')
+        response = self.client.get(
+            reverse('posts:index') + '?cost_lt=10&cursor=r5'
+        )
+        self.assertEqual(len(response.context['page_obj']), 5)
+        self.assertContains(response, 'href="?cost_lt=10&amp;cursor=first"')
+
+    def test_filtered_page_is_cached(self):
+        """Результат фильтра берётся из кэша и сбрасывается записью"""
+        url = reverse('posts:index') + '?cost_lt=10'
+        self.client.get(url)
+        # Список id фильтра закэширован: остаётся загрузить страницу.
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        Post.objects.create(text='Новая запись', author=self.user, cost=1)
+        self.assertContains(self.client.get(url), 'Новая запись')
@@ -0,0 +1,69 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы запросов SQLite')
+class QueryPlanTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовый текст'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=cls.author, group=cls.group)
+            for i in range(20)
+        )
+        cls.authorized_client = Client()
+        cls.authorized_client.force_login(cls.user)
+
+    def listing_plan(self, url):
+        """План запроса, которым страница выбирает посты."""
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if 'FROM "posts_post"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(queries, f'{url}: не найден запрос постов')
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + queries[0])
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_listings_use_index_without_sort(self):
+        """Ленты читают посты по индексу без сортировки во временном дереве"""
+        urls = {
+            reverse('posts:index'): 'post_pub_date_id_idx',
+            reverse('posts:index') + '?cursor=last': 'post_pub_date_id_idx',
+            reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ): 'post_group_pub_date_idx',
+            reverse(
+                'posts:profile', kwargs={'username': self.author.username}
+            ): 'post_author_pub_date_idx',
+            reverse('posts:follow_index'): 'timeline_user_pub_date_idx',
+        }
+        for url, index in urls.items():
+            with self.subTest(url=url):
+                plan = self.listing_plan(url)
+                self.assertTrue(
+                    any(index in step for step in plan), plan
+                )
+                self.assertFalse(
+                    any('TEMP B-TREE' in step for step in plan), plan
+                )
@@ -0,0 +1,234 @@
+import re
+from collections import Counter
+from itertools import cycle
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, reset_queries
+from django.test import Client, TestCase, override_settings, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import (
+    CURSOR_NEXT, NUMBER_OF_RECORDS, NUMBER_OF_RECORDS_INDEX, encode_cursor,
+)
+
+User = get_user_model()
+
+DATASET_SIZES = (10, 1_000, 50_000)
+AUTHORS = 20
+GROUPS = 5
+FOLLOWED_AUTHORS = 5
+# Таблицы, которые в тесте не растут: их можно читать целиком.
+STATIC_TABLES = ('posts_group',)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def normalize(sql):
+    """Запрос без значений параметров, чтобы сравнивать его форму."""
+    return LITERALS.sub('?', sql)
+
+
+@tag('slow')
+@override_settings(QUERY_BUDGET_ENFORCED=False)
+class ScalingTest(TestCase):
+    """Число запросов и их планы не зависят от объёма данных.
+
+    Время ответа не сравнивается: на общей машине оно шумит сильнее,
+    чем растёт. Вместо него каждый запрос проверяется по EXPLAIN QUERY
+    PLAN: растущие таблицы не читаются целиком и не сортируются.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = User.objects.bulk_create(
+            User(username=f'author_{i}') for i in range(AUTHORS)
+        )
+        cls.groups = Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group_{i}', description='-')
+            for i in range(GROUPS)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=cls.reader, author=author)
+            for author in cls.authors[:FOLLOWED_AUTHORS]
+        )
+        cls.post = Post.objects.create(
+            text='Пост для страницы записи',
+            author=cls.authors[0],
+            group=cls.groups[0],
+        )
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='Комментарий')
+            for author in cls.authors
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.rows = 0
+
+    def grow_to(self, size):
+        """Добавляет посты, комментарии и подписки до size каждого.
+
+        bulk_create не вызывает сигналы, поэтому лента читателя
+        пересобирается, чтобы follow_index рос вместе с данными.
+        """
+        missing = size - self.rows
+        authors = cycle(self.authors)
+        groups = cycle(self.groups)
+        posts = Post.objects.bulk_create(
+            (
+                Post(
+                    text=f'Запись {self.rows + i}',
+                    author=next(authors),
+                    group=next(groups),
+                    cost=(self.rows + i) % 1000,
+                )
+                for i in range(missing)
+            ),
+            batch_size=1000,
+        )
+        Comment.objects.bulk_create(
+            (
+                Comment(post=post, author=next(authors), text='Комментарий')
+                for post in posts
+            ),
+            batch_size=1000,
+        )
+        followers = User.objects.bulk_create(
+            (
+                User(username=f'follower_{self.rows + i}')
+                for i in range(missing // AUTHORS + 1)
+            ),
+            batch_size=1000,
+        )
+        Follow.objects.bulk_create(
+            (
+                Follow(user=follower, author=author)
+                for follower in followers for author in self.authors
+            ),
+            batch_size=1000,
+        )
+        timeline.rebuild([self.reader.pk])
+        self.rows = size
+
+    def deep_cursor(self, posts, per_page):
+        """Курсор последней страницы: дальше всего от начала ленты."""
+        oldest = posts.order_by('pub_date', 'pk')[:per_page + 1]
+        return encode_cursor(CURSOR_NEXT, list(oldest)[-1])
+
+    def pages(self):
+        """{название: адрес} проверяемых страниц при текущем объёме."""
+        author = self.authors[0].username
+        group = self.groups[0]
+        index = reverse('posts:index')
+        group_list = reverse('posts:group_list', kwargs={'slug': group.slug})
+        return {
+            'index': index,
+            'index_last': index + '?cursor=last',
+            'index_deep': index + '?cursor=' + self.deep_cursor(
+                Post.objects.all(), NUMBER_OF_RECORDS_INDEX
+            ),
+            'index_filter': index + '?cost_lt=500',
+            'group_list': group_list,
+            'group_list_deep': group_list + '?cursor=' + self.deep_cursor(
+                Post.objects.filter(group=group), NUMBER_OF_RECORDS
+            ),
+            'profile': reverse(
+                'posts:profile', kwargs={'username': author}
+            ),
+            'post_detail': reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.id}
+            ),
+            'follow_index': reverse('posts:follow_index'),
+            'post_create': reverse('posts:post_create'),
+            'post_edit': reverse(
+                'posts:post_edit', kwargs={'post_id': self.post.id}
+            ),
+        }
+
+    def measure(self, url):
+        """SQL запросов одного ответа с холодным кэшем."""
+        cache.clear()
+        # Журнал запросов ограничен, после массовой вставки он переполнен.
+        reset_queries()
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return [query['sql'] for query in context.captured_queries]
+
+    def full_scans(self, queries):
+        """Шаги планов, читающие растущую таблицу целиком или сортирующие.
+
+        SCAN по индексу допустим: так читается упорядоченная лента до
+        LIMIT. Плохо чтение таблицы без индекса и сортировка выборки во
+        временном дереве.
+        """
+        steps = []
+        with connection.cursor() as cursor:
+            for sql in queries:
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                for *_, step in cursor.fetchall():
+                    table_scan = (
+                        step.startswith('SCAN ') and 'USING' not in step
+                        and step.split()[1] not in STATIC_TABLES
+                    )
+                    if table_scan or 'TEMP B-TREE' in step:
+                        steps.append(f'{step}: {sql}')
+        return '\n'.join(steps)
+
+    def grown_queries(self, before, after):
+        """Описание запросов, которых стало больше, с примером SQL."""
+        samples = {normalize(sql): sql for sql in after}
+        grown = Counter(map(normalize, after))
+        grown.subtract(Counter(map(normalize, before)))
+        return '\n'.join(
+            f'+{extra}: {samples[sql]}'
+            for sql, extra in grown.items() if extra > 0
+        )
+
+    def repeated_queries(self, queries):
+        """Запросы одной формы, выполненные несколько раз за ответ (N+1)."""
+        samples = {normalize(sql): sql for sql in queries}
+        return '\n'.join(
+            f'x{times}: {samples[sql]}'
+            for sql, times in Counter(map(normalize, queries)).items()
+            if times > 1
+        )
+
+    def test_pages_stay_flat(self):
+        baseline = {}
+        for size in DATASET_SIZES:
+            self.grow_to(size)
+            for name, url in self.pages().items():
+                queries = self.measure(url)
+                repeated = self.repeated_queries(queries)
+                with self.subTest(page=name, size=size, check='N+1'):
+                    self.assertFalse(
+                        repeated,
+                        f'{url}: повторяющиеся запросы при {size} записях\n'
+                        + repeated
+                    )
+                scans = self.full_scans(queries)
+                with self.subTest(page=name, size=size, check='plan'):
+                    self.assertFalse(
+                        scans,
+                        f'{url}: чтение всей таблицы при {size} записях\n'
+                        + scans
+                    )
+                if name not in baseline:
+                    baseline[name] = queries
+                    continue
+                base_queries = baseline[name]
+                with self.subTest(page=name, size=size):
+                    self.assertLessEqual(
+                        len(queries), len(base_queries),
+                        f'{url}: {len(base_queries)} -> {len(queries)} '
+                        f'запросов при {size} записях\n'
+                        + self.grown_queries(base_queries, queries)
+                    )
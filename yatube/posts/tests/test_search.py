@@ -0,0 +1,96 @@
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+
+class StemTest(TestCase):
+    def test_word_forms_share_stem(self):
+        """Формы слова приводятся к одной основе"""
+        forms = [
+            ('экскурсия', 'экскурсии', 'экскурсиями'),
+            ('ферма', 'фермы', 'ферме'),
+            ('сыроварня', 'сыроварни', 'сыроварню'),
+        ]
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({search.stem(word) for word in words}), 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'FTS5 есть только в SQLite')
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    def setUp(self):
+        self.farm = Post.objects.create(
+            title='Экскурсия на ферму',
+            text='Покажем сыроварню и накормим козу.',
+            author=self.user,
+        )
+        self.other = Post.objects.create(
+            title='Конная прогулка',
+            text='Прогулка по лесу, в конце экскурсии обед на ферме.',
+            author=self.user,
+        )
+
+    def search(self, **params):
+        cache.clear()
+        response = self.client.get(reverse('posts:index'), params, follow=True)
+        return response.context['page_obj']
+
+    def test_search_matches_word_forms_and_ranks(self):
+        """Поиск находит другие формы слова и ставит выше точные совпадения"""
+        page = self.search(text='фермы')
+        self.assertEqual(list(page), [self.other])
+        page = self.search(title='экскурсии')
+        self.assertEqual(list(page), [self.farm])
+
+    def test_rank_limit_applies_after_filters(self):
+        """Лимит по рангу не отсекает посты, подходящие под фильтр"""
+        # Дорогой пост релевантнее и один проходит лимит по рангу.
+        Post.objects.create(
+            title='Ферма', text='Ферма, ферма, ферма.', author=self.user,
+            cost=100,
+        )
+        cheap = Post.objects.create(
+            title='Прогулка',
+            text='Долгая прогулка по лесу и полям, в конце — ферма.',
+            author=self.user,
+            cost=1,
+        )
+        with mock.patch.object(search, 'RANKED_LIMIT', 1):
+            page = self.search(text='ферма', cost_lt=10)
+        self.assertEqual(list(page), [cheap])
+
+    def test_snippet_highlights_matches(self):
+        """В результатах поиска совпадения выделены"""
+        page = self.search(text='сыроварни')
+        self.assertIn('<mark>сыроварню</mark>', page[0].search_snippet)
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        self.farm.text = 'Только пасека.'
+        self.farm.save()
+        self.assertEqual(list(self.search(text='сыроварня')), [])
+        self.assertEqual(list(self.search(text='пасеки')), [self.farm])
+        self.farm.delete()
+        self.assertEqual(list(self.search(text='пасеки')), [])
+
+    def test_rebuild_command(self):
+        """Команда пересобирает индекс для существующих постов"""
+        search.clear()
+        call_command('rebuild_search_index', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(self.search(text='козу')), [self.farm])
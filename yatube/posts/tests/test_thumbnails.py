@@ -0,0 +1,217 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from posts import cards, thumbnails
+from posts.counters import post_scope
+from posts.models import ChangeMarker, Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+PLACEHOLDER = 'aspect-ratio:'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, **kwargs):
+        return Post.objects.create(
+            text='Текст',
+            author=self.user,
+            image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            ),
+            **kwargs
+        )
+
+    def load(self, post):
+        return Post.objects.select_related('author', 'group').get(pk=post.pk)
+
+    def detail(self, post):
+        return self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        ).content.decode()
+
+    def test_generated_after_commit(self):
+        """Миниатюры всех размеров создаются после коммита, не в запросе"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post()
+        self.assertEqual(len(callbacks), 1)
+        for kind in thumbnails.KINDS:
+            with self.subTest(kind=kind):
+                self.assertFalse(thumbnails.is_ready(post, kind))
+        self.assertIn(PLACEHOLDER, self.detail(post))
+        callbacks[0]()
+        post = Post.objects.get(pk=post.pk)
+        for kind in thumbnails.KINDS:
+            with self.subTest(kind=kind):
+                self.assertTrue(thumbnails.is_ready(post, kind))
+        html = self.detail(post)
+        self.assertNotIn(PLACEHOLDER, html)
+        self.assertIn(settings.MEDIA_URL + 'cache/', html)
+
+    def test_unchanged_image_not_scheduled(self):
+        """Сохранение поста без смены картинки не ставит задачу"""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post()
+        with self.captureOnCommitCallbacks() as callbacks:
+            post.text = 'Новый текст'
+            post.save()
+        self.assertEqual(callbacks, [])
+
+    def test_missing_thumbnail_scheduled_on_render(self):
+        """Показ заглушки ставит задачу для старой картинки"""
+        with self.captureOnCommitCallbacks():
+            post = self.create_post()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.detail(post)
+        post = Post.objects.get(pk=post.pk)
+        self.assertTrue(thumbnails.is_ready(post, 'detail'))
+
+    def test_failed_image_not_rescheduled(self):
+        """Картинку, для которой миниатюры не создались, показ не ставит"""
+        # Своя картинка: файл SMALL_GIF общий для постов других тестов.
+        output = io.BytesIO()
+        Image.new('RGB', (3, 2), 'blue').save(output, 'PNG')
+        with self.captureOnCommitCallbacks():
+            post = Post.objects.create(
+                text='Текст',
+                author=self.user,
+                image=SimpleUploadedFile('blue.png', output.getvalue()),
+            )
+        with open(post.image.path, 'wb') as file:
+            file.write(b'not an image')
+        with self.assertLogs('sorl.thumbnail', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                self.detail(post)
+        self.assertTrue(callbacks)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.detail(post)
+        self.assertEqual(callbacks, [])
+
+    def test_generation_touches_pages(self):
+        """После создания миниатюр страницы поста считаются изменёнными"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post()
+        before = ChangeMarker.objects.get(scope=post_scope(post.pk))
+        callbacks[0]()
+        after = ChangeMarker.objects.get(scope=post_scope(post.pk))
+        self.assertGreater(after.changed_at, before.changed_at)
+
+    def test_card_with_placeholder_not_cached(self):
+        """Карточка с заглушкой не кэшируется"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post()
+        post = self.load(post)
+        self.assertIn(PLACEHOLDER, cards.render_cards([post])[0])
+        self.assertIsNone(cache.get(cards.card_key(post)))
+        callbacks[0]()
+        post = self.load(post)
+        self.assertNotIn(PLACEHOLDER, cards.render_cards([post])[0])
+        self.assertIsNotNone(cache.get(cards.card_key(post)))
+
+    def test_page_lookups_batched(self):
+        """Миниатюры карточек страницы находятся одним запросом к базе"""
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(5):
+                self.create_post()
+        cache.clear()
+        posts = list(Post.objects.select_related('author', 'group'))
+        with CaptureQueriesContext(connection) as queries:
+            html = cards.render_cards(posts)
+        kvstore_queries = [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+        self.assertEqual(len(kvstore_queries), 1)
+        for card in html:
+            self.assertNotIn(PLACEHOLDER, card)
+        self.assertEqual(
+            sum(thumbnails.is_ready(post, 'card') for post in posts), 5
+        )
+
+    def test_missing_thumbnail_not_cached(self):
+        """Промах не кэшируется: готовая миниатюра видна сразу"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            post = self.create_post()
+        self.assertFalse(thumbnails.is_ready(post, 'card'))
+        callbacks[0]()
+        cache.clear()
+        post = Post.objects.get(pk=post.pk)
+        self.assertFalse(hasattr(post, 'thumbnails'))
+        self.assertTrue(thumbnails.is_ready(post, 'card'))
+
+    def test_srcset_lists_width_variants(self):
+        """Картинка карточки перечисляет в srcset все варианты ширины"""
+        with self.captureOnCommitCallbacks(execute=True):
+            post = self.create_post()
+        card = cards.render_cards([self.load(post)])[0]
+        for width in thumbnails.KINDS['card']['widths']:
+            with self.subTest(width=width):
+                self.assertIn(f' {width}w', card)
+        self.assertIn(
+            f'sizes="{thumbnails.KINDS["card"]["sizes"]}"', card
+        )
+
+    def test_cards_below_first_are_lazy(self):
+        """Картинки карточек ниже первой загружаются лениво"""
+        with self.captureOnCommitCallbacks(execute=True):
+            posts = [self.load(self.create_post()) for _ in range(3)]
+        first, *rest = cards.render_cards(posts)
+        self.assertNotIn('loading="lazy"', first)
+        for card in rest:
+            self.assertIn('loading="lazy"', card)
+
+    def test_pregenerate_command(self):
+        """Команда создаёт миниатюры для существующих постов"""
+        with self.captureOnCommitCallbacks():
+            post = self.create_post()
+        out = io.StringIO()
+        call_command('pregenerate_thumbnails', stdout=out)
+        post = Post.objects.get(pk=post.pk)
+        for kind in thumbnails.KINDS:
+            with self.subTest(kind=kind):
+                self.assertTrue(thumbnails.is_ready(post, kind))
+        self.assertIn(f'создано миниатюр: {len(thumbnails.GEOMETRIES)}',
+                      out.getvalue())
+        out = io.StringIO()
+        call_command('pregenerate_thumbnails', stdout=out)
+        self.assertIn('создано миниатюр: 0', out.getvalue())
+
+    def test_post_without_image_has_no_placeholder(self):
+        """У поста без картинки нет заглушки"""
+        post = Post.objects.create(text='Текст', author=self.user)
+        self.assertNotIn(PLACEHOLDER, self.detail(post))
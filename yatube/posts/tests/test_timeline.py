@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.client_follower = Client()
+        cls.client_follower.force_login(cls.follower)
+
+    def timeline(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.follower).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('post_id', flat=True)
+        )
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка добавляет посты автора в ленту, отписка убирает"""
+        post = Post.objects.create(text='Запись', author=self.author)
+        self.client_follower.get(
+            reverse('posts:profile_follow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.timeline(), [post.pk])
+        self.client_follower.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'author'})
+        )
+        self.assertEqual(self.timeline(), [])
+
+    def test_new_post_fans_out(self):
+        """Новый пост автора попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Запись', author=self.author)
+        self.assertEqual(self.timeline(), [post.pk])
+        response = self.client_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    @override_settings(POSTS_TIMELINE_SIZE=3)
+    def test_timeline_is_capped(self):
+        """Лента подрезается до POSTS_TIMELINE_SIZE записей"""
+        posts = [
+            Post.objects.create(text=f'Запись {i}', author=self.author)
+            for i in range(5)
+        ]
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(
+            self.timeline(), [post.pk for post in reversed(posts[2:])]
+        )
+
+    def test_rebuild_command(self):
+        """Команда пересобирает ленты по подпискам"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(text='Запись', author=self.author)
+        TimelineEntry.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_timelines', batch_size=1, stdout=out)
+        self.assertEqual(self.timeline(), [post.pk])
+        self.assertIn('1', out.getvalue())
+
+    def test_feed_pages_with_several_followers(self):
+        """Лента листается по своим записям, когда подписчиков несколько"""
+        for user in (self.follower, User.objects.create_user('second')):
+            Follow.objects.create(user=user, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Запись {i}', author=self.author)
+            for i in range(7)
+        ]
+        url = reverse('posts:follow_index')
+        with self.assertNumQueries(3):
+            response = self.client_follower.get(url)
+        seen = list(response.context['page_obj'])
+        while response.context['page_obj'].has_next():
+            cursor = response.context['page_obj'].next_cursor
+            response = self.client_follower.get(url, {'cursor': cursor})
+            seen += list(response.context['page_obj'])
+        self.assertEqual(seen, list(reversed(posts)))
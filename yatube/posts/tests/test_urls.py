@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from posts.models import Group, Post
 from django.test import TestCase, Client
 from http import HTTPStatus
@@ -39,6 +40,9 @@ class TaskURLTests(TestCase):
             group=cls.group
         )
 
+    def setUp(self):
+        cache.clear()
+
     def test_url_exists_at_desired_location(self):
         """Доступ к общим страницам"""
         url_names = {
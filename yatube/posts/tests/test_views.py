@@ -1,11 +1,18 @@
 import shutil
 import tempfile
+from datetime import datetime, timezone
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from posts.models import Group, Post, Comment, Follow
+from posts.utils import (
+    CURSOR_NEXT, CURSOR_PREVIOUS, NUMBER_OF_RECORDS, NUMBER_OF_RECORDS_INDEX,
+    encode_cursor,
+)
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django import forms
 from django.urls import reverse
 
@@ -58,6 +65,9 @@ class TestView(TestCase):
         super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
+    def setUp(self):
+        cache.clear()
+
     def test_pages_uses_correct_template(self):
         """URL-адреса используют соответствующие шаблоны"""
         template_pages_name = {
@@ -209,13 +219,87 @@ class PaginatorViewsTest(TestCase):
             )
         Post.objects.bulk_create(cls.post)
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_second_page_contains_ten_records(self):
-        """Проверка количества постов на первой и второй странице"""
+        """Проверка количества постов на первой и последней странице"""
         response_page_1 = self.guest_client.get(reverse('posts:index'))
-        self.assertEqual(len(response_page_1.context['page_obj']), 10)
+        page_1 = response_page_1.context['page_obj']
+        self.assertEqual(len(page_1), NUMBER_OF_RECORDS_INDEX)
+        self.assertFalse(page_1.has_previous())
+
+        response_page_2 = self.client.get(
+            reverse('posts:index') + f'?cursor={page_1.next_cursor}'
+        )
+        page_2 = response_page_2.context['page_obj']
+        self.assertEqual(len(page_2), NUMBER_OF_RECORDS_INDEX)
+        self.assertTrue(page_2.has_previous())
+
+        response_last = self.client.get(reverse('posts:index') + '?cursor=last')
+        self.assertFalse(response_last.context['page_obj'].has_next())
+
+    def test_cursor_navigation_covers_all_posts(self):
+        """Переход по курсорам вперёд и назад не теряет и не дублирует посты"""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        seen = []
+        page = self.client.get(url).context['page_obj']
+        seen.extend(page)
+        while page.has_next():
+            page = self.client.get(
+                url + f'?cursor={page.next_cursor}'
+            ).context['page_obj']
+            seen.extend(page)
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        self.assertEqual(seen, expected)
+
+        previous = self.client.get(
+            url + f'?cursor={page.previous_cursor}'
+        ).context['page_obj']
+        self.assertEqual(
+            list(previous),
+            expected[-len(page) - NUMBER_OF_RECORDS:-len(page)]
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """Некорректный курсор открывает первую страницу"""
+        response = self.client.get(reverse('posts:index') + '?cursor=xyz')
+        self.assertEqual(
+            list(response.context['page_obj']),
+            list(Post.objects.order_by('-pub_date', '-pk')[
+                :NUMBER_OF_RECORDS_INDEX
+            ])
+        )
+
 
-        response_page_2 = self.client.get(reverse('posts:index') + '?page=2')
-        self.assertEqual(len(response_page_2.context['page_obj']), 3)
+    def test_cursor_past_the_end_returns_first_page(self):
+        """Курсор за краем списка открывает первую страницу"""
+        first_page = list(
+            Post.objects.order_by('-pub_date', '-pk')[:NUMBER_OF_RECORDS]
+        )
+        cursors = [
+            encode_cursor(CURSOR_NEXT, Post(
+                pk=1, pub_date=datetime(1970, 1, 1, tzinfo=timezone.utc)
+            )),
+            encode_cursor(CURSOR_PREVIOUS, Post(
+                pk=10 ** 6, pub_date=datetime(3000, 1, 1, tzinfo=timezone.utc)
+            )),
+        ]
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(url, {'cursor': cursor})
+                page = response.context['page_obj']
+                self.assertEqual(list(page), first_page)
+                self.assertFalse(page.has_previous())
+
+    def test_cursor_page_has_no_number(self):
+        """Методы номеров страниц у страницы по курсору отключены"""
+        page = self.client.get(reverse('posts:index')).context['page_obj']
+        for method in (page.start_index, page.next_page_number):
+            with self.subTest(method=method.__name__):
+                with self.assertRaises(NotImplementedError):
+                    method()
 
 
 class CommentsTest(TestCase):
@@ -260,6 +344,59 @@ class CommentsTest(TestCase):
                 self.assertEqual(comment_created, self.comment.created)
 
 
+class QueryCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовый текст'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовая запись',
+            author=cls.user,
+            group=cls.group
+        )
+        Follow.objects.create(
+            user=User.objects.create_user(username='follower'),
+            author=cls.user
+        )
+
+    def add_rows(self, number):
+        for i in range(number):
+            author = User.objects.create_user(username=f'author_{i}')
+            Post.objects.create(text=f'Запись {i}', author=author)
+            Comment.objects.create(
+                post=self.post, author=author, text=f'Комментарий {i}'
+            )
+
+    def test_queries_do_not_depend_on_rows(self):
+        """Число запросов страниц не растёт с числом постов и комментариев"""
+        client = Client()
+        client.force_login(User.objects.get(username='follower'))
+        pages = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+            reverse('posts:follow_index'),
+        ]
+        before = {}
+        for page in pages:
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                client.get(page)
+            before[page] = len(context.captured_queries)
+        self.add_rows(5)
+        for page in pages:
+            with self.subTest(page=page):
+                cache.clear()
+                with self.assertNumQueries(before[page]):
+                    client.get(page)
+
+
 class CacheTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -276,16 +413,15 @@ class CacheTest(TestCase):
         )
 
     def test_cache_index(self):
-        """Страница index кэшируется"""
-        first_object = self.authorized_client.get(reverse('posts:index'))
+        """Кэш index не отдаёт устаревшие записи и чужую страницу"""
+        self.authorized_client.get(reverse('posts:index'))
         post_1 = Post.objects.get(pk=1)
         post_1.text = 'new_text'
         post_1.save()
-        second_object = self.authorized_client.get(reverse('posts:index'))
-        self.assertEqual(first_object.content, second_object.content)
-        cache.clear()
-        third_object = self.authorized_client.get(reverse('posts:index'))
-        self.assertNotEqual(first_object.content, third_object.content)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'new_text')
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Пользователь: test_user')
 
 
 class FollowTest(TestCase):
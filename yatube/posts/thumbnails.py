@@ -0,0 +1,380 @@
+"""Миниатюры картинок постов, созданные
+заранее.
+
+sorl.thumbnail создаёт миниатюру при первом
+показе, и первый посетитель ждёт, пока Pillow
+раскодирует и уменьшит оригинал. Здесь
+миниатюры всех размеров из шаблонов (KINDS)
+создаются в фоновом потоке после
+сохранения картинки поста. PregeneratedBackend не
+создаёт такие миниатюры в запросе: пока
+миниатюры нет, он возвращает None, и шаблон
+показывает заглушку.
+
+Страница ленты не ищет миниатюры по одной:
+prefetch находит их для всех постов страницы
+одним get_many кэша и одним запросом к таблице
+sorl, а шаблон берёт готовые из post.thumbnails (тег
+post_image). Промахи не кэшируются, иначе
+процесс с локальным кэшем видел бы
+заглушку и после того, как миниатюру создал
+другой процесс.
+
+    THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedBackend'
+
+POSTS_THUMBNAIL_WORKERS — число фоновых потоков; 0 —
+миниатюры создаются сразу после коммита в
+том же потоке.
+
+Картинка, которую не удалось
+раскодировать, запоминается в кэше на
+POSTS_THUMBNAIL_FAILURE_TIMEOUT секунд, и показ заглушки
+не ставит для неё задачу снова. Новое
+сохранение картинки в пост ставит задачу
+всегда.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDBKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+# Виды миниатюр: наибольший размер и ширины
+# вариантов для srcset с тем же соотношением
+# сторон. sizes — ширина картинки в вёрстке:
+# карточка занимает колонку col-xl-5 (.container
+# Bootstrap), а ниже xl — всю ширину контейнера; на
+# странице поста — колонку col-md-9.
+KINDS = {
+    'card': {
+        'size': (1200, 1000),
+        'widths': (480, 720, 960, 1200),
+        'sizes': (
+            '(min-width: 1200px) 475px, (min-width: 992px) 960px, '
+            '(min-width: 768px) 720px, (min-width: 576px) 540px, 100vw'
+        ),
+    },
+    'detail': {
+        'size': (900, 600),
+        'widths': (450, 600, 900),
+        'sizes': (
+            '(min-width: 1200px) 855px, (min-width: 992px) 720px, '
+            '(min-width: 768px) 540px, 100vw'
+        ),
+    },
+}
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def geometries(kind):
+    """{ширина: геометрия sorl} вариантов
+    миниатюры вида kind.
+    """
+    width, height = KINDS[kind]['size']
+    return {
+        variant: f'{variant}x{round(variant * height / width)}'
+        for variant in KINDS[kind]['widths']
+    }
+
+
+GEOMETRIES = {
+    geometry for kind in KINDS for geometry in geometries(kind).values()
+}
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def pregenerated(geometry_string, options):
+    """Создаётся ли миниатюра такого размера
+    заранее.
+    """
+    return geometry_string in GEOMETRIES and options == OPTIONS
+
+
+class PregeneratedBackend(ThumbnailBackend):
+    """Не создаёт в запросе миниатюры из
+    GEOMETRIES.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_ or not pregenerated(geometry_string, options):
+            return super().get_thumbnail(file_, geometry_string, **options)
+        thumbnail = self.ready(file_, geometry_string, options)
+        if thumbnail is None:
+            # Миниатюры нет: картинку загрузили
+            # до появления фоновой генерации или
+            # задача потерялась при перезапуске.
+            schedule_missing([getattr(file_, 'name', file_)])
+        return thumbnail
+
+    def ready(self, file_, geometry_string, options):
+        """Готовая миниатюра из хранилища sorl
+        или None.
+        """
+        thumbnail = self.thumbnail_file(file_, geometry_string, options)
+        return get_many([thumbnail.key]).get(thumbnail.key)
+
+    def thumbnail_file(self, file_, geometry_string, options):
+        """Файл миниатюры, возможно ещё не
+        созданной.
+        """
+        source = ImageFile(file_)
+        options = self.full_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def full_options(self, source, options):
+        """Параметры с умолчаниями, как в
+        ThumbnailBackend.get_thumbnail.
+        """
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+
+def get_many(keys):
+    """{ключ: миниатюра} из хранилища sorl для
+    найденных ключей.
+
+    С хранилищем cached_db — один get_many кэша и
+    один запрос к базе по промахам.
+    """
+    if not keys:
+        return {}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        found = {key: kvstore._get(key) for key in keys}
+        return {key: value for key, value in found.items() if value}
+    raw_keys = {add_prefix(key): key for key in keys}
+    values = {
+        raw_key: value
+        for raw_key, value in kvstore.cache.get_many(raw_keys).items()
+        if value != EMPTY_VALUE
+    }
+    missing = [raw_key for raw_key in raw_keys if raw_key not in values]
+    if missing:
+        stored = dict(
+            KVStoreModel.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        kvstore.cache.set_many(
+            stored, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(stored)
+    return {
+        raw_keys[raw_key]: deserialize_image_file(value)
+        for raw_key, value in values.items()
+    }
+
+
+def prefetch(posts, *kinds):
+    """Находит готовые миниатюры постов разом
+    и кладёт в post.thumbnails.
+
+    post.thumbnails[kind] — {ширина: миниатюра} готовых
+    вариантов.
+    """
+    backend = PregeneratedBackend()
+    files = []
+    for post in posts:
+        if getattr(post, 'thumbnails', None) is None:
+            post.thumbnails = {}
+        if not post.image:
+            continue
+        for kind in kinds:
+            post.thumbnails[kind] = {}
+            for width, geometry_string in geometries(kind).items():
+                files.append((post, kind, width, backend.thumbnail_file(
+                    post.image, geometry_string, OPTIONS
+                )))
+    found = get_many([thumbnail.key for *_, thumbnail in files])
+    missing = set()
+    for post, kind, width, thumbnail in files:
+        if thumbnail.key in found:
+            post.thumbnails[kind][width] = found[thumbnail.key]
+        else:
+            missing.add(post.image.name)
+    # Картинку загрузили до появления
+    # фоновой генерации или задача
+    # потерялась при перезапуске.
+    schedule_missing(missing)
+
+
+def thumbnails_for(post, kind):
+    """{ширина: миниатюра} готовых вариантов:
+    из prefetch или одним поиском.
+    """
+    prefetched = getattr(post, 'thumbnails', None)
+    if prefetched is None or (post.image and kind not in prefetched):
+        prefetch([post], kind)
+    return post.thumbnails.get(kind, {})
+
+
+def is_ready(post, kind):
+    """Готовы ли все варианты миниатюры
+    картинки поста вида kind.
+    """
+    if not post.image:
+        return True
+    return len(thumbnails_for(post, kind)) == len(KINDS[kind]['widths'])
+
+
+def source_file(name):
+    """Картинка поста по имени — в хранилище
+    поля Post.image.
+    """
+    from .models import Post
+
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def _failure_key(name):
+    return f'posts:thumbnails:failed:{name}'
+
+
+def _remember_failure(name):
+    timeout = getattr(settings, 'POSTS_THUMBNAIL_FAILURE_TIMEOUT', 60 * 60)
+    cache.set(_failure_key(name), True, timeout)
+
+
+def generate(name):
+    """Создаёт миниатюры всех размеров;
+    возвращает число новых.
+
+    Если какие-то миниатюры создать не
+    удалось, картинка запоминается как
+    сбойная (см. schedule_missing).
+    """
+    source = source_file(name)
+    pregenerated_backend = PregeneratedBackend()
+    files = {
+        geometry_string: pregenerated_backend.thumbnail_file(
+            source, geometry_string, OPTIONS
+        )
+        for geometry_string in GEOMETRIES
+    }
+    keys = [thumbnail.key for thumbnail in files.values()]
+    found = get_many(keys)
+    if len(found) == len(keys):
+        return 0
+    backend = ThumbnailBackend()
+    for geometry_string, thumbnail in files.items():
+        if thumbnail.key not in found:
+            backend.get_thumbnail(source, geometry_string, **OPTIONS)
+    # sorl не бросает исключение, если не смог
+    # прочитать картинку, а только пишет в
+    # журнал и не сохраняет миниатюру.
+    ready = get_many(keys)
+    if len(ready) < len(keys):
+        _remember_failure(name)
+    else:
+        cache.delete(_failure_key(name))
+    return len(ready) - len(found)
+
+
+def generate_for_image(name):
+    """Создаёт миниатюры и отмечает
+    изменёнными страницы постов с картинкой.
+
+    Страницы, отданные с заглушкой, иначе
+    остались бы в кэше браузера по ETag.
+    Возвращает число новых миниатюр.
+    """
+    from . import markers
+    from .counters import post_scope, post_scopes
+    from .models import Post
+
+    created = generate(name)
+    if not created:
+        return 0
+    scopes = []
+    for post in Post.objects.filter(image=name).only(
+        'pk', 'author_id', 'group_id'
+    ):
+        scopes += [post_scope(post.pk), *post_scopes(post)]
+    if scopes:
+        markers.touch(*scopes)
+    return created
+
+
+def _run(name):
+    try:
+        generate_for_image(name)
+    except Exception:
+        logger.exception(
+            'Не удалось создать миниатюры %s', name
+        )
+        _remember_failure(name)
+    finally:
+        with _lock:
+            _pending.discard(name)
+
+
+def _run_in_thread(name):
+    try:
+        _run(name)
+    finally:
+        close_old_connections()
+
+
+def _submit(name):
+    global _executor
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    workers = getattr(settings, 'POSTS_THUMBNAIL_WORKERS', 2)
+    if not workers:
+        _run(name)
+        return
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='thumbnails'
+            )
+    _executor.submit(_run_in_thread, name)
+
+
+def schedule_image(name):
+    """Создаёт миниатюры картинки в фоне
+    после коммита.
+    """
+    transaction.on_commit(partial(_submit, name))
+
+
+def schedule_missing(names):
+    """Ставит задачи для картинок без
+    миниатюр, кроме недавно сбойных.
+    """
+    keys = {_failure_key(name): name for name in names}
+    if not keys:
+        return
+    failed = cache.get_many(keys)
+    for key, name in keys.items():
+        if key not in failed:
+            schedule_image(name)
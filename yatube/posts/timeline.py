@@ -0,0 +1,159 @@
+"""Материализованная лента подписок.
+
+Новый пост раскладывается по лентам подписчиков автора, подписка
+добавляет в ленту последние посты автора, отписка убирает их. Лента
+каждого пользователя ограничена POSTS_TIMELINE_SIZE записями; лишние
+записи подрезаются при подписке, пересборке и каждые
+POSTS_TIMELINE_TRIM_EVERY публикаций автора.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, FilteredRelation, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+# Поля ленты из feed() с датой и id поста — ключ постраничного вывода.
+FEED_KEY = ('feed_date', 'feed_post_id')
+
+
+def feed(user_id, posts=None):
+    """Посты ленты пользователя; листаются по FEED_KEY.
+
+    Запись ленты присоединяется один раз через FilteredRelation, а
+    курсор и сортировка работают с её полями из аннотаций. Отдельные
+    filter() по timeline_entries соединили бы таблицу ещё раз и брали
+    бы записи лент других подписчиков.
+    """
+    if posts is None:
+        posts = Post.objects.all()
+    return posts.annotate(
+        feed_entry=FilteredRelation(
+            'timeline_entries',
+            condition=Q(timeline_entries__user_id=user_id),
+        ),
+        feed_date=F('feed_entry__pub_date'),
+        feed_post_id=F('feed_entry__post_id'),
+    ).filter(feed_post_id__isnull=False)
+
+
+def timeline_size():
+    return getattr(settings, 'POSTS_TIMELINE_SIZE', 1000)
+
+
+def _entries(user_id, posts):
+    return [
+        TimelineEntry(
+            user_id=user_id,
+            post_id=pk,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for pk, author_id, pub_date in posts
+    ]
+
+
+def _latest(posts):
+    return posts.order_by('-pub_date', '-pk').values_list(
+        'pk', 'author_id', 'pub_date'
+    )[:timeline_size()]
+
+
+def trim(user_ids):
+    """Оставляет в лентах пользователей не больше timeline_size() записей."""
+    overflow = TimelineEntry.objects.filter(user_id__in=user_ids).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=F('user_id'),
+            order_by=[F('pub_date').desc(), F('post_id').desc()],
+        )
+    ).filter(position__gt=timeline_size()).values_list('pk', flat=True)
+    TimelineEntry.objects.filter(pk__in=overflow).delete()
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты подписчиков его автора."""
+    follower_ids = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            'user_id', flat=True
+        )
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for user_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim_every = getattr(settings, 'POSTS_TIMELINE_TRIM_EVERY', 50)
+    if trim_every and post.pk % trim_every == 0:
+        trim(follower_ids)
+
+
+def fan_out_many(posts):
+    """Добавляет пачку новых постов в ленты подписчиков их авторов.
+
+    Возвращает id подписчиков по id автора.
+    """
+    followers = defaultdict(list)
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in={post.author_id for post in posts}
+    ).values_list('user_id', 'author_id'):
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=post.author_id,
+                pub_date=post.pub_date,
+            )
+            for post in posts
+            for user_id in followers[post.author_id]
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    follower_ids = {
+        user_id for user_ids in followers.values() for user_id in user_ids
+    }
+    if follower_ids:
+        trim(follower_ids)
+    return followers
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту пользователя последние посты автора."""
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, _latest(Post.objects.filter(author_id=author_id))),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_ids):
+    """Собирает ленты пользователей заново по их подпискам."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+        for user_id in user_ids:
+            posts = _latest(
+                Post.objects.filter(author__following__user_id=user_id)
+            )
+            TimelineEntry.objects.bulk_create(
+                _entries(user_id, posts), batch_size=BATCH_SIZE
+            )
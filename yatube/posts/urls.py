@@ -28,4 +28,9 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'autocomplete/<str:kind>/',
+        views.autocomplete_suggest,
+        name='autocomplete'
+    ),
 ]
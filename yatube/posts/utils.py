@@ -1,10 +1,267 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .counters import TotalCount, total_count
 
 NUMBER_OF_RECORDS = 3
+NUMBER_OF_RECORDS_INDEX = 5
+
+CURSOR_PARAM = 'cursor'
+CURSOR_FIRST = 'first'
+CURSOR_LAST = 'last'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+CURSOR_RANKED = 'r'
+
+
+def encode_cursor(direction, post, date_attr='pub_date'):
+    """Кодирует позицию поста (pub_date, id) в строку для URL."""
+    raw = f'{direction}|{getattr(post, date_attr).isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, pub_date, id) или None для битого курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница, навигация по которой идёт по курсорам, а не по номерам."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<Cursor page of {len(self.object_list)} objects>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def _no_number(self, *args):
+        raise NotImplementedError(
+            'У страницы по курсору нет номера, используйте курсоры'
+        )
+
+    next_page_number = previous_page_number = _no_number
+    start_index = end_index = _no_number
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(
+            CURSOR_NEXT, self.object_list[-1], self.paginator.date_attr
+        )
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(
+            CURSOR_PREVIOUS, self.object_list[0], self.paginator.date_attr
+        )
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (pub_date, id).
+
+    Каждая страница — один запрос с LIMIT по индексу, без OFFSET
+    и без COUNT(*), поэтому её стоимость не зависит от глубины.
+    Общее количество считается только по запросу, через кэш счётчиков.
+    key — поля выборки, в которых лежат pub_date и id поста;
+    date_attr — атрибут объекта с датой для курсора (для комментариев
+    это created).
+    """
+
+    def __init__(self, object_list, per_page, scope=None, signature='',
+                 key=('pub_date', 'pk'), date_attr='pub_date'):
+        super().__init__(object_list, per_page)
+        self.scope = scope
+        self.signature = signature
+        self.date_field, self.id_field = key
+        self.date_attr = date_attr
+
+    @cached_property
+    def total(self):
+        return total_count(self.object_list, self.scope, self.signature)
+
+    @cached_property
+    def count(self):
+        return int(self.total)
+
+    def get_page(self, cursor):
+        if cursor == CURSOR_LAST:
+            return self._last_page()
+        decoded = None
+        if cursor and cursor != CURSOR_FIRST:
+            decoded = decode_cursor(cursor)
+        if decoded is None:
+            return self._forward_page(self.object_list, has_previous=False)
+        direction, pub_date, pk = decoded
+        lookup = 'lt' if direction == CURSOR_NEXT else 'gt'
+        queryset = self.object_list.filter(
+            Q(**{f'{self.date_field}__{lookup}': pub_date})
+            | Q(**{
+                self.date_field: pub_date,
+                f'{self.id_field}__{lookup}': pk,
+            })
+        )
+        if direction == CURSOR_NEXT:
+            page = self._forward_page(queryset, has_previous=True)
+        else:
+            page = self._backward_page(queryset, has_next=True)
+        # Курсор за краем списка (последняя запись удалена или курсор
+        # подделан) — первая страница, а не пустая со ссылками назад.
+        if not page.object_list:
+            return self._forward_page(self.object_list, has_previous=False)
+        return page
+
+    def page(self, number):
+        return self.get_page(number)
+
+    def _forward_page(self, queryset, has_previous):
+        posts = list(
+            queryset.order_by(
+                f'-{self.date_field}', f'-{self.id_field}'
+            )[:self.per_page + 1]
+        )
+        has_next = len(posts) > self.per_page
+        return CursorPage(
+            posts[:self.per_page], self, has_next, has_previous
+        )
+
+    def _backward_page(self, queryset, has_next):
+        posts = list(
+            queryset.order_by(
+                self.date_field, self.id_field
+            )[:self.per_page + 1]
+        )
+        has_previous = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        posts.reverse()
+        return CursorPage(posts, self, has_next, has_previous)
+
+    def _last_page(self):
+        return self._backward_page(self.object_list, has_next=False)
+
+
+class RankedPage(CursorPage):
+    """Страница результатов поиска: курсор — позиция в списке по рангу."""
+
+    def __init__(self, object_list, paginator, offset):
+        super().__init__(
+            object_list,
+            paginator,
+            has_next=offset + paginator.per_page < len(paginator.ranked_ids),
+            has_previous=offset > 0,
+        )
+        self.offset = offset
+
+    def start_index(self):
+        return self.offset + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.offset + len(self.object_list)
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return f'{CURSOR_RANKED}{self.offset + self.paginator.per_page}'
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        offset = max(self.offset - self.paginator.per_page, 0)
+        return f'{CURSOR_RANKED}{offset}'
+
+
+class RankedPaginator(Paginator):
+    """Постраничный вывод по готовому упорядоченному списку id.
+
+    Используется для поиска по релевантности и для закэшированных
+    результатов фильтра. Страница берётся из ranked_ids срезом и
+    загружается одним запросом по id; limited — список обрезан.
+    """
+
+    def __init__(self, object_list, per_page, ranked_ids, limited=False):
+        super().__init__(object_list, per_page)
+        self.ranked_ids = ranked_ids
+        self.limited = limited
+
+    @cached_property
+    def total(self):
+        return TotalCount(len(self.ranked_ids), exact=not self.limited)
+
+    @cached_property
+    def count(self):
+        return len(self.ranked_ids)
+
+    def get_page(self, cursor):
+        offset = 0
+        if cursor == CURSOR_LAST:
+            last = max(len(self.ranked_ids) - 1, 0)
+            offset = last - last % self.per_page
+        elif cursor and cursor.startswith(CURSOR_RANKED):
+            try:
+                offset = int(cursor[len(CURSOR_RANKED):])
+            except ValueError:
+                offset = 0
+        if not 0 <= offset < len(self.ranked_ids):
+            offset = 0
+        page_ids = self.ranked_ids[offset:offset + self.per_page]
+        posts = self.object_list.in_bulk(page_ids)
+        return RankedPage(
+            [posts[pk] for pk in page_ids if pk in posts], self, offset
+        )
+
+    def page(self, number):
+        return self.get_page(number)
+
+
+def page_query(params, cursor=None):
+    """Строка запроса: параметры в заданном порядке, курсор последним."""
+    query = QueryDict(mutable=True)
+    for name, value in params:
+        query.appendlist(name, value)
+    if cursor:
+        query[CURSOR_PARAM] = cursor
+    return query.urlencode()
+
+
+def paginator(request, posts_list, per_page=NUMBER_OF_RECORDS,
+              scope=None, signature='', key=('pub_date', 'pk')):
+    paginator = CursorPaginator(posts_list, per_page, scope, signature, key)
+    cursor = request.GET.get(CURSOR_PARAM)
+    page_obj = paginator.get_page(cursor)
+    return page_obj
 
 
-def paginator(request, posts_list):
-    paginator = Paginator(posts_list, NUMBER_OF_RECORDS)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+def ranked_paginator(request, posts_list, ranked_ids, limited=False,
+                     per_page=NUMBER_OF_RECORDS):
+    paginator = RankedPaginator(posts_list, per_page, ranked_ids, limited)
+    cursor = request.GET.get(CURSOR_PARAM)
+    page_obj = paginator.get_page(cursor)
     return page_obj
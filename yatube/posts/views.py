@@ -1,27 +1,76 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from .models import Post, Group, User, Follow
-from django.core.paginator import Paginator
+from .models import Post, Group, User, Follow, AutocompleteEntry
 from .forms import PostForm, CommentForm, FilterForm
 from django.contrib.auth.decorators import login_required
-from .utils import paginator
+from django.http import Http404, JsonResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET
+from . import autocomplete, filter_cache, markers, search, timeline
+from .utils import (
+    CURSOR_PARAM, NUMBER_OF_RECORDS_INDEX, page_query, paginator,
+    ranked_paginator,
+)
+from .counters import (
+    INDEX_SCOPE, TotalCount, author_scope, group_scope, total_count,
+)
 from django.urls import reverse
 
+from core.decorators import query_budget
+
 from django.views.generic import ListView
 from django_filters.views import FilterView
 from .models import Post
 from .filters import PostFilter
 
 
+@query_budget(5)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
-    # 
+    post_list = Post.objects.select_related('author', 'group')
+    # Фильтр передаётся в GET, чтобы страницы кэшировались по адресу.
+    # Старые формы с POST перенаправляются на канонический адрес.
     if request.method == 'POST':
         post_filter = PostFilter(request.POST, queryset=post_list)
+        query = page_query(post_filter.canonical_params)
+        return redirect(f'{request.path}?{query}' if query else request.path)
+    post_filter = PostFilter(request.GET or None, queryset=post_list)
+    query = page_query(
+        post_filter.canonical_params, request.GET.get(CURSOR_PARAM)
+    )
+    if query != request.GET.urlencode():
+        return redirect(f'{request.path}?{query}' if query else request.path)
+    ranked_ids, limited = [], False
+    if post_filter.signature:
+        ranked_ids, limited = filter_cache.result_ids(post_filter)
+    # Обрезанный список без поиска дальше листается курсором по дате.
+    if post_filter.signature and (
+        post_filter.search_expression or not limited
+    ):
+        page_obj = ranked_paginator(
+            request,
+            post_list,
+            ranked_ids,
+            limited,
+            NUMBER_OF_RECORDS_INDEX,
+        )
     else:
-        post_filter = PostFilter(queryset=post_list)
-    # page_obj = paginator(request, post_list)
-    page_obj = Paginator(post_filter.qs, 5).get_page(request.GET.get('page'))
+        page_obj = paginator(
+            request,
+            post_filter.scan_qs() if limited else post_filter.qs,
+            NUMBER_OF_RECORDS_INDEX,
+            scope=INDEX_SCOPE,
+            signature=post_filter.signature,
+        )
+        if limited:
+            # Выборка id уже показала, что постов больше предела.
+            page_obj.paginator.total = TotalCount(
+                len(ranked_ids), exact=False
+            )
+    if post_filter.search_expression:
+        for post in page_obj:
+            post.search_snippet = search.snippet(
+                post.text, post_filter.search_query
+            )
     context = {
         'title': 'Последние обновления на сайте',
         'posts': post_filter,
@@ -31,7 +80,7 @@ def index(request):
 
 
 class PostListView(FilterView):
-    model = Post
+    queryset = Post.objects.select_related('author', 'group')
     filterset_class = PostFilter
     paginate_by = 10
     template_name = 'posts/filter.html'
@@ -40,7 +89,7 @@ class PostListView(FilterView):
 #     template = 'posts/index.html'
 #     form = FilterForm()
 
-#     post_list = Post.objects.all()
+#     post_list = Post.objects.select_related('author', 'group')
 #     page_obj = paginator(request, post_list)
 #     context = {
 #         'title': 'Последние обновления на сайте',
@@ -52,11 +101,16 @@ class PostListView(FilterView):
 #     return render(request, template, context)
 
 
+@query_budget(6)
+@condition(
+    etag_func=markers.group_etag,
+    last_modified_func=markers.group_last_modified,
+)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    page_obj = paginator(request, post_list)
+    post_list = group.posts.select_related('author', 'group')
+    page_obj = paginator(request, post_list, scope=group_scope(group.pk))
     context = {
         'group': group,
         'posts': post_list,
@@ -65,12 +119,17 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@query_budget(8)
+@condition(
+    etag_func=markers.profile_etag,
+    last_modified_func=markers.profile_last_modified,
+)
 def profile(request, username):
     template = 'posts/profile.html'
 
     user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    page_obj = paginator(request, post_list)
+    post_list = user.posts.select_related('author', 'group')
+    page_obj = paginator(request, post_list, scope=author_scope(user.pk))
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user,
@@ -88,14 +147,24 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@query_budget(7)
+@condition(
+    etag_func=markers.post_etag,
+    last_modified_func=markers.post_last_modified,
+)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
 
     form = CommentForm()
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
 
-    comments = post.comments.all()
-    posts_count = Post.objects.filter(author=post.author).count()
+    comments = post.comments.select_related('author')
+    posts_count = total_count(
+        Post.objects.filter(author=post.author),
+        author_scope(post.author_id),
+    )
     context = {
         'post': post,
         'posts_count': posts_count,
@@ -105,6 +174,7 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@query_budget(10)
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -124,10 +194,11 @@ def post_create(request):
     return render(request, template, {'form': form})
 
 
+@query_budget(10)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -146,6 +217,7 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(5)
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -158,12 +230,15 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(3)
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
 
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, post_list)
+    post_list = timeline.feed(
+        request.user.pk, Post.objects.select_related('author', 'group')
+    )
+    page_obj = paginator(request, post_list, key=timeline.FEED_KEY)
     context = {
         'title': 'Последние обновления на сайте',
         'posts': post_list,
@@ -173,6 +248,7 @@ def follow_index(request):
     return render(request, template, context)
 
 
+@query_budget(9)
 @login_required
 def profile_follow(request, username):
     user = request.user
@@ -183,6 +259,7 @@ def profile_follow(request, username):
     return redirect(reverse('posts:profile', kwargs={'username': username}))
 
 
+@query_budget(8)
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
@@ -190,3 +267,16 @@ def profile_unfollow(request, username):
     if followers.exists():
         followers.delete()
     return redirect(reverse('posts:profile', kwargs={'username': author}))
+
+
+@query_budget(1)
+@require_GET
+@cache_control(public=True, max_age=300)
+def autocomplete_suggest(request, kind):
+    if kind not in dict(AutocompleteEntry.KIND_CHOICES):
+        raise Http404
+    query = request.GET.get('q', '')[:autocomplete.MAX_KEY_LENGTH]
+    return JsonResponse(
+        {'results': autocomplete.suggest(kind, query)},
+        json_dumps_params={'ensure_ascii': False},
+    )
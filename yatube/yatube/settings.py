@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -163,6 +164,13 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто передаёт байты медиафайлов (core.media): None — сам WSGI-сервер,
+# 'x-accel-redirect' — nginx, 'x-sendfile' — Apache/lighttpd.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/internal-media/'
+# Функция (request, path) -> bool или путь к ней: кому отдавать файл
+# (core.views.media). None — медиафайлы доступны всем.
+MEDIA_ACCESS_POLICY = None
 
 CACHES = {
     'default': {
@@ -170,4 +178,49 @@ CACHES = {
     }
 }
 
+# Общий для всех процессов кэш в файле SQLite (core.cache), если задан путь.
+if os.environ.get('YATUBE_CACHE_PATH'):
+    CACHES['default'] = {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ['YATUBE_CACHE_PATH'],
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+# Счётчики постов для постраничного вывода (posts.counters)
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 60
+POSTS_COUNT_CAP = 1000
+POSTS_COUNT_TIME_BUDGET = 0.05
+
+# Проверка бюджета запросов view (core.decorators.query_budget)
+QUERY_BUDGET_ENFORCED = DEBUG
+
+# Материализованная лента подписок (posts.timeline)
+POSTS_TIMELINE_SIZE = 1000
+POSTS_TIMELINE_TRIM_EVERY = 50
+
+# Кэш результатов фильтра постов (posts.filter_cache)
+POSTS_FILTER_CACHE_TIMEOUT = 60 * 10
+POSTS_FILTER_CACHE_LIMIT = 1000
+
+# Кэш отрисованных карточек постов (posts.cards)
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Миниатюры картинок постов создаются заранее в фоне (posts.thumbnails)
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedBackend'
+POSTS_THUMBNAIL_WORKERS = 2
+# Сколько секунд не пытаться снова создать миниатюры сбойной картинки
+POSTS_THUMBNAIL_FAILURE_TIMEOUT = 60 * 60
+
+# Обработка загруженных картинок постов (posts.images)
+POSTS_IMAGE_MAX_SIZE = 2560
+POSTS_IMAGE_QUALITY = {'JPEG': 85, 'WEBP': 80, 'AVIF': 60}
+POSTS_IMAGE_FORMATS = ('WEBP', 'AVIF')
+# Сколько секунд после загрузки картинку без ссылок не удалять: пост со
+# ссылкой на неё может быть ещё не зафиксирован (posts.images.release)
+POSTS_IMAGE_RELEASE_GRACE = 60 * 10
+
+# Выгрузка для аналитики (posts.export): на сколько секунд раньше конца
+# выгрузки начинается следующая, чтобы не потерять долгие транзакции
+POSTS_EXPORT_LAG = 60 * 5
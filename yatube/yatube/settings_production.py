@@ -0,0 +1,69 @@
+"""Настройки для боевого сервера.
+
+Выбираются переменной окружения YATUBE_ENV=production (или явно через
+DJANGO_SETTINGS_MODULE=yatube.settings_production). От настроек
+разработки отличаются тем, что на каждый запрос уходит меньше работы:
+нет debug_toolbar и DEBUG, шаблоны компилируются один раз (cached
+loader), соединение с базой переиспользуется между запросами, сессии
+читаются из кэша. Выигрыш каждой настройки показывает команда
+benchmark_overhead.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, DATABASES, INSTALLED_APPS, MIDDLEWARE
+
+DEBUG = False
+QUERY_BUDGET_ENFORCED = False
+
+SECRET_KEY = os.environ['YATUBE_SECRET_KEY']
+ALLOWED_HOSTS = os.environ.get('YATUBE_ALLOWED_HOSTS', 'localhost').split(',')
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if not middleware.startswith('debug_toolbar.')
+]
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+        },
+    },
+]
+
+DATABASES = {
+    'default': {
+        **DATABASES['default'],
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')
+        ),
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+MEDIA_SENDFILE = os.environ.get('YATUBE_MEDIA_SENDFILE') or None
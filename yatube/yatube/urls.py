@@ -1,5 +1,4 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls import handler404, handler403
@@ -9,6 +8,7 @@ from django.conf import settings
 urlpatterns = [
     path('', include('core.urls', namespace='core')),
     path('', include('posts.urls', namespace='posts')),
+    path('api/', include('api.urls', namespace='api')),
     path('admin/', admin.site.urls, name='admin'),
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
@@ -18,9 +18,10 @@ urlpatterns = [
 handler404 = 'core.views.page_not_found'
 handler403 = 'core.views.csrf_failure'
 
+# Медиафайлы во всех режимах отдаёт core.views.media (маршрут в
+# core.urls) с проверкой MEDIA_ACCESS_POLICY, поэтому static() для
+# MEDIA_URL не подключается: он обходил бы политику доступа.
+
 if settings.DEBUG:
     import debug_toolbar
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )